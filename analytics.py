@@ -0,0 +1,226 @@
+import asyncio
+import contextvars
+import logging
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Exported tables and their columns with Parquet types. Rows hold no
+# personal data: customers appear as Telegram user/chat ids and postcodes only.
+TABLES: Dict[str, List[Tuple[str, str]]] = {
+    'turns': [
+        ('id', 'int64'), ('at', 'float64'), ('user_id', 'int64'), ('step', 'string'),
+        ('wait_ms', 'float64'), ('process_ms', 'float64'), ('outcome', 'string'),
+        ('stt_ms', 'float64'), ('llm_ms', 'float64'),
+    ],
+    'voice_replies': [
+        ('id', 'int64'), ('at', 'float64'), ('chat_id', 'int64'), ('chars', 'int64'),
+        ('tts_ms', 'float64'), ('send_ms', 'float64'), ('outcome', 'string'),
+    ],
+    'sessions': [
+        ('id', 'int64'), ('at', 'float64'), ('user_id', 'int64'), ('postcode', 'string'),
+        ('messages', 'int64'), ('delivery_mode', 'string'),
+    ],
+    'bookings': [
+        ('id', 'int64'), ('at', 'float64'), ('user_id', 'int64'), ('postcode', 'string'),
+        ('slot_date', 'string'), ('slot_time', 'string'), ('outcome', 'string'),
+    ],
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS turns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    at REAL NOT NULL,
+    user_id INTEGER NOT NULL,
+    step TEXT NOT NULL,
+    wait_ms REAL NOT NULL,
+    process_ms REAL NOT NULL,
+    outcome TEXT NOT NULL,
+    stt_ms REAL NOT NULL DEFAULT 0,
+    llm_ms REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS voice_replies (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    at REAL NOT NULL,
+    chat_id INTEGER NOT NULL,
+    chars INTEGER NOT NULL,
+    tts_ms REAL NOT NULL,
+    send_ms REAL NOT NULL,
+    outcome TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    at REAL NOT NULL,
+    user_id INTEGER NOT NULL,
+    postcode TEXT,
+    messages INTEGER NOT NULL,
+    delivery_mode TEXT
+);
+CREATE TABLE IF NOT EXISTS bookings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    at REAL NOT NULL,
+    user_id INTEGER NOT NULL,
+    postcode TEXT,
+    slot_date TEXT,
+    slot_time TEXT,
+    outcome TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS export_watermarks (
+    name TEXT PRIMARY KEY,
+    last_id INTEGER NOT NULL,
+    exported_at REAL NOT NULL
+);
+"""
+
+_POSTCODE = re.compile(r'\b(\d{4})\b')
+
+# Rows buffered before the flusher is woken early
+_FLUSH_ROWS = 500
+
+
+class TurnTimer:
+    """Stage timings and failure flag of the turn being processed"""
+    __slots__ = ('llm_ms', 'failed')
+
+    def __init__(self):
+        self.llm_ms = 0.0
+        self.failed = False  # Set by handlers that answered with an error message
+
+
+current_turn: contextvars.ContextVar[Optional[TurnTimer]] = contextvars.ContextVar('current_turn', default=None)
+
+
+def connect(path: str = None) -> sqlite3.Connection:
+    """Open the analytics database, creating the schema if needed"""
+    path = path or Config.ANALYTICS_PATH
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(_SCHEMA)
+    # Databases created before the stage timings gain their columns
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(turns)")}
+    for name in ('stt_ms', 'llm_ms'):
+        if name not in columns:
+            conn.execute(f"ALTER TABLE turns ADD COLUMN {name} REAL NOT NULL DEFAULT 0")
+    return conn
+
+
+def postcode(paese_cap: Optional[str]) -> Optional[str]:
+    """Extract the four-digit postcode from a "6900 Lugano" style value"""
+    match = _POSTCODE.search(paese_cap or '')
+    return match.group(1) if match else None
+
+
+class AnalyticsStore:
+    """Append-only SQLite record of turns, completed sessions and bookings.
+
+    Recording only appends to an in-memory buffer, so handlers never wait
+    on disk; a background task writes the buffer in batches every
+    ANALYTICS_FLUSH_SECONDS. export.py reads the same database.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or Config.ANALYTICS_PATH
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pending: Dict[str, List[tuple]] = {table: [] for table in TABLES}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        # A single thread owns the connection, which also serializes all writes
+        self._db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='analytics')
+        self._stats = {'written': 0, 'dropped': 0}
+
+    async def _db(self, fn, *args):
+        """Run a database operation on the store's thread"""
+        return await asyncio.get_event_loop().run_in_executor(self._db_executor, fn, *args)
+
+    def _open_sync(self):
+        self._conn = connect(self.path)
+
+    def _write_sync(self, batches: Dict[str, List[tuple]]):
+        with self._conn:
+            self._conn.execute("BEGIN")
+            for table, rows in batches.items():
+                columns = [name for name, _ in TABLES[table][1:]]
+                self._conn.executemany(
+                    f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                    rows
+                )
+
+    async def start(self):
+        """Open the database and start the background flusher"""
+        await self._db(self._open_sync)
+        self._wakeup = asyncio.Event()
+        self._flush_task = asyncio.create_task(self._flush_loop())
+        logger.info(f"Analytics store opened ({self.path})")
+
+    async def stop(self):
+        """Write what is still buffered and close the database"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        if self._conn is not None:
+            await self.flush()
+            await self._db(self._conn.close)
+            self._conn = None
+
+    async def flush(self):
+        """Write buffered rows in one transaction"""
+        batches = {table: rows for table, rows in self._pending.items() if rows}
+        if not batches:
+            return
+        self._pending = {table: [] for table in TABLES}
+        count = sum(len(rows) for rows in batches.values())
+        try:
+            await self._db(self._write_sync, batches)
+            self._stats['written'] += count
+        except Exception as e:
+            self._stats['dropped'] += count
+            logger.error(f"Error writing {count} analytics rows: {e}")
+
+    async def _flush_loop(self):
+        """Flush periodically, or early when the buffer fills up"""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=Config.ANALYTICS_FLUSH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def _append(self, table: str, row: tuple):
+        self._pending[table].append(row)
+        if self._wakeup is not None and sum(len(rows) for rows in self._pending.values()) >= _FLUSH_ROWS:
+            self._wakeup.set()
+
+    def record_turn(self, user_id: int, step: str, wait_ms: float, process_ms: float, outcome: str,
+                    stt_ms: float = 0.0, llm_ms: float = 0.0):
+        """Record the stage timings of one conversation turn"""
+        self._append('turns', (time.time(), user_id, step, round(wait_ms, 1), round(process_ms, 1), outcome,
+                               round(stt_ms, 1), round(llm_ms, 1)))
+
+    def record_voice_reply(self, chat_id: int, chars: int, tts_ms: float, send_ms: float, outcome: str):
+        """Record the synthesis and upload time of one voice reply"""
+        self._append('voice_replies', (time.time(), chat_id, chars, round(tts_ms, 1), round(send_ms, 1), outcome))
+
+    def record_session(self, user_id: int, paese_cap: Optional[str], messages: int, delivery_mode: Optional[str]):
+        """Record a session that completed data collection"""
+        self._append('sessions', (time.time(), user_id, postcode(paese_cap), messages, delivery_mode))
+
+    def record_booking(self, user_id: int, paese_cap: Optional[str], slot_date: Optional[str],
+                       slot_time: Optional[str], outcome: str):
+        """Record a booking attempt and whether the slot was booked"""
+        self._append('bookings', (time.time(), user_id, postcode(paese_cap), slot_date, slot_time, outcome))
+
+    def stats(self) -> Dict:
+        """Return written, dropped and buffered row counts"""
+        return dict(self._stats, pending=sum(len(rows) for rows in self._pending.values()))
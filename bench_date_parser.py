@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Italian date/time parser against a corpus of booking phrases
+"""
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from date_parser import parse_date, parse_time
+
+# Reference time: Wednesday 15 October 2025, 10:00 in Zurich
+NOW = datetime(2025, 10, 15, 10, 0, tzinfo=ZoneInfo("Europe/Zurich"))
+
+# (message, expected date, expected time)
+CORPUS = [
+    ("Vorrei un appuntamento domani alle 10", "2025-10-16", "10:00"),
+    ("domani pomeriggio alle tre", "2025-10-16", "15:00"),
+    ("Dopodomani alle 14:30", "2025-10-17", "14:30"),
+    ("oggi alle 16", "2025-10-15", "16:00"),
+    ("lunedì prossimo alle tre e mezza", "2025-10-20", "15:30"),
+    ("Lunedi alle 9", "2025-10-20", "09:00"),
+    ("venerdì alle 11 e un quarto", "2025-10-17", "11:15"),
+    ("mercoledì della prossima settimana alle 10", "2025-10-22", "10:00"),
+    ("giovedì mattina alle 8", "2025-10-16", "08:00"),
+    ("il 20 ottobre alle 10", "2025-10-20", "10:00"),
+    ("il primo novembre alle dieci", "2025-11-01", "10:00"),
+    ("1° dicembre ore 14", "2025-12-01", "14:00"),
+    ("il 3 marzo 2026 alle 9:30", "2026-03-03", "09:30"),
+    ("20/10/2025 alle 15:00", "2025-10-20", "15:00"),
+    ("20.10.2025 14.30", "2025-10-20", "14:30"),
+    ("2025-10-21 10:00", "2025-10-21", "10:00"),
+    ("il 21/10 alle 11", "2025-10-21", "11:00"),
+    ("tra due giorni alle quattro", "2025-10-17", "16:00"),
+    ("fra una settimana verso le 10", "2025-10-22", "10:00"),
+    ("la prossima settimana alle 9", "2025-10-20", "09:00"),
+    ("martedì all'una", "2025-10-21", "13:00"),
+    ("martedì a mezzogiorno", "2025-10-21", "12:00"),
+    ("venerdì alle undici meno un quarto", "2025-10-17", "10:45"),
+    ("domani alle 2 pm", "2025-10-16", "14:00"),
+    ("giovedì 16h", "2025-10-16", "16:00"),
+    ("domani per le dieci e venti", "2025-10-16", "10:20"),
+    ("il 5 gennaio alle 10", "2026-01-05", "10:00"),
+    ("Mi va bene qualsiasi giorno", None, None),
+    ("Ho un problema con la stampante", None, None),
+]
+
+def run(iterations: int = 2000):
+    print("🔍 Benchmarking Italian date/time parser...")
+    
+    date_hits = time_hits = 0
+    for message, expected_date, expected_time in CORPUS:
+        parsed_date = parse_date(message, now=NOW)
+        parsed_time = parse_time(message)
+        date_ok = parsed_date == expected_date
+        time_ok = parsed_time == expected_time
+        date_hits += date_ok
+        time_hits += time_ok
+        if not (date_ok and time_ok):
+            print(f"❌ {message!r}: got {parsed_date} {parsed_time}, expected {expected_date} {expected_time}")
+    
+    print(f"✅ Dates: {date_hits}/{len(CORPUS)} correct")
+    print(f"✅ Times: {time_hits}/{len(CORPUS)} correct")
+    
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for message, _, _ in CORPUS:
+            parse_date(message, now=NOW)
+            parse_time(message)
+    elapsed = time.perf_counter() - start
+    calls = iterations * len(CORPUS)
+    print(f"⏱️ {elapsed / calls * 1e6:.1f} µs per message ({calls} messages)")
+
+if __name__ == "__main__":
+    run()
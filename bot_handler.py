@@ -1,21 +1,80 @@
+import asyncio
 import logging
 import re
-from typing import Dict, Optional
-from datetime import datetime, timedelta
+import time
+from typing import Dict, Optional, Tuple
 from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler
-from models import UserSession, UserData, AppointmentRequest
-from services import OpenAIService, ElevenLabsService, CalendarService
-from config import SWISS_PHONE_PATTERN, EMAIL_PATTERN
+from models import UserSession, UserData, AppointmentRequest, REQUIRED_FIELDS
+from services import OpenAIService, ElevenLabsService, CalendarService, SpeechToTextService
+from config import Config, SWISS_PHONE_PATTERN, EMAIL_PATTERN
+from date_parser import parse_date, parse_time, format_slot
+from services.resilience import deadline_scope
+from delivery_policy import DeliveryPolicy, USER_MODE_NAMES, VOICE, TEXT, TEXT_FIRST
+from outbound_queue import OutboundQueue
+from questionnaire import first_missing, parse_answer, next_reply, invalid_reply, clean_value, all_phrases
+from message_coalescer import MessageCoalescer
+from rate_limiter import RateLimiter
+from fair_scheduler import FairScheduler
+from session_snapshot import save_snapshot, load_snapshot
+from analytics import AnalyticsStore, TurnTimer, current_turn
 
 logger = logging.getLogger(__name__)
 
+# Ordinals that pick one of the proposed slots by position
+SLOT_CHOICE_WORDS = {
+    'primo': 0, 'prima': 0,
+    'secondo': 1, 'seconda': 1,
+    'terzo': 2, 'terza': 2,
+    'quarto': 3, 'quarta': 3,
+    'quinto': 4, 'quinta': 4,
+}
+_ARTICLE = r"(?:il|lo|la|l['’])"
+# A number or ordinal as the whole reply: "2", "il 2", "ok, la seconda"
+_SLOT_REPLY = re.compile(
+    rf"^(?:(?:ok|okay|sì|si|va bene|perfetto|allora|scelgo|prendo)[\s,]+)*({_ARTICLE}\s*)?(\d|[^\W\d_]+)[\s.!]*$",
+    re.IGNORECASE
+)
+# An article and an ordinal inside a longer reply: "prendo la seconda, grazie"
+_SLOT_ORDINAL = re.compile(
+    rf"\b{_ARTICLE}\s*({'|'.join(SLOT_CHOICE_WORDS)})\b(?!\s+(?:possibile|disponibile|volta))", re.IGNORECASE
+)
+
+# Fixed messages; their audio is rendered once at startup
+THROTTLE_NOTICE = "Stai inviando troppi messaggi. Aspetta qualche secondo e riprova."
+WELCOME_MESSAGE = """Ciao! Sono l'assistente vocale del servizio clienti.
+
+Per poterti aiutare al meglio, ho bisogno di raccogliere alcune informazioni personali. 
+
+Iniziamo: come ti chiami?"""
+
 class TelegramBotHandler:
     def __init__(self):
         self.openai_service = OpenAIService()
         self.voice_service = ElevenLabsService()
         self.calendar_service = CalendarService()
+        self.stt_service = SpeechToTextService()
+        self.delivery_policy = DeliveryPolicy()
         self.user_sessions: Dict[int, UserSession] = {}
+        self.bot = None  # Set by start_background_work
+        self._prerender_task: Optional[asyncio.Task] = None
+        
+        # Flood protection and fair sharing of turn capacity between users
+        self.rate_limiter = RateLimiter()
+        self.scheduler = FairScheduler()
+        self.prerendered_audio: Dict[str, bytes] = {}
+        
+        # Bursts of messages from a user are answered as one turn
+        self.coalescer = MessageCoalescer(self._run_turn)
+        
+        # Voice replies and calendar bookings run on durable queue workers
+        self.job_queue = OutboundQueue()
+        self.job_queue.register('voice_reply', self._run_voice_reply_job, on_dead=self._voice_reply_failed)
+        self.job_queue.register('book_appointment', self._run_booking_job, on_dead=self._booking_failed)
+        
+        # Turn timings, completed sessions and bookings for export.py
+        self.analytics = AnalyticsStore()
+        self._stt_ms: Dict[int, float] = {}  # Transcription time not yet counted in a turn
         
         # Test ElevenLabs connection
         try:
@@ -38,30 +97,172 @@ class TelegramBotHandler:
     
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Main message handler"""
+        if not await self._admit(update):
+            return
+        self.coalescer.submit(update.effective_user.id, update.message.text, update, context)
+    
+    async def handle_voice(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Voice message handler: transcribe, then continue as a text message"""
+        user_id = update.effective_user.id
+        voice = update.message.voice
+        
+        # Throttle before downloading and transcribing
+        if not await self._admit(update):
+            return
+        
+        if voice.duration and voice.duration > Config.STT_MAX_DURATION_SECONDS:
+            await self._send_voice_response(
+                update,
+                "Il messaggio vocale è troppo lungo. Puoi mandarne uno più breve o scrivermi?"
+            )
+            return
+        
+        with deadline_scope(Config.UPDATE_DEADLINE_SECONDS):
+            try:
+                started = time.perf_counter()
+                
+                # Download the OGG stream into memory - no temp file
+                voice_file = await voice.get_file()
+                audio = bytes(await voice_file.download_as_bytearray())
+                downloaded = time.perf_counter()
+                
+                transcript = await self.stt_service.transcribe(audio, "voice.ogg")
+                transcribed = time.perf_counter()
+                
+            except Exception as e:
+                logger.error(f"Error receiving voice message: {e}")
+                transcript = None
+        
+        if not transcript:
+            await self._send_voice_response(
+                update,
+                "Non sono riuscito a capire il messaggio vocale. Puoi ripetere o scrivermi?"
+            )
+            return
+        
+        logger.info(
+            f"Voice message from user {user_id} ({voice.duration}s): "
+            f"download {(downloaded - started) * 1000:.0f}ms, "
+            f"transcription {(transcribed - downloaded) * 1000:.0f}ms"
+        )
+        
+        # From here on a transcript is handled like a typed message
+        self._stt_ms[user_id] = self._stt_ms.get(user_id, 0.0) + (transcribed - downloaded) * 1000
+        self.coalescer.submit(user_id, transcript, update, context)
+    
+    async def _admit(self, update: Update) -> bool:
+        """Apply the per-user and per-chat rate limits, notifying throttled users"""
+        user_id = update.effective_user.id
+        if self.rate_limiter.allow(user_id, update.effective_chat.id):
+            return True
+        
+        logger.warning(f"Throttled message from user {user_id}")
+        if self.rate_limiter.should_notify(user_id):
+            await self._send_throttle_notice(update)
+        return False
+    
+    async def _send_throttle_notice(self, update: Update):
+        """Tell a throttled user to slow down without any LLM or TTS call"""
+        session = self.user_sessions.get(update.effective_user.id)
+        audio = self.prerendered_audio.get(THROTTLE_NOTICE)
+        try:
+            if audio and session and session.delivery_mode == VOICE:
+                await update.message.reply_voice(voice=audio)
+            else:
+                await update.message.reply_text(THROTTLE_NOTICE)
+        except Exception as e:
+            logger.error(f"Error sending throttle notice: {e}")
+    
+    async def _prerender(self, texts):
+        """Synthesize fixed messages once so sending them costs no TTS call"""
+        for text in [text for text in texts if text not in self.prerendered_audio]:
+            audio = await self.voice_service.synthesize(text)
+            if audio:
+                self.prerendered_audio[text] = audio
+        logger.info(f"Pre-rendered {len(self.prerendered_audio)} fixed voice messages")
+    
+    async def _run_turn(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_message: str):
+        """Process a turn once the fair scheduler grants it a slot, recording its timings"""
+        user_id = update.effective_user.id
+        session = self.user_sessions.get(user_id)
+        step = session.current_step if session else "collecting_data"
+        stt_ms = self._stt_ms.pop(user_id, 0.0)
+        timer = TurnTimer()
+        current_turn.set(timer)
+        queued = time.perf_counter()
+        started = None
+        outcome = "error"
+        try:
+            async with self.scheduler.slot(user_id):
+                started = time.perf_counter()
+                await self._process_message(update, context, user_message)
+                outcome = "error" if timer.failed else "completed"
+        except asyncio.CancelledError:
+            outcome = "superseded"
+            raise
+        finally:
+            finished = time.perf_counter()
+            self.analytics.record_turn(
+                user_id, step,
+                wait_ms=((started or finished) - queued) * 1000,
+                process_ms=(finished - started) * 1000 if started else 0.0,
+                outcome=outcome, stt_ms=stt_ms, llm_ms=timer.llm_ms
+            )
+    
+    @staticmethod
+    async def _llm(awaitable):
+        """Await an LLM call, adding the wait to the current turn's LLM time"""
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            timer = current_turn.get()
+            if timer is not None:
+                timer.llm_ms += (time.perf_counter() - started) * 1000
+    
+    @staticmethod
+    def _turn_failed():
+        """Mark the current turn as answered with an error message"""
+        timer = current_turn.get()
+        if timer is not None:
+            timer.failed = True
+    
+    async def _process_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE, user_message: str):
+        """Route a text (typed or transcribed) through the conversation flow"""
         try:
             user_id = update.effective_user.id
             chat_id = update.effective_chat.id
-            user_message = update.message.text
             
             # Get or create user session
             session = self.get_or_create_session(user_id, chat_id)
             
             logger.info(f"Received message from user {user_id}: {user_message}")
             
-            # Process message based on current step
-            if session.current_step == "collecting_data":
-                await self._handle_data_collection(update, context, session, user_message)
-            elif session.current_step == "service_menu":
-                await self._handle_service_menu(update, context, session, user_message)
-            elif session.current_step == "booking_appointment":
-                await self._handle_appointment_booking(update, context, session, user_message)
-            else:
-                # Default to data collection
-                session.current_step = "collecting_data"
-                await self._handle_data_collection(update, context, session, user_message)
+            # Undo the turn's session changes if newer input supersedes it
+            snapshot = session.to_bytes()
+            
+            # Every provider call made for this update shares one deadline,
+            # so a degraded provider cannot stretch the reply indefinitely
+            with deadline_scope(Config.UPDATE_DEADLINE_SECONDS):
+                # Process message based on current step
+                if session.current_step == "collecting_data":
+                    await self._handle_data_collection(update, context, session, user_message)
+                elif session.current_step == "service_menu":
+                    await self._handle_service_menu(update, context, session, user_message)
+                elif session.current_step == "booking_appointment":
+                    await self._handle_appointment_booking(update, context, session, user_message)
+                else:
+                    # Default to data collection
+                    session.current_step = "collecting_data"
+                    await self._handle_data_collection(update, context, session, user_message)
                 
+        except asyncio.CancelledError:
+            # Superseded before replying: the merged turn starts from the saved state
+            session.restore(snapshot)
+            raise
         except Exception as e:
             logger.error(f"Error handling message: {e}")
+            self._turn_failed()
             await self._send_voice_response(
                 update, 
                 "Mi dispiace, c'è stato un errore. Puoi riprovare per favore?"
@@ -70,39 +271,90 @@ class TelegramBotHandler:
     async def _handle_data_collection(self, update: Update, context: ContextTypes.DEFAULT_TYPE, 
                                     session: UserSession, user_message: str):
         """Handle user data collection phase"""
+        # Replies follow the questionnaire script: answers to the question just
+        # asked are parsed locally, the LLM extractor handles free-form answers
+        # and gpt-4 only replies to off-script input
+        step = session.current_step
+        asked = first_missing(session.user_data)
+        values = parse_answer(asked, user_message) if asked else {}
+        extraction = speculative_reply = None
+        completed = False
+        
         try:
-            # Extract data from user message using AI
-            extracted_data = self.openai_service.extract_user_data(
-                user_message, 
-                session.user_data.dict(exclude_none=True)
-            )
+            if asked not in values:
+                # A question is probably off-script: draft the gpt-4 reply alongside the extraction
+                if '?' in user_message:
+                    messages = self.openai_service.build_messages(user_message, session)
+                    speculative_reply = asyncio.create_task(self.openai_service.complete_chat(messages))
+                extraction = asyncio.create_task(self.openai_service.extract_user_data(
+                    user_message, 
+                    session.user_data.to_dict()
+                ))
+                extracted_data = await self._llm(extraction)
+                values = {**extracted_data, **values}
             
-            # Update user data with extracted information
-            for field, value in extracted_data.items():
-                if hasattr(session.user_data, field) and value:
-                    try:
-                        setattr(session.user_data, field, value)
-                    except ValueError as e:
-                        # Validation error - inform user
-                        await self._send_voice_response(update, str(e))
-                        return
+            saved, invalid_field = self._apply_user_data(session, values)
             
-            # Check if data collection is complete
-            if session.user_data.is_complete():
-                session.current_step = "service_menu"
-                response = await self.openai_service.get_response(user_message, session)
+            # The draft was written for this step and question: it stays valid
+            # unless the extraction moved the conversation on
+            draft_valid = (speculative_reply is not None and session.current_step == step
+                           and first_missing(session.user_data) == asked)
+            
+            if invalid_field:
+                response = invalid_reply(invalid_field)
+            elif draft_valid:
+                response = await self._llm(speculative_reply)
+            elif saved:
+                if session.user_data.is_complete():
+                    session.current_step = "service_menu"
+                    completed = True
+                # Ask again, differently, if the answer skipped the asked field
+                response = next_reply(session.user_data, repeated=first_missing(session.user_data) == asked)
             else:
-                # Continue collecting missing data
-                response = await self.openai_service.get_response(user_message, session)
+                # Off-script input: let the LLM answer and steer back
+                response = await self._llm(self.openai_service.complete_chat(
+                    self.openai_service.build_messages(user_message, session)
+                ))
             
+            self.openai_service.record_exchange(session, user_message, response)
             await self._send_voice_response(update, response)
             
+            # Recorded once the reply is out: a superseded turn is replayed
+            if completed:
+                self.analytics.record_session(session.user_id, session.user_data.paese_cap,
+                                              len(session.conversation_history), session.delivery_mode)
+            
         except Exception as e:
             logger.error(f"Error in data collection: {e}")
+            self._turn_failed()
             await self._send_voice_response(
                 update, 
                 "Mi dispiace, non ho capito bene. Puoi ripetere i tuoi dati?"
             )
+        finally:
+            for task in (extraction, speculative_reply):
+                if task is not None:
+                    self._cancel_task(task)
+    
+    @staticmethod
+    def _apply_user_data(session: UserSession, values: Dict) -> Tuple[int, Optional[str]]:
+        """Store new field values; return how many changed and the first invalid field"""
+        saved = 0
+        invalid_field = None
+        for field, value in values.items():
+            if field not in REQUIRED_FIELDS or not value:
+                continue
+            value = clean_value(field, str(value))
+            if getattr(session.user_data, field) == value:
+                continue
+            try:
+                # Assignment validates phone and email formats
+                setattr(session.user_data, field, value)
+                saved += 1
+            except ValueError as e:
+                logger.info(f"Rejected {field} from user {session.user_id}: {e}")
+                invalid_field = invalid_field or field
+        return saved, invalid_field
     
     async def _handle_service_menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
                                  session: UserSession, user_message: str):
@@ -115,11 +367,12 @@ class TelegramBotHandler:
                 session.appointment_request = AppointmentRequest(user_data=session.user_data)
             
             # Get AI response
-            response = await self.openai_service.get_response(user_message, session)
+            response = await self._llm(self.openai_service.get_response(user_message, session))
             await self._send_voice_response(update, response)
             
         except Exception as e:
             logger.error(f"Error in service menu: {e}")
+            self._turn_failed()
             await self._send_voice_response(
                 update, 
                 "Cosa posso fare per te? Supporto tecnico o prenotazione appuntamento?"
@@ -131,9 +384,15 @@ class TelegramBotHandler:
         try:
             appointment_req = session.appointment_request
             
-            # Extract appointment information using AI
-            response = await self.openai_service.get_response(user_message, session)
+            # The user may be answering a previous slot proposal
+            if appointment_req.proposed_slots:
+                chosen_slot = self._match_proposed_slot(user_message, appointment_req.proposed_slots)
+                if chosen_slot:
+                    appointment_req.data_preferita, appointment_req.ora_preferita = chosen_slot
+                    appointment_req.proposed_slots = []
             
+            # Local parsing runs first: when it completes the request the reply
+            # depends only on the booking result, so no LLM call is made at all
             # Check for date information
             if not appointment_req.data_preferita:
                 date_match = self._extract_date(user_message)
@@ -152,152 +411,315 @@ class TelegramBotHandler:
             
             # If all appointment data is collected, try to book
             if appointment_req.is_complete():
-                success = await self._book_appointment(appointment_req)
-                if success:
-                    response = "Perfetto! Il tuo appuntamento è stato confermato. Riceverai una email di conferma a breve."
-                    session.current_step = "service_menu"  # Return to service menu
-                else:
-                    response = "Mi dispiace, non sono riuscito a prenotare l'appuntamento. Vuoi provare con un'altra data o ora?"
+                # Calendar insertion runs as a durable job that replies with the outcome;
+                # a repeated confirmation of a queued or booked slot gets no second reply
+                if not await self._enqueue_booking(session, appointment_req):
+                    logger.info(f"Booking for user {session.user_id} already queued or confirmed")
+                    return
+                response = "Perfetto, sto verificando la disponibilità e prenoto il tuo appuntamento. Ti confermo tra un attimo."
+                self.openai_service.record_exchange(session, user_message, response)
+            else:
+                # Still missing information - let the AI guide the user
+                response = await self._llm(self.openai_service.get_response(user_message, session))
             
             await self._send_voice_response(update, response)
             
         except Exception as e:
             logger.error(f"Error in appointment booking: {e}")
+            self._turn_failed()
             await self._send_voice_response(
                 update, 
                 "C'è stato un problema con la prenotazione. Puoi riprovare?"
             )
     
-    def _extract_date(self, text: str) -> Optional[str]:
-        """Extract date from text message"""
-        # Simple date extraction patterns
-        patterns = [
-            r'(\d{1,2})[\/\-](\d{1,2})[\/\-](\d{4})',  # DD/MM/YYYY or DD-MM-YYYY
-            r'(\d{4})[\/\-](\d{1,2})[\/\-](\d{1,2})',  # YYYY/MM/DD or YYYY-MM-DD
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text)
-            if match:
-                groups = match.groups()
-                if len(groups) == 3:
-                    try:
-                        # Try different date formats
-                        if int(groups[0]) > 31:  # Likely YYYY-MM-DD
-                            date = datetime.strptime(f"{groups[0]}-{groups[1]}-{groups[2]}", "%Y-%m-%d")
-                        else:  # Likely DD/MM/YYYY
-                            date = datetime.strptime(f"{groups[2]}-{groups[1]}-{groups[0]}", "%Y-%m-%d")
-                        return date.strftime("%Y-%m-%d")
-                    except ValueError:
-                        continue
+    async def _propose_alternatives(self, appointment_req: AppointmentRequest) -> str:
+        """Offer the nearest free slots after a failed booking attempt"""
+        proposals = await self.calendar_service.propose_slots(
+            appointment_req.data_preferita,
+            appointment_req.ora_preferita,
+            paese_cap=appointment_req.user_data.paese_cap
+        )
+        
+        # The requested slot is gone - wait for a new choice
+        appointment_req.data_preferita = None
+        appointment_req.ora_preferita = None
+        appointment_req.proposed_slots = proposals
+        
+        if not proposals:
+            return "Mi dispiace, non sono riuscito a prenotare l'appuntamento. Vuoi provare con un'altra data o ora?"
+        
+        options = "; ".join(
+            f"{index}) {format_slot(date_str, time_str)}"
+            for index, (date_str, time_str) in enumerate(proposals, start=1)
+        )
+        return f"Mi dispiace, quell'orario non è disponibile. Posso proporti: {options}. Quale preferisci?"
+    
+    def _match_proposed_slot(self, text: str, proposals: list) -> Optional[tuple]:
+        """Match the user's answer to one of the proposed slots"""
+        # An explicit time picks the proposal at that time
+        time_match = self._extract_time(text)
+        if time_match:
+            matching = [slot for slot in proposals if slot[1] == time_match]
+            date_match = self._extract_date(text)
+            if date_match:
+                matching = [slot for slot in matching if slot[0] == date_match]
+            if len(matching) == 1:
+                return tuple(matching[0])
+        
+        # Otherwise a position: numbers only as the whole reply ("ho 2 domande" is
+        # not a choice), "prima" only after an article ("prima possibile?" is not either)
+        index = None
+        reply = _SLOT_REPLY.match(text.strip())
+        if reply:
+            article, word = reply.group(1), reply.group(2).lower()
+            if word.isdigit():
+                index = int(word) - 1
+            elif word != 'prima' or article:
+                index = SLOT_CHOICE_WORDS.get(word)
+        else:
+            ordinal = _SLOT_ORDINAL.search(text)
+            if ordinal:
+                index = SLOT_CHOICE_WORDS[ordinal.group(1).lower()]
         
+        if index is not None and 0 <= index < len(proposals):
+            return tuple(proposals[index])
         return None
     
+    def _extract_date(self, text: str) -> Optional[str]:
+        """Extract date from text message"""
+        return parse_date(text)
+    
     def _extract_time(self, text: str) -> Optional[str]:
         """Extract time from text message"""
-        # Time extraction patterns
-        patterns = [
-            r'(\d{1,2}):(\d{2})',  # HH:MM
-            r'(\d{1,2})\s*(am|pm)',  # H AM/PM
-            r'alle\s*(\d{1,2})',  # "alle 14"
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text.lower())
-            if match:
-                if len(match.groups()) >= 2 and match.group(2).isdigit():
-                    # HH:MM format
-                    hour = int(match.group(1))
-                    minute = int(match.group(2))
-                    if 0 <= hour <= 23 and 0 <= minute <= 59:
-                        return f"{hour:02d}:{minute:02d}"
-                else:
-                    # Hour only
-                    hour = int(match.group(1))
-                    if 0 <= hour <= 23:
-                        return f"{hour:02d}:00"
+        return parse_time(text)
+    
+    @staticmethod
+    def _cancel_task(task: asyncio.Task):
+        """Cancel a speculative task whose result is no longer needed"""
+        if not task.done():
+            task.cancel()
+    
+    def _booking_key(self, appointment_request: AppointmentRequest) -> str:
+        """Idempotency key of a booking: same customer and slot, same booking"""
+        return self.calendar_service.booking_key(appointment_request)
+    
+    async def _enqueue_booking(self, session: UserSession, appointment_request: AppointmentRequest) -> bool:
+        """Persist the booking as a job so it survives crashes and redeploys; False if nothing was queued"""
+        idempotency_key = self._booking_key(appointment_request)
+        if self.calendar_service.reservations.completed(idempotency_key) is not None:
+            return False
         
-        return None
+        self.coalescer.commit()  # A queued booking cannot be taken back
+        job_id = await self.job_queue.enqueue('book_appointment', {
+            'user_id': session.user_id,
+            'chat_id': session.chat_id,
+            'user_data': appointment_request.user_data.to_dict(),
+            'data_preferita': appointment_request.data_preferita,
+            'ora_preferita': appointment_request.ora_preferita,
+            'motivo': appointment_request.motivo,
+            'idempotency_key': idempotency_key,
+        }, dedupe_key=f"booking:{idempotency_key}", order_key=str(session.chat_id))
+        return job_id is not None
+    
+    async def _run_booking_job(self, payload: Dict):
+        """Book the appointment in Google Calendar and tell the user the outcome"""
+        appointment_request = AppointmentRequest(
+            user_data=UserData(**payload['user_data']),
+            data_preferita=payload['data_preferita'],
+            ora_preferita=payload['ora_preferita'],
+            motivo=payload['motivo']
+        )
+        
+        # API errors propagate so the queue retries; the idempotency key
+        # guarantees a retry never creates a second event
+        booking = await self.calendar_service.book_appointment(appointment_request, payload['idempotency_key'])
+        self.analytics.record_booking(
+            payload['user_id'], appointment_request.user_data.paese_cap, appointment_request.data_preferita,
+            appointment_request.ora_preferita, "booked" if booking is not None else "unavailable"
+        )
+        
+        session = self.user_sessions.get(payload['user_id'])
+        if booking is not None:
+            # Cancelling or moving the appointment later needs both ids
+            logger.info(f"Booked event {booking.event_id} on calendar {booking.calendar_id}")
+            response = "Perfetto! Il tuo appuntamento è stato confermato. Riceverai una email di conferma a breve."
+            if session:
+                session.current_step = "service_menu"  # Return to service menu
+        else:
+            if session and session.appointment_request:
+                appointment_request = session.appointment_request
+            response = await self._propose_alternatives(appointment_request)
+        
+        if session:
+            session.conversation_history.append({"role": "assistant", "content": response})
+        await self._deliver(payload['chat_id'], response, session)
     
-    async def _book_appointment(self, appointment_request: AppointmentRequest) -> bool:
-        """Book the appointment in Google Calendar"""
+    async def _booking_failed(self, payload: Dict, error: str):
+        """Tell the user a booking could not be completed after every retry"""
+        self.analytics.record_booking(
+            payload['user_id'], payload['user_data'].get('paese_cap'), payload['data_preferita'],
+            payload['ora_preferita'], "failed"
+        )
+        response = ("Mi dispiace, non sono riuscito a registrare il tuo appuntamento per un problema tecnico. "
+                    "Riprova tra qualche minuto oppure contattaci direttamente.")
+        session = self.user_sessions.get(payload['user_id'])
+        if session:
+            session.conversation_history.append({"role": "assistant", "content": response})
+        await self._deliver(payload['chat_id'], response, session)
+    
+    async def _send_voice_response(self, update: Update, text: str):
+        """Send a reply to the user according to the delivery policy"""
+        self.coalescer.commit()  # Once the reply goes out, newer input starts a new turn
+        await self._deliver(update.effective_chat.id, text, self.user_sessions.get(update.effective_user.id))
+    
+    async def _deliver(self, chat_id: int, text: str, session: Optional[UserSession] = None):
+        """Send the text part inline and queue the voice note for the workers"""
+        mode = self.delivery_policy.decide(
+            text,
+            step=session.current_step if session else None,
+            user_mode=session.delivery_mode if session else None
+        )
+        
         try:
-            # Check availability first
-            is_available = await self.calendar_service.check_availability(
-                appointment_request.data_preferita,
-                appointment_request.ora_preferita
-            )
-            
-            if not is_available:
-                return False
+            if mode in (TEXT, TEXT_FIRST):
+                # The user reads the reply while the voice note is synthesized
+                await self.bot.send_message(chat_id=chat_id, text=text)
+            if mode != TEXT:
+                # Ordered per chat so voice notes arrive in the order they were written;
+                # a key of their own keeps a voice note in backoff from holding up bookings
+                await self.job_queue.enqueue('voice_reply', {
+                    'chat_id': chat_id,
+                    'text': text,
+                    'caption': "🎵 Risposta vocale" if mode == VOICE else None,
+                    'fallback': mode == VOICE,  # Text was not sent yet
+                }, order_key=f"voice:{chat_id}")
+                
+        except Exception as e:
+            logger.error(f"Error sending response: {e}")
+            if mode == VOICE:
+                # Fallback to text
+                try:
+                    await self.bot.send_message(chat_id=chat_id, text=f"🔊 {text}\n\n⚠️ Errore nel servizio vocale")
+                except Exception as fallback_error:
+                    logger.error(f"Even text fallback failed: {fallback_error}")
+    
+    async def _run_voice_reply_job(self, payload: Dict):
+        """Synthesize and upload a voice note; upload errors propagate for retry"""
+        chat_id = payload['chat_id']
+        text = payload['text']
+        logger.info(f"Attempting to send voice response to chat {chat_id}")
+        
+        # Fixed replies (questionnaire, notices) skip synthesis entirely
+        started = time.perf_counter()
+        audio = self.prerendered_audio.get(text)
+        if audio is not None:
+            await self.bot.send_voice(chat_id=chat_id, voice=audio, caption=payload.get('caption'))
+            self.analytics.record_voice_reply(chat_id, len(text), 0.0, (time.perf_counter() - started) * 1000,
+                                              "prerendered")
+            logger.info("Pre-rendered voice response sent")
+            return
+        
+        # Generate voice response
+        voice_file_path = await self.voice_service.generate_voice_response(text, chat_id)
+        synthesized = time.perf_counter()
+        
+        if not voice_file_path:
+            self.analytics.record_voice_reply(chat_id, len(text), (synthesized - started) * 1000, 0.0,
+                                              "synthesis_failed")
+            if not payload.get('fallback'):
+                logger.warning("Voice generation failed, text reply already sent")
+                return
             
-            # Create appointment
-            event_link = await self.calendar_service.create_appointment(appointment_request)
-            return event_link is not None
+            logger.warning("Voice generation failed, sending text fallback")
+            # Check if it's an API key issue
+            if not hasattr(self.voice_service, 'api_key_valid') or not self.voice_service.api_key_valid:
+                fallback_message = f"🔊 {text}\n\n⚠️ Servizio vocale temporaneamente non disponibile (problema configurazione)"
+            else:
+                fallback_message = f"🔊 {text}\n\n⚠️ Servizio vocale temporaneamente non disponibile"
             
+            # Fallback to text message if voice generation fails
+            await self.bot.send_message(chat_id=chat_id, text=fallback_message)
+            return
+        
+        logger.info(f"Voice file generated: {voice_file_path}")
+        try:
+            # Send voice message
+            with open(voice_file_path, 'rb') as audio_file:
+                await self.bot.send_voice(chat_id=chat_id, voice=audio_file, caption=payload.get('caption'))
+        finally:
+            # Clean up temporary file
+            self.voice_service.cleanup_audio_file(voice_file_path)
+        self.analytics.record_voice_reply(chat_id, len(text), (synthesized - started) * 1000,
+                                          (time.perf_counter() - synthesized) * 1000, "sent")
+        
+        logger.info("Voice response sent successfully")
+    
+    async def _voice_reply_failed(self, payload: Dict, error: str):
+        """Send the reply as text when its voice note could not be delivered at all"""
+        if not payload.get('fallback'):
+            return  # The text part already went out
+        await self.bot.send_message(
+            chat_id=payload['chat_id'], text=f"🔊 {payload['text']}\n\n⚠️ Errore nel servizio vocale"
+        )
+    
+    async def start_background_work(self, bot):
+        """Restore the last snapshot, attach the bot and start the outbound queue workers"""
+        self.bot = bot
+        try:
+            # Before the workers start: recovered jobs look sessions up
+            sessions, audio = load_snapshot()
+            self.user_sessions.update(sessions)
+            self.prerendered_audio.update(audio)
         except Exception as e:
-            logger.error(f"Error booking appointment: {e}")
-            return False
+            logger.error(f"Error restoring session snapshot: {e}")
+        await self.analytics.start()
+        await self.job_queue.start()
+        # Rendered in the background so startup does not wait for TTS
+        self._prerender_task = asyncio.create_task(self._prerender([THROTTLE_NOTICE, WELCOME_MESSAGE, *all_phrases()]))
     
-    async def _send_voice_response(self, update: Update, text: str):
-        """Send voice response to user"""
+    async def drain(self, timeout: float):
+        """Finish in-flight turns and running jobs, for up to timeout seconds in total"""
+        started = time.monotonic()
+        cut_off = await self.coalescer.drain(timeout)
+        if cut_off:
+            logger.warning(f"Shutdown cut off {cut_off} unfinished turns")
+        await self.job_queue.stop(max(0.0, timeout - (time.monotonic() - started)))
+        logger.info(f"Drained in-flight work in {time.monotonic() - started:.1f}s")
+    
+    async def stop_background_work(self):
+        """Stop the outbound queue workers and snapshot sessions for the next start"""
+        if self._prerender_task is not None:
+            self._cancel_task(self._prerender_task)
+        await self.job_queue.stop()  # No-op when drain() already stopped it
+        await self.analytics.stop()
         try:
-            user_id = update.effective_user.id
-            logger.info(f"Attempting to send voice response to user {user_id}")
-            
-            # Generate voice response
-            voice_file_path = await self.voice_service.generate_voice_response(text, user_id)
-            
-            if voice_file_path:
-                logger.info(f"Voice file generated: {voice_file_path}")
-                # Send voice message
-                with open(voice_file_path, 'rb') as audio_file:
-                    await update.message.reply_voice(
-                        voice=audio_file,
-                        caption="🎵 Risposta vocale"
-                    )
-                
-                # Clean up temporary file
-                self.voice_service.cleanup_audio_file(voice_file_path)
-                logger.info("Voice response sent successfully")
-            else:
-                logger.warning("Voice generation failed, sending text fallback")
-                # Check if it's an API key issue
-                if not hasattr(self.voice_service, 'api_key_valid') or not self.voice_service.api_key_valid:
-                    fallback_message = f"🔊 {text}\n\n⚠️ Servizio vocale temporaneamente non disponibile (problema configurazione)"
-                else:
-                    fallback_message = f"🔊 {text}\n\n⚠️ Servizio vocale temporaneamente non disponibile"
-                
-                # Fallback to text message if voice generation fails
-                await update.message.reply_text(fallback_message)
-                
+            # Serializing and fsyncing thousands of sessions would block the loop
+            await asyncio.get_running_loop().run_in_executor(
+                None, save_snapshot, list(self.user_sessions.values()), dict(self.prerendered_audio)
+            )
         except Exception as e:
-            logger.error(f"Error sending voice response: {e}")
-            # Fallback to text
-            try:
-                await update.message.reply_text(f"🔊 {text}\n\n⚠️ Errore nel servizio vocale")
-            except Exception as fallback_error:
-                logger.error(f"Even text fallback failed: {fallback_error}")
+            logger.error(f"Error saving session snapshot: {e}")
     
     async def handle_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /start command"""
         user_id = update.effective_user.id
         chat_id = update.effective_chat.id
         
-        # Reset or create new session
+        # Every /start costs a voice reply, so it counts against the limits too
+        if not await self._admit(update):
+            return
+        
+        # Reset or create new session, keeping the delivery preference
+        self.coalescer.discard(user_id)
+        previous = self.user_sessions.get(user_id)
         self.user_sessions[user_id] = UserSession(
             user_id=user_id,
             chat_id=chat_id,
-            current_step="collecting_data"
+            current_step="collecting_data",
+            delivery_mode=previous.delivery_mode if previous else None
         )
         
-        welcome_message = """Ciao! Sono l'assistente vocale del servizio clienti.
-
-Per poterti aiutare al meglio, ho bisogno di raccogliere alcune informazioni personali. 
-
-Iniziamo: come ti chiami?"""
-        
-        await self._send_voice_response(update, welcome_message)
+        await self._send_voice_response(update, WELCOME_MESSAGE)
     
     async def handle_help(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /help command"""
@@ -308,4 +730,20 @@ Iniziamo: come ti chiami?"""
 
 Parlami dei tuoi problemi o dimmi se vuoi prenotare un appuntamento!"""
         
-        await self._send_voice_response(update, help_message) 
\ No newline at end of file
+        await self._send_voice_response(update, help_message)
+    
+    async def handle_delivery_mode(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle /modalita command: choose voice, text or both"""
+        user_id = update.effective_user.id
+        chat_id = update.effective_chat.id
+        session = self.get_or_create_session(user_id, chat_id)
+        
+        choice = context.args[0].lower() if context.args else None
+        if choice not in USER_MODE_NAMES:
+            await update.message.reply_text(
+                "Scegli come ricevere le risposte: /modalita voce, /modalita testo oppure /modalita entrambi"
+            )
+            return
+        
+        session.delivery_mode = USER_MODE_NAMES[choice]
+        await update.message.reply_text(f"Perfetto, da ora ricevi le risposte in modalità: {choice}")
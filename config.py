@@ -19,6 +19,88 @@ class Config:
     # Google Calendar Configuration
     GOOGLE_CREDENTIALS_JSON = os.getenv('GOOGLE_CREDENTIALS_JSON')
     CALENDAR_ID = os.getenv('CALENDAR_ID')
+    # Technician calendars by postcode prefix, as JSON; defaults to CALENDAR_ID alone
+    CALENDAR_POOL = os.getenv('CALENDAR_POOL')
+    TIMEZONE = os.getenv('TIMEZONE', 'Europe/Zurich')
+    
+    # Appointment slot proposals
+    BUSINESS_HOUR_START = int(os.getenv('BUSINESS_HOUR_START', '9'))
+    BUSINESS_HOUR_END = int(os.getenv('BUSINESS_HOUR_END', '17'))
+    SLOT_STEP_MINUTES = int(os.getenv('SLOT_STEP_MINUTES', '30'))
+    SLOT_SEARCH_DAYS = int(os.getenv('SLOT_SEARCH_DAYS', '3'))
+    SLOT_PROPOSALS = int(os.getenv('SLOT_PROPOSALS', '3'))
+    SLOT_HOLD_SECONDS = int(os.getenv('SLOT_HOLD_SECONDS', '120'))
+    
+    # HTTP connection pools shared by provider clients
+    HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '20'))
+    HTTP_KEEPALIVE_SECONDS = float(os.getenv('HTTP_KEEPALIVE_SECONDS', '60'))
+    HTTP2_ENABLED = os.getenv('HTTP2_ENABLED', 'true').lower() == 'true'
+    GOOGLE_HTTP_POOL_SIZE = int(os.getenv('GOOGLE_HTTP_POOL_SIZE', '8'))
+    
+    # Resilience: deadlines, per-call timeouts and circuit breakers
+    UPDATE_DEADLINE_SECONDS = float(os.getenv('UPDATE_DEADLINE_SECONDS', '45'))
+    OPENAI_TIMEOUT_SECONDS = float(os.getenv('OPENAI_TIMEOUT_SECONDS', '20'))
+    TTS_TIMEOUT_SECONDS = float(os.getenv('TTS_TIMEOUT_SECONDS', '20'))
+    CALENDAR_TIMEOUT_SECONDS = float(os.getenv('CALENDAR_TIMEOUT_SECONDS', '15'))
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', '5'))
+    CIRCUIT_RESET_SECONDS = float(os.getenv('CIRCUIT_RESET_SECONDS', '30'))
+    TTS_HEDGING = os.getenv('TTS_HEDGING', 'true').lower() == 'true'
+    TTS_HEDGE_PERCENTILE = float(os.getenv('TTS_HEDGE_PERCENTILE', '95'))
+    TTS_CHUNK_CHARS = int(os.getenv('TTS_CHUNK_CHARS', '400'))  # Long replies are synthesized in chunks
+    TTS_CONCURRENCY = int(os.getenv('TTS_CONCURRENCY', '3'))  # Chunks synthesized in parallel per reply
+    
+    # Speech-to-text for incoming voice messages
+    STT_BACKEND = os.getenv('STT_BACKEND', 'whisper_api')  # whisper_api or local
+    STT_LOCAL_MODEL = os.getenv('STT_LOCAL_MODEL', 'small')
+    STT_WORKERS = int(os.getenv('STT_WORKERS', '2'))
+    STT_TIMEOUT_SECONDS = float(os.getenv('STT_TIMEOUT_SECONDS', '30'))
+    STT_MAX_DURATION_SECONDS = int(os.getenv('STT_MAX_DURATION_SECONDS', '120'))
+    
+    # Reply delivery: voice, text_first or text (per-step overrides as JSON)
+    DELIVERY_MODE = os.getenv('DELIVERY_MODE', 'text_first')
+    DELIVERY_MODE_BY_STEP = os.getenv('DELIVERY_MODE_BY_STEP', '{}')
+    # Long replies are synthesized in TTS_CHUNK_CHARS chunks; this only caps cost (0 = no cap)
+    VOICE_MAX_CHARS = int(os.getenv('VOICE_MAX_CHARS', '2000'))
+    
+    # Flood protection: token buckets per user and per chat, global turn concurrency
+    RATE_LIMIT_USER_PER_MINUTE = float(os.getenv('RATE_LIMIT_USER_PER_MINUTE', '20'))
+    RATE_LIMIT_USER_BURST = int(os.getenv('RATE_LIMIT_USER_BURST', '6'))
+    RATE_LIMIT_CHAT_PER_MINUTE = float(os.getenv('RATE_LIMIT_CHAT_PER_MINUTE', '60'))
+    RATE_LIMIT_CHAT_BURST = int(os.getenv('RATE_LIMIT_CHAT_BURST', '15'))
+    THROTTLE_NOTICE_SECONDS = float(os.getenv('THROTTLE_NOTICE_SECONDS', '60'))
+    TURN_CONCURRENCY = int(os.getenv('TURN_CONCURRENCY', '16'))
+    
+    # Messages from one user arriving within this window are answered together
+    INBOUND_DEBOUNCE_SECONDS = float(os.getenv('INBOUND_DEBOUNCE_SECONDS', '1.5'))
+    
+    # Conversation context: unsummarized turns verbatim, older ones in a rolling summary;
+    # past SUMMARIZE_AFTER messages all but the RECENT ones are folded into the summary
+    HISTORY_RECENT_MESSAGES = int(os.getenv('HISTORY_RECENT_MESSAGES', '6'))
+    HISTORY_SUMMARIZE_AFTER = int(os.getenv('HISTORY_SUMMARIZE_AFTER', '12'))
+    SUMMARY_MODEL = os.getenv('SUMMARY_MODEL', 'gpt-3.5-turbo')
+    
+    # Durable outbound job queue (voice replies, calendar bookings)
+    JOB_QUEUE_PATH = os.getenv('JOB_QUEUE_PATH', 'data/jobs.db')
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', '4'))
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '5'))
+    JOB_POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', '1'))
+    
+    # Graceful restart: in-flight work drained on stop, sessions carried over to the next start
+    SHUTDOWN_DRAIN_SECONDS = float(os.getenv('SHUTDOWN_DRAIN_SECONDS', '20'))
+    SESSION_SNAPSHOT_PATH = os.getenv('SESSION_SNAPSHOT_PATH', 'data/sessions.snapshot')
+    
+    # Analytics store read by export.py (turn timings, completed sessions, bookings)
+    ANALYTICS_PATH = os.getenv('ANALYTICS_PATH', 'data/analytics.db')
+    ANALYTICS_FLUSH_SECONDS = float(os.getenv('ANALYTICS_FLUSH_SECONDS', '5'))
+    
+    # Event-loop health: lag sampling and blocked-loop detection
+    LOOP_MONITOR_INTERVAL = float(os.getenv('LOOP_MONITOR_INTERVAL', '0.5'))
+    LOOP_STALL_THRESHOLD_MS = float(os.getenv('LOOP_STALL_THRESHOLD_MS', '200'))
+    
+    # Admin endpoints on the health server (profiling); disabled without a token
+    ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+    PROFILE_MAX_SECONDS = float(os.getenv('PROFILE_MAX_SECONDS', '60'))
+    TRACEMALLOC_AT_STARTUP = os.getenv('TRACEMALLOC_AT_STARTUP', 'false').lower() == 'true'
     
     # Validate required environment variables
     @classmethod
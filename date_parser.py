@@ -0,0 +1,238 @@
+import re
+from datetime import date, datetime, timedelta
+from typing import Optional
+from zoneinfo import ZoneInfo
+from config import Config
+
+# Italian date/time parsing for booking messages.
+# All patterns are compiled once at import; each call lowercases and strips
+# accents a single time and then runs the patterns on the normalized text.
+
+ITALIAN_WEEKDAYS = ['lunedì', 'martedì', 'mercoledì', 'giovedì', 'venerdì', 'sabato', 'domenica']
+ITALIAN_MONTHS = ['gennaio', 'febbraio', 'marzo', 'aprile', 'maggio', 'giugno', 'luglio',
+                  'agosto', 'settembre', 'ottobre', 'novembre', 'dicembre']
+
+_TIMEZONE = ZoneInfo(Config.TIMEZONE)
+_ACCENTS = str.maketrans('àèéìíòóù', 'aeeiioou')
+
+_WEEKDAY_INDEX = {name.translate(_ACCENTS): index for index, name in enumerate(ITALIAN_WEEKDAYS)}
+_MONTH_INDEX = {name: index + 1 for index, name in enumerate(ITALIAN_MONTHS)}
+
+_NUMBER_WORDS = {
+    'un': 1, 'uno': 1, 'una': 1, 'due': 2, 'tre': 3, 'quattro': 4, 'cinque': 5, 'sei': 6,
+    'sette': 7, 'otto': 8, 'nove': 9, 'dieci': 10, 'undici': 11, 'dodici': 12,
+    'tredici': 13, 'quattordici': 14, 'quindici': 15, 'sedici': 16, 'diciassette': 17,
+    'diciotto': 18, 'diciannove': 19, 'venti': 20, 'ventuno': 21, 'ventidue': 22,
+    'ventitre': 23, 'trenta': 30, 'quaranta': 40, 'cinquanta': 50, 'primo': 1,
+}
+_NUMBER = r'(\d{1,2}|' + '|'.join(sorted(_NUMBER_WORDS, key=len, reverse=True)) + r')'
+# Minutes as words skip "un/una/primo" so "alle 10 e una visita" is not 10:01
+_MINUTE_WORDS = '(' + '|'.join(sorted((word for word, value in _NUMBER_WORDS.items() if value > 1),
+                                      key=len, reverse=True)) + ')'
+_WEEKDAY = '(' + '|'.join(_WEEKDAY_INDEX) + ')'
+_MONTH = '(' + '|'.join(_MONTH_INDEX) + ')'
+
+# Dates
+_ISO_DATE = re.compile(r'\b(\d{4})[/\-.](\d{1,2})[/\-.](\d{1,2})\b')
+_NUMERIC_DATE = re.compile(r'\b(\d{1,2})[/\-.](\d{1,2})[/\-.](\d{4}|\d{2})\b')
+_SHORT_DATE = re.compile(r'\b(\d{1,2})/(\d{1,2})\b(?![/\-.]\d)')
+_TEXT_DATE = re.compile(r'\b(\d{1,2}|primo)(?:°|o)?\s+(?:di\s+)?' + _MONTH + r'(?:\s+(\d{4}))?\b')
+_RELATIVE_DAY = re.compile(r'\b(dopodomani|domani|oggi)\b')
+_IN_DAYS = re.compile(r'\b(?:tra|fra)\s+' + _NUMBER + r'\s+(giorn[oi]|settiman[ae])\b')
+_NEXT_WEEK_DAY = re.compile(r'\b' + _WEEKDAY + r'\s+(?:della|la)\s+(?:prossima\s+settimana|settimana\s+prossima)\b')
+_WEEKDAY_DATE = re.compile(r'\b' + _WEEKDAY + r'\b')
+_NEXT_WEEK = re.compile(r'\b(?:prossima\s+settimana|settimana\s+prossima)\b')
+
+# Times
+_CLOCK_TIME = re.compile(r'(?<![\d./\-])(\d{1,2})([:.h])([0-5]\d)(?![\d./\-])')
+# "3.50 franchi" or "chf 3.50" is a price, not 03:50
+_CURRENCY_AFTER = re.compile(r'\s*(?:chf|fr\b|fr\.|franc[hio]|euro|eur\b|€|\$|%)')
+_CURRENCY_BEFORE = re.compile(r'(?:chf|fr\.?|euro|eur|€|\$)\s*$')
+_AMPM_TIME = re.compile(r'\b(\d{1,2})\s*(am|pm)\b')
+_SPOKEN_TIME = re.compile(
+    r'\b(?:alle|all|verso\s+le|per\s+le|ore|dalle)\s*\'?\s*' + _NUMBER +
+    r'(?:\s+(e\s+mezz[ao]|e\s+un\s+quarto|e\s+tre\s+quarti|meno\s+un\s+quarto|e\s+(\d{1,2})|e\s+' +
+    _MINUTE_WORDS + r'))?\b'
+)
+_HOUR_SUFFIX_TIME = re.compile(r'\b(\d{1,2})\s*h\b')
+_NOON = re.compile(r'\b(mezzogiorno|mezzanotte)\b')
+_AFTERNOON = re.compile(r'\b(pomeriggio|sera|stasera)\b')
+_MORNING = re.compile(r'\b(mattin[ao]|mattino|stamattina)\b')
+
+# Without "di mattina" an hour up to this is read as afternoon ("alle tre" -> 15:00),
+# but only while that falls within business hours ("alle sette" is left unanswered)
+_AFTERNOON_HOUR_LIMIT = 7
+
+
+def normalize(text: str) -> str:
+    """Lowercase and strip accents once so every pattern sees the same text"""
+    return text.lower().translate(_ACCENTS)
+
+
+def _number(token: str) -> Optional[int]:
+    """Convert a digit string or Italian number word"""
+    if token.isdigit():
+        return int(token)
+    return _NUMBER_WORDS.get(token)
+
+
+def _today(now: Optional[datetime]) -> date:
+    """Return today's date in the booking timezone"""
+    return (now or datetime.now(_TIMEZONE)).astimezone(_TIMEZONE).date()
+
+
+def _build_date(year: int, month: int, day: int) -> Optional[date]:
+    """Build a date, returning None for impossible values"""
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _next_year_if_past(candidate: Optional[date], today: date) -> Optional[date]:
+    """Move a date without an explicit year to next year once it has passed"""
+    if candidate and candidate < today:
+        return _build_date(candidate.year + 1, candidate.month, candidate.day)
+    return candidate
+
+
+def parse_date(text: str, now: Optional[datetime] = None) -> Optional[str]:
+    """Extract a date from Italian text and return it as YYYY-MM-DD"""
+    normalized = normalize(text)
+    today = _today(now)
+    result = None
+
+    match = _ISO_DATE.search(normalized)
+    if match:
+        result = _build_date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+
+    if result is None:
+        match = _NUMERIC_DATE.search(normalized)
+        if match:
+            year = int(match.group(3))
+            result = _build_date(year + 2000 if year < 100 else year, int(match.group(2)), int(match.group(1)))
+
+    if result is None:
+        match = _SHORT_DATE.search(normalized)
+        if match:
+            result = _next_year_if_past(_build_date(today.year, int(match.group(2)), int(match.group(1))), today)
+
+    if result is None:
+        match = _TEXT_DATE.search(normalized)
+        if match:
+            day = _number(match.group(1))
+            month = _MONTH_INDEX[match.group(2)]
+            if match.group(3):
+                result = _build_date(int(match.group(3)), month, day)
+            else:
+                result = _next_year_if_past(_build_date(today.year, month, day), today)
+
+    if result is None:
+        match = _RELATIVE_DAY.search(normalized)
+        if match:
+            result = today + timedelta(days={'oggi': 0, 'domani': 1, 'dopodomani': 2}[match.group(1)])
+
+    if result is None:
+        match = _IN_DAYS.search(normalized)
+        if match:
+            amount = _number(match.group(1))
+            if amount is not None:
+                days = amount * 7 if match.group(2).startswith('settiman') else amount
+                result = today + timedelta(days=days)
+
+    if result is None:
+        match = _NEXT_WEEK_DAY.search(normalized)
+        if match:
+            next_monday = today + timedelta(days=7 - today.weekday())
+            result = next_monday + timedelta(days=_WEEKDAY_INDEX[match.group(1)])
+
+    if result is None:
+        match = _WEEKDAY_DATE.search(normalized)
+        if match:
+            # "lunedì" and "lunedì prossimo" both mean the next one after today
+            days_ahead = (_WEEKDAY_INDEX[match.group(1)] - today.weekday()) % 7 or 7
+            result = today + timedelta(days=days_ahead)
+
+    if result is None and _NEXT_WEEK.search(normalized):
+        result = today + timedelta(days=7 - today.weekday())
+
+    return result.strftime("%Y-%m-%d") if result else None
+
+
+def _minutes_suffix(suffix: Optional[str], digits: Optional[str], word: Optional[str]) -> Optional[int]:
+    """Translate "e mezza", "e un quarto", "e 20"... into a minute offset"""
+    if not suffix:
+        return 0
+    suffix = ' '.join(suffix.split())
+    if suffix.startswith('e mezz'):
+        return 30
+    if suffix == 'e un quarto':
+        return 15
+    if suffix == 'e tre quarti':
+        return 45
+    if suffix == 'meno un quarto':
+        return -15
+    value = int(digits) if digits else _NUMBER_WORDS.get(word)
+    return value if value is not None and value < 60 else None
+
+
+def _adjust_half_day(hour: int, normalized: str, explicit_clock: bool) -> Optional[int]:
+    """Move ambiguous hours to the afternoon unless the morning is stated; None if still unclear"""
+    if hour < 12 and _AFTERNOON.search(normalized):
+        return hour + 12
+    if not explicit_clock and 1 <= hour <= _AFTERNOON_HOUR_LIMIT and not _MORNING.search(normalized):
+        # 18:00 is after closing and 06:00 before opening, so the user is asked again
+        if Config.BUSINESS_HOUR_START <= hour + 12 < Config.BUSINESS_HOUR_END:
+            return hour + 12
+        return None
+    return hour
+
+
+def parse_time(text: str) -> Optional[str]:
+    """Extract a time from Italian text and return it as HH:MM"""
+    normalized = normalize(text)
+
+    for match in _CLOCK_TIME.finditer(normalized):
+        hour, minute = int(match.group(1)), int(match.group(3))
+        if match.group(2) == '.' and (_CURRENCY_AFTER.match(normalized, match.end())
+                                      or _CURRENCY_BEFORE.search(normalized, 0, match.start())):
+            continue
+        if 0 <= hour <= 23:
+            hour = _adjust_half_day(hour, normalized, explicit_clock=True)
+            return f"{hour:02d}:{minute:02d}"
+
+    match = _AMPM_TIME.search(normalized)
+    if match:
+        hour = int(match.group(1))
+        if 1 <= hour <= 12:
+            hour = hour % 12 + (12 if match.group(2) == 'pm' else 0)
+            return f"{hour:02d}:00"
+
+    match = _NOON.search(normalized)
+    if match:
+        return "12:00" if match.group(1) == 'mezzogiorno' else "00:00"
+
+    match = _SPOKEN_TIME.search(normalized)
+    if match:
+        hour = _number(match.group(1))
+        offset = _minutes_suffix(match.group(2), match.group(3), match.group(4))
+        if hour is not None and offset is not None and 0 <= hour <= 23:
+            hour = _adjust_half_day(hour, normalized, explicit_clock=False)
+            if hour is None:
+                return None
+            total = (hour * 60 + offset) % (24 * 60)
+            return f"{total // 60:02d}:{total % 60:02d}"
+
+    match = _HOUR_SUFFIX_TIME.search(normalized)
+    if match:
+        hour = int(match.group(1))
+        if 0 <= hour <= 23:
+            return f"{hour:02d}:00"
+
+    return None
+
+
+def format_slot(date_str: str, time_str: str) -> str:
+    """Format a slot in spoken Italian, e.g. 'martedì 14 ottobre alle 10:00'"""
+    slot_date = datetime.strptime(date_str, "%Y-%m-%d")
+    return f"{ITALIAN_WEEKDAYS[slot_date.weekday()]} {slot_date.day} {ITALIAN_MONTHS[slot_date.month - 1]} alle {time_str}"
@@ -0,0 +1,56 @@
+import json
+import logging
+import re
+from typing import Dict, Optional
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Delivery modes
+VOICE = "voice"            # Wait for synthesis and send the voice note only
+TEXT_FIRST = "text_first"  # Send the text at once, follow with the voice note
+TEXT = "text"              # Text only, no synthesis
+
+DELIVERY_MODES = (VOICE, TEXT_FIRST, TEXT)
+
+# Names users can pick with /modalita
+USER_MODE_NAMES = {'voce': VOICE, 'entrambi': TEXT_FIRST, 'testo': TEXT}
+
+# Lists, numbered steps and links read badly as audio
+_STRUCTURED_LINE = re.compile(r'^\s*(?:[-•*]|\d+[.)])\s+', re.MULTILINE)
+_LINK = re.compile(r'https?://|www\.')
+
+
+class DeliveryPolicy:
+    """Chooses how a reply is delivered: voice, text then voice, or text only"""
+
+    def __init__(self):
+        self.default_mode = self._valid_mode(Config.DELIVERY_MODE) or TEXT_FIRST
+        self.step_modes: Dict[str, str] = {}
+        try:
+            for step, mode in json.loads(Config.DELIVERY_MODE_BY_STEP).items():
+                if self._valid_mode(mode):
+                    self.step_modes[step] = mode
+        except (json.JSONDecodeError, AttributeError) as e:
+            logger.error(f"Invalid DELIVERY_MODE_BY_STEP, ignoring it: {e}")
+
+    @staticmethod
+    def _valid_mode(mode: Optional[str]) -> Optional[str]:
+        """Return the mode if it is known, else None"""
+        return mode if mode in DELIVERY_MODES else None
+
+    @staticmethod
+    def is_speakable(text: str) -> bool:
+        """Check whether text is plain enough, and within the cost cap, to be worth synthesizing"""
+        if Config.VOICE_MAX_CHARS and len(text) > Config.VOICE_MAX_CHARS:
+            return False
+        if len(_STRUCTURED_LINE.findall(text)) >= 2 or _LINK.search(text):
+            return False
+        return True
+
+    def decide(self, text: str, step: Optional[str] = None, user_mode: Optional[str] = None) -> str:
+        """Pick the delivery mode: user choice, then step override, then default"""
+        mode = self._valid_mode(user_mode) or self.step_modes.get(step) or self.default_mode
+        if mode != TEXT and not self.is_speakable(text):
+            return TEXT
+        return mode
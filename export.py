@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Stream turns, completed sessions or bookings from the analytics store to CSV or Parquet
+
+    python export.py turns --output turns.csv
+    python export.py bookings --format parquet --output bookings.parquet --incremental
+
+Rows are read and written in batches, so memory stays flat however large the
+table is. With --incremental only rows added since the previous incremental
+export of the same table are written, and the watermark advances once the
+file is complete.
+"""
+import argparse
+import csv
+import logging
+import os
+import sys
+import time
+from typing import Iterator, List
+from analytics import TABLES, connect
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+BATCH_ROWS = 10000
+
+
+def read_batches(conn, table: str, after_id: int, batch_rows: int = BATCH_ROWS) -> Iterator[List[tuple]]:
+    """Yield rows with id > after_id in id order, batch_rows at a time"""
+    columns = ', '.join(name for name, _ in TABLES[table])
+    cursor = conn.execute(f"SELECT {columns} FROM {table} WHERE id > ? ORDER BY id", (after_id,))
+    while True:
+        rows = cursor.fetchmany(batch_rows)
+        if not rows:
+            return
+        yield rows
+
+
+def write_csv(batches: Iterator[List[tuple]], table: str, path: str) -> int:
+    """Write batches to a CSV file with a header row; returns the last id written"""
+    last_id = 0
+    with open(path, 'w', newline='', encoding='utf-8') as output:
+        writer = csv.writer(output)
+        writer.writerow([name for name, _ in TABLES[table]])
+        for rows in batches:
+            writer.writerows(rows)
+            last_id = rows[-1][0]
+    return last_id
+
+
+def write_parquet(batches: Iterator[List[tuple]], table: str, path: str) -> int:
+    """Write each batch as a Parquet row group; returns the last id written"""
+    schema = pa.schema([(name, getattr(pa, type_name)()) for name, type_name in TABLES[table]])
+    last_id = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for rows in batches:
+            columns = list(zip(*rows))
+            writer.write_batch(pa.record_batch(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema
+            ))
+            last_id = rows[-1][0]
+    return last_id
+
+
+def export(table: str, output: str, file_format: str = 'csv', since: int = None,
+           incremental: bool = False, db_path: str = None) -> int:
+    """Export one table and return the number of rows written"""
+    conn = connect(db_path)
+    try:
+        if since is None and incremental:
+            row = conn.execute("SELECT last_id FROM export_watermarks WHERE name = ?", (table,)).fetchone()
+            since = row[0] if row else 0
+        since = since or 0
+
+        # One read transaction: a consistent view while the bot keeps writing
+        conn.execute("BEGIN")
+        count = conn.execute(f"SELECT COUNT(*) FROM {table} WHERE id > ?", (since,)).fetchone()[0]
+        if count == 0:
+            conn.execute("COMMIT")
+            logger.info(f"No {table} rows after id {since}")
+            return 0
+
+        # Written under a temporary name so a failed export leaves no partial file
+        started = time.perf_counter()
+        temp_path = f"{output}.part"
+        writer = write_parquet if file_format == 'parquet' else write_csv
+        try:
+            last_id = writer(read_batches(conn, table, since), table, temp_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        finally:
+            conn.execute("COMMIT")
+        os.replace(temp_path, output)
+
+        if incremental:
+            conn.execute(
+                "INSERT INTO export_watermarks (name, last_id, exported_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET last_id = excluded.last_id, exported_at = excluded.exported_at",
+                (table, last_id, time.time())
+            )
+        logger.info(
+            f"Exported {count} {table} rows (ids {since + 1}-{last_id}) to {output} "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+        return count
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export analytics tables to CSV or Parquet")
+    parser.add_argument('table', choices=sorted(TABLES))
+    parser.add_argument('--output', '-o', required=True, help="Destination file")
+    parser.add_argument('--format', '-f', dest='file_format', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--since', type=int, help="Export rows with an id greater than this")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Start after the previous incremental export and advance the watermark")
+    parser.add_argument('--db', help="Analytics database (default: ANALYTICS_PATH)")
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+    if args.file_format == 'parquet' and pa is None:
+        parser.error("Parquet export requires pyarrow (pip install pyarrow)")
+
+    try:
+        export(args.table, args.output, args.file_format, args.since, args.incremental, args.db)
+    except Exception as e:
+        logger.error(f"Export failed: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
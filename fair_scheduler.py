@@ -0,0 +1,102 @@
+import asyncio
+import contextlib
+import logging
+from collections import deque
+from typing import Deque, Dict, Hashable
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class FairScheduler:
+    """Bounds concurrent conversation turns and shares free slots round-robin.
+
+    When every slot is busy, waiters queue per key (user) and a freed slot
+    goes to the next key in rotation, not to the oldest waiter overall, so
+    a client with many queued turns cannot starve everyone else.
+    """
+
+    def __init__(self, concurrency: int = None):
+        self.concurrency = concurrency or Config.TURN_CONCURRENCY
+        self.running = 0
+        self._queues: Dict[Hashable, Deque[asyncio.Future]] = {}
+        self._ring: Deque[Hashable] = deque()  # Keys with waiters, in service order
+        # A counter rather than a sum over _queues: stats() runs on the health-server
+        # thread and must not iterate a dict the loop is changing
+        self._waiting = 0
+        self._peak_waiting = 0
+
+    @contextlib.asynccontextmanager
+    async def slot(self, key: Hashable):
+        """Hold one of the global slots for the duration of the block"""
+        if self.running < self.concurrency and not self._ring:
+            self.running += 1
+        else:
+            await self._wait(key)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _wait(self, key: Hashable):
+        """Queue behind the key's earlier waiters until a slot is handed over"""
+        waiter = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = deque()
+            self._ring.append(key)
+        queue.append(waiter)
+        self._waiting += 1
+        self._peak_waiting = max(self._peak_waiting, self._waiting)
+
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before the cancellation
+                self._release()
+            else:
+                self._forget(key, waiter)
+            raise
+
+    def _forget(self, key: Hashable, waiter: asyncio.Future):
+        """Remove a cancelled waiter from its queue"""
+        queue = self._queues.get(key)
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        self._waiting -= 1
+        if not queue:
+            del self._queues[key]
+            self._ring.remove(key)
+
+    def _release(self):
+        """Hand the freed slot to the next key in rotation, or give it back"""
+        while self._ring:
+            key = self._ring.popleft()
+            queue = self._queues[key]
+            waiter = queue.popleft()
+            self._waiting -= 1
+            if queue:
+                self._ring.append(key)
+            else:
+                del self._queues[key]
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.running -= 1
+
+    @property
+    def waiting(self) -> int:
+        """Number of queued waiters"""
+        return self._waiting
+
+    def stats(self) -> Dict:
+        """Return slot usage and queue depth; reads only counters, so safe from any thread"""
+        return {
+            'concurrency': self.concurrency,
+            'running': self.running,
+            'waiting': self.waiting,
+            'waiting_keys': len(self._ring),
+            'peak_waiting': self._peak_waiting,
+        }
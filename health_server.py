@@ -1,13 +1,20 @@
 import asyncio
+import hmac
 import logging
+import time
 from aiohttp import web
 import threading
+from config import Config
+from profiler import sample_stacks, start_memory_tracing, memory_snapshot
+from services.http_transport import pool_stats
+from services.resilience import breaker_stats
 
 logger = logging.getLogger(__name__)
 
 class HealthServer:
-    def __init__(self, port=8000):
+    def __init__(self, port=8000, metrics_sources=None):
         self.port = port
+        self.metrics_sources = metrics_sources or {}
         self.app = web.Application()
         self.setup_routes()
         
@@ -15,6 +22,20 @@ class HealthServer:
         """Setup health check routes"""
         self.app.router.add_get('/health', self.health_check)
         self.app.router.add_get('/', self.health_check)
+        self.app.router.add_get('/metrics', self.metrics)
+        
+        # Admin endpoints exist only when a token is configured
+        if Config.ADMIN_TOKEN:
+            self.app.router.add_get('/admin/profile', self.profile)
+            self.app.router.add_get('/admin/memory', self.memory)
+            if Config.TRACEMALLOC_AT_STARTUP:
+                start_memory_tracing()
+    
+    def _authorized(self, request) -> bool:
+        """Check the bearer token of an admin request"""
+        header = request.headers.get('Authorization', '')
+        token = header[len('Bearer '):] if header.startswith('Bearer ') else ''
+        return hmac.compare_digest(token.encode(), Config.ADMIN_TOKEN.encode())
     
     async def health_check(self, request):
         """Simple health check endpoint"""
@@ -24,6 +45,48 @@ class HealthServer:
             'message': 'Bot is running'
         })
     
+    async def metrics(self, request):
+        """Runtime metrics endpoint"""
+        return web.json_response({
+            'http_pools': pool_stats(),
+            'circuits': breaker_stats(),
+            **{name: source() for name, source in self.metrics_sources.items()}
+        })
+    
+    async def profile(self, request):
+        """Sample all thread stacks for ?seconds=N and return collapsed stacks"""
+        if not self._authorized(request):
+            return web.json_response({'error': 'unauthorized'}, status=401)
+        try:
+            seconds = float(request.query.get('seconds', '10'))
+        except ValueError:
+            return web.json_response({'error': 'seconds must be a number'}, status=400)
+        # Also rejects nan, which fails every comparison
+        if not 0 < seconds <= Config.PROFILE_MAX_SECONDS:
+            return web.json_response(
+                {'error': f'seconds must be above 0 and at most {Config.PROFILE_MAX_SECONDS:g}'}, status=400
+            )
+        
+        try:
+            # The sampler sleeps between samples; keep it off this loop
+            collapsed = await asyncio.get_event_loop().run_in_executor(None, sample_stacks, seconds)
+        except RuntimeError as e:
+            return web.json_response({'error': str(e)}, status=409)
+        
+        filename = f"profile-{time.strftime('%Y%m%d-%H%M%S')}.folded"
+        return web.Response(text=collapsed, content_type='text/plain',
+                            headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+    
+    async def memory(self, request):
+        """Report top allocation sites and live object counts"""
+        if not self._authorized(request):
+            return web.json_response({'error': 'unauthorized'}, status=401)
+        if request.query.get('start') == '1':
+            start_memory_tracing()
+        limit = int(request.query.get('limit', '25')) if request.query.get('limit', '').isdigit() else 25
+        report = await asyncio.get_event_loop().run_in_executor(None, memory_snapshot, limit)
+        return web.json_response(report)
+    
     async def start_server(self):
         """Start the health check server"""
         try:
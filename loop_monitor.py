@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, List, Optional
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def _is_project_frame(frame) -> bool:
+    """Check whether a frame runs this bot's code rather than a library"""
+    filename = frame.f_code.co_filename
+    return filename.startswith(_PROJECT_ROOT) and 'site-packages' not in filename and filename != __file__
+
+
+def _describe(frame) -> str:
+    """Name a frame as path:function:line"""
+    filename = os.path.relpath(frame.f_code.co_filename, _PROJECT_ROOT) \
+        if frame.f_code.co_filename.startswith(_PROJECT_ROOT) else os.path.basename(frame.f_code.co_filename)
+    return f"{filename}:{frame.f_code.co_qualname}:{frame.f_lineno}"
+
+
+class LoopMonitor:
+    """Measures event-loop lag and names the code that blocks the loop.
+
+    A timer callback on the loop records how late it runs (the lag). A
+    watchdog thread checks that the callback keeps firing; when it does not,
+    the loop is stuck inside one callback, so the watchdog reads the loop
+    thread's current stack and records the innermost project function, i.e.
+    the handler or service method making the blocking call.
+    """
+
+    def __init__(self, interval: float = None, stall_threshold: float = None):
+        self.interval = interval or Config.LOOP_MONITOR_INTERVAL
+        self.stall_threshold = stall_threshold or Config.LOOP_STALL_THRESHOLD_MS / 1000
+        self.lag_samples = deque(maxlen=600)
+        self.stalls = 0
+        self.stalled_seconds = 0.0
+        self.offenders: Counter = Counter()
+        self.last_stall: Optional[Dict] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._heartbeat = time.monotonic()
+        self._stall_stack: Optional[List[str]] = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Start sampling the running loop and the watchdog thread"""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._schedule()
+        threading.Thread(target=self._watchdog, name='loop-watchdog', daemon=True).start()
+        logger.info(f"Loop monitor started (stall threshold {self.stall_threshold * 1000:.0f} ms)")
+
+    def stop(self):
+        """Stop sampling"""
+        self._stopped.set()
+        if self._timer is not None:
+            self._timer.cancel()
+
+    def _schedule(self):
+        expected = self._loop.time() + self.interval
+        self._timer = self._loop.call_at(expected, self._tick, expected)
+
+    def _tick(self, expected: float):
+        """Runs on the loop: record how late this callback fired"""
+        lag = max(self._loop.time() - expected, 0.0)
+        # stats() reads these from the health-server thread
+        with self._lock:
+            self.lag_samples.append(lag)
+            self._heartbeat = time.monotonic()
+            stack, self._stall_stack = self._stall_stack, None
+            if lag >= self.stall_threshold:
+                culprit = stack[0] if stack else 'unknown (blocked between samples)'
+                self.stalls += 1
+                self.stalled_seconds += lag
+                self.offenders[culprit] += 1
+                self.last_stall = {'at': time.time(), 'duration_ms': round(lag * 1000, 1),
+                                   'culprit': culprit, 'stack': stack or []}
+
+        if lag >= self.stall_threshold:
+            logger.warning(f"Event loop blocked for {lag * 1000:.0f} ms in {culprit}; stack: {stack}")
+
+        if not self._stopped.is_set():
+            self._schedule()
+
+    def _watchdog(self):
+        """Runs on its own thread: capture the loop thread's stack while it is stuck"""
+        poll = min(self.stall_threshold / 2, 0.05)
+        while not self._stopped.wait(poll):
+            with self._lock:
+                overdue = time.monotonic() - self._heartbeat - self.interval
+                if overdue < self.stall_threshold or self._stall_stack is not None:
+                    continue
+            stack = self._capture()
+            with self._lock:
+                # The loop may have recovered meanwhile; keep the first capture per stall
+                if time.monotonic() - self._heartbeat - self.interval >= self.stall_threshold \
+                        and self._stall_stack is None:
+                    self._stall_stack = stack
+
+    def _capture(self) -> List[str]:
+        """Project frames of the loop thread, innermost first, plus the innermost library frame"""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = []
+        innermost = frame
+        while frame is not None and len(stack) < 8:
+            if _is_project_frame(frame):
+                stack.append(_describe(frame))
+            frame = frame.f_back
+        if innermost is not None and not _is_project_frame(innermost):
+            # The blocking library call itself (e.g. a socket read) goes last
+            stack.append(_describe(innermost))
+        return stack
+
+    def stats(self) -> Dict:
+        """Return lag percentiles and stall counters; safe to call from any thread"""
+        with self._lock:
+            ordered = sorted(self.lag_samples)
+            stalls, stalled_seconds = self.stalls, self.stalled_seconds
+            top_offenders = dict(self.offenders.most_common(5))
+            last_stall = self.last_stall
+
+        def percentile(value: float) -> float:
+            if not ordered:
+                return 0.0
+            return round(ordered[min(int(len(ordered) * value / 100), len(ordered) - 1)] * 1000, 1)
+
+        return {
+            'lag_ms': {'p50': percentile(50), 'p99': percentile(99), 'max': percentile(100)},
+            'stalls': stalls,
+            'stalled_seconds': round(stalled_seconds, 3),
+            'top_offenders': top_offenders,
+            'last_stall': last_stall,
+        }
@@ -4,6 +4,8 @@ from telegram.ext import Application, CommandHandler, MessageHandler, filters
 from config import Config
 from bot_handler import TelegramBotHandler
 from health_server import HealthServer
+from loop_monitor import LoopMonitor
+from services.http_transport import telegram_request
 
 # Configure logging
 logging.basicConfig(
@@ -31,10 +33,30 @@ class TelegramVoiceBot:
         self.bot_handler = TelegramBotHandler()
         
         # Create application
-        self.application = Application.builder().token(Config.TELEGRAM_TOKEN).build()
+        self.application = (
+            Application.builder()
+            .token(Config.TELEGRAM_TOKEN)
+            .request(telegram_request())
+            # Handlers only admit and buffer updates; the fair scheduler bounds the actual work
+            .concurrent_updates(True)
+            .post_init(self._post_init)
+            .post_stop(self._post_stop)
+            .post_shutdown(self._post_shutdown)
+            .build()
+        )
+        
+        # Reports event-loop lag and the code that blocks the loop
+        self.loop_monitor = LoopMonitor()
         
         # Initialize health server
-        self.health_server = HealthServer()
+        self.health_server = HealthServer(metrics_sources={
+            'job_queue': self.bot_handler.job_queue.stats,
+            'event_loop': self.loop_monitor.stats,
+            'inbound': self.bot_handler.coalescer.stats,
+            'rate_limit': self.bot_handler.rate_limiter.stats,
+            'scheduler': self.bot_handler.scheduler.stats,
+            'analytics': self.bot_handler.analytics.stats,
+        })
         
         # Setup handlers
         self._setup_handlers()
@@ -44,14 +66,34 @@ class TelegramVoiceBot:
         # Command handlers
         self.application.add_handler(CommandHandler("start", self.bot_handler.handle_start))
         self.application.add_handler(CommandHandler("help", self.bot_handler.handle_help))
+        self.application.add_handler(CommandHandler("modalita", self.bot_handler.handle_delivery_mode))
         
         # Message handler for text messages
         self.application.add_handler(
             MessageHandler(filters.TEXT & ~filters.COMMAND, self.bot_handler.handle_message)
         )
         
+        # Message handler for voice notes, transcribed into the same flow
+        self.application.add_handler(
+            MessageHandler(filters.VOICE, self.bot_handler.handle_voice)
+        )
+        
         logger.info("Handlers setup completed")
     
+    async def _post_init(self, application: Application):
+        """Start background workers once the bot is initialized"""
+        self.loop_monitor.start()
+        await self.bot_handler.start_background_work(application.bot)
+    
+    async def _post_stop(self, application: Application):
+        """Polling has stopped: let in-flight replies finish before shutting down"""
+        await self.bot_handler.drain(Config.SHUTDOWN_DRAIN_SECONDS)
+    
+    async def _post_shutdown(self, application: Application):
+        """Stop background workers and snapshot sessions; unfinished jobs resume on next start"""
+        await self.bot_handler.stop_background_work()
+        self.loop_monitor.stop()
+    
     def start(self):
         """Start the bot"""
         try:
@@ -78,6 +120,9 @@ class TelegramVoiceBot:
         """Clean up resources"""
         logger.info("Cleaning up resources...")
         
+        # Stop speech-to-text workers
+        self.bot_handler.stt_service.shutdown()
+        
         # Clean up temp files
         try:
             import shutil
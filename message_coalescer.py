@@ -0,0 +1,133 @@
+import asyncio
+import contextvars
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+TurnProcessor = Callable[[object, object, str], Awaitable[None]]
+
+
+class _Turn:
+    """Messages processed together as one conversation turn"""
+    __slots__ = ('messages', 'previous', 'task', 'committed')
+
+    def __init__(self, messages: List[str], previous: Optional['_Turn']):
+        self.messages = messages
+        self.previous = previous  # Earlier turn of the same user, still running or done
+        self.task: Optional[asyncio.Task] = None
+        self.committed = False  # Set once the reply starts going out
+
+
+class _UserState:
+    __slots__ = ('pending', 'update', 'context', 'timer', 'turn')
+
+    def __init__(self):
+        self.pending: List[str] = []
+        self.update = None
+        self.context = None
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.turn: Optional[_Turn] = None
+
+
+_current_turn: contextvars.ContextVar[Optional[_Turn]] = contextvars.ContextVar('current_turn', default=None)
+
+
+class MessageCoalescer:
+    """Merges bursts of messages from one user into a single turn.
+
+    A message starts (or restarts) a debounce window; when it elapses the
+    buffered messages are processed together. Newer input cancels a turn
+    that has not committed its reply yet and is merged with its messages.
+    Turns of the same user never overlap.
+    """
+
+    def __init__(self, process: TurnProcessor, window: float = None):
+        self.process = process
+        self.window = Config.INBOUND_DEBOUNCE_SECONDS if window is None else window
+        self._states: Dict[int, _UserState] = {}
+        self._stats = {'messages': 0, 'turns': 0, 'superseded': 0}
+
+    def submit(self, user_id: int, text: str, update, context):
+        """Buffer a message and (re)start the user's debounce window"""
+        state = self._states.setdefault(user_id, _UserState())
+        self._stats['messages'] += 1
+
+        turn = state.turn
+        if turn is not None and not turn.committed and not turn.task.done():
+            # The reply to the earlier messages is not out yet: answer everything at once
+            turn.task.cancel()
+            state.pending = turn.messages + state.pending
+            state.turn = turn.previous
+            self._stats['superseded'] += 1
+            logger.info(f"Superseded unsent reply for user {user_id}")
+
+        state.pending.append(text)
+        state.update = update
+        state.context = context
+        if state.timer is not None:
+            state.timer.cancel()
+        state.timer = asyncio.get_running_loop().call_later(self.window, self._start_turn, user_id)
+
+    def _start_turn(self, user_id: int):
+        """Debounce window elapsed: process the buffered messages as one turn"""
+        state = self._states[user_id]
+        state.timer = None
+        turn = _Turn(state.pending, state.turn)
+        state.pending = []
+        state.turn = turn
+        turn.task = asyncio.get_running_loop().create_task(
+            self._run(user_id, turn, state.update, state.context)
+        )
+        self._stats['turns'] += 1
+
+    async def _run(self, user_id: int, turn: _Turn, update, context):
+        """Wait for the user's committed previous turn, then process this one"""
+        _current_turn.set(turn)
+        try:
+            if turn.previous is not None and not turn.previous.task.done():
+                await asyncio.wait([turn.previous.task])
+            turn.previous = None
+            await self.process(update, context, "\n".join(turn.messages))
+        finally:
+            state = self._states.get(user_id)
+            if state is not None and state.turn is turn and not state.pending and state.timer is None:
+                del self._states[user_id]
+
+    def commit(self):
+        """Mark the running turn's reply as sent: newer input no longer cancels it"""
+        turn = _current_turn.get()
+        if turn is not None:
+            turn.committed = True
+
+    async def drain(self, timeout: float) -> int:
+        """Answer buffered messages now and wait for running turns; returns turns cut off"""
+        for user_id, state in list(self._states.items()):
+            if state.timer is not None:
+                state.timer.cancel()
+                self._start_turn(user_id)
+
+        # The latest turn of a user waits for the earlier ones
+        tasks = [state.turn.task for state in self._states.values() if state.turn is not None]
+        if not tasks:
+            return 0
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        return len(pending)
+
+    def stats(self) -> Dict:
+        """Return message, turn and superseded-reply counters"""
+        return dict(self._stats, users_pending=len(self._states))
+
+    def discard(self, user_id: int):
+        """Drop buffered messages and cancel an uncommitted turn (e.g. on /start)"""
+        state = self._states.pop(user_id, None)
+        if state is None:
+            return
+        if state.timer is not None:
+            state.timer.cancel()
+        if state.turn is not None and not state.turn.committed:
+            state.turn.task.cancel()
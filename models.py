@@ -1,62 +1,175 @@
-from pydantic import BaseModel, validator
-from typing import Optional, Dict, Any
-from datetime import datetime
+from typing import Optional, Dict, List, Tuple
+import marshal
 import re
 from config import SWISS_PHONE_PATTERN, EMAIL_PATTERN
 
-class UserData(BaseModel):
-    """Model for collecting and validating user personal data"""
-    nome: Optional[str] = None
-    cognome: Optional[str] = None
-    via_numero: Optional[str] = None
-    paese_cap: Optional[str] = None
-    telefono: Optional[str] = None
-    email: Optional[str] = None
-    
-    @validator('telefono')
-    def validate_phone(cls, v):
-        if v and not re.match(SWISS_PHONE_PATTERN, v):
-            raise ValueError('Numero di telefono svizzero non valido. Formato: +41XXXXXXXXX o 0XXXXXXXXX')
-        return v
-    
-    @validator('email')
-    def validate_email(cls, v):
-        if v and not re.match(EMAIL_PATTERN, v):
-            raise ValueError('Indirizzo email non valido')
-        return v
-    
+# Sessions are plain __slots__ objects: hundreds of thousands of them stay
+# resident, so they avoid per-instance dicts and pydantic bookkeeping. Phone
+# and email are validated on assignment, so UserData(**external_dict) is
+# checked the same way as values collected in conversation.
+
+REQUIRED_FIELDS = ('nome', 'cognome', 'via_numero', 'paese_cap', 'telefono', 'email')
+_FIELD_BITS = {field: 1 << index for index, field in enumerate(REQUIRED_FIELDS)}
+_COMPLETE_MASK = (1 << len(REQUIRED_FIELDS)) - 1
+
+# Missing-field lists for every possible completion mask, computed once
+_MISSING_BY_MASK = [
+    [field for field in REQUIRED_FIELDS if not mask & _FIELD_BITS[field]]
+    for mask in range(_COMPLETE_MASK + 1)
+]
+
+_PHONE_RE = re.compile(SWISS_PHONE_PATTERN)
+_EMAIL_RE = re.compile(EMAIL_PATTERN)
+
+# Bumped whenever the binary session layout changes
+SESSION_FORMAT_VERSION = 3
+
+
+def validate_phone(v):
+    if v and not _PHONE_RE.match(v):
+        raise ValueError('Numero di telefono svizzero non valido. Formato: +41XXXXXXXXX o 0XXXXXXXXX')
+    return v
+
+
+def validate_email(v):
+    if v and not _EMAIL_RE.match(v):
+        raise ValueError('Indirizzo email non valido')
+    return v
+
+
+_FIELD_VALIDATORS = {'telefono': validate_phone, 'email': validate_email}
+
+
+class UserData:
+    """Compact user personal data with a completion bitmask"""
+    __slots__ = REQUIRED_FIELDS + ('_filled',)
+
+    def __init__(self, nome: Optional[str] = None, cognome: Optional[str] = None,
+                 via_numero: Optional[str] = None, paese_cap: Optional[str] = None,
+                 telefono: Optional[str] = None, email: Optional[str] = None):
+        object.__setattr__(self, '_filled', 0)
+        self.nome = nome
+        self.cognome = cognome
+        self.via_numero = via_numero
+        self.paese_cap = paese_cap
+        self.telefono = telefono
+        self.email = email
+
+    def __setattr__(self, name, value):
+        # Validate and keep the completion bitmask in sync on every assignment
+        bit = _FIELD_BITS.get(name)
+        if bit is not None:
+            check = _FIELD_VALIDATORS.get(name)
+            if check and value:
+                check(value)
+            filled = self._filled | bit if value is not None else self._filled & ~bit
+            object.__setattr__(self, '_filled', filled)
+        object.__setattr__(self, name, value)
+
     def is_complete(self) -> bool:
         """Check if all required fields are filled"""
-        required_fields = ['nome', 'cognome', 'via_numero', 'paese_cap', 'telefono', 'email']
-        return all(getattr(self, field) is not None for field in required_fields)
-    
+        return self._filled == _COMPLETE_MASK
+
     def missing_fields(self) -> list:
         """Return list of missing required fields"""
-        required_fields = ['nome', 'cognome', 'via_numero', 'paese_cap', 'telefono', 'email']
-        return [field for field in required_fields if getattr(self, field) is None]
-
-class AppointmentRequest(BaseModel):
-    """Model for appointment booking requests"""
-    user_data: UserData
-    data_preferita: Optional[str] = None
-    ora_preferita: Optional[str] = None
-    motivo: Optional[str] = None
-    
+        return list(_MISSING_BY_MASK[self._filled])
+
+    def to_dict(self) -> Dict[str, str]:
+        """Return the filled fields only"""
+        return {field: getattr(self, field) for field in REQUIRED_FIELDS if getattr(self, field) is not None}
+
+    def to_tuple(self) -> tuple:
+        """Return field values in REQUIRED_FIELDS order"""
+        return tuple(getattr(self, field) for field in REQUIRED_FIELDS)
+
+    @classmethod
+    def from_tuple(cls, values: tuple) -> 'UserData':
+        """Rebuild from values in REQUIRED_FIELDS order"""
+        return cls(*values)
+
+
+class AppointmentRequest:
+    """Appointment booking request"""
+    __slots__ = ('user_data', 'data_preferita', 'ora_preferita', 'motivo', 'proposed_slots')
+
+    def __init__(self, user_data: UserData, data_preferita: Optional[str] = None,
+                 ora_preferita: Optional[str] = None, motivo: Optional[str] = None,
+                 proposed_slots: Optional[List[Tuple[str, str]]] = None):
+        self.user_data = user_data
+        self.data_preferita = data_preferita
+        self.ora_preferita = ora_preferita
+        self.motivo = motivo
+        self.proposed_slots = proposed_slots or []  # (date, time) offered after a conflict
+
     def is_complete(self) -> bool:
         """Check if appointment request is complete"""
-        return (self.user_data.is_complete() and 
-                self.data_preferita and 
-                self.ora_preferita and 
-                self.motivo)
-
-class UserSession(BaseModel):
-    """Model for tracking user session state"""
-    user_id: int
-    chat_id: int
-    user_data: UserData = UserData()
-    appointment_request: Optional[AppointmentRequest] = None
-    current_step: str = "collecting_data"  # collecting_data, service_menu, booking_appointment
-    conversation_history: list = []
-    
-    class Config:
-        arbitrary_types_allowed = True 
\ No newline at end of file
+        return bool(self.user_data.is_complete() and
+                    self.data_preferita and
+                    self.ora_preferita and
+                    self.motivo)
+
+    def to_tuple(self) -> tuple:
+        """Return the request fields, without the shared user data"""
+        return (self.data_preferita, self.ora_preferita, self.motivo, tuple(map(tuple, self.proposed_slots)))
+
+
+class UserSession:
+    """Tracks user session state"""
+    __slots__ = ('user_id', 'chat_id', 'user_data', 'appointment_request', 'current_step',
+                 'conversation_history', 'delivery_mode', 'summary')
+
+    def __init__(self, user_id: int, chat_id: int, user_data: Optional[UserData] = None,
+                 appointment_request: Optional[AppointmentRequest] = None,
+                 current_step: str = "collecting_data",  # collecting_data, service_menu, booking_appointment
+                 conversation_history: Optional[list] = None,
+                 delivery_mode: Optional[str] = None,
+                 summary: str = ""):
+        self.user_id = user_id
+        self.chat_id = chat_id
+        self.user_data = user_data if user_data is not None else UserData()
+        self.appointment_request = appointment_request
+        self.current_step = current_step
+        self.conversation_history = conversation_history if conversation_history is not None else []
+        self.delivery_mode = delivery_mode  # User's reply delivery choice, None for the default
+        self.summary = summary  # Rolling summary of turns dropped from conversation_history
+
+    def to_bytes(self) -> bytes:
+        """Serialize to a compact binary record (marshal of plain tuples)"""
+        appointment = self.appointment_request.to_tuple() if self.appointment_request else None
+        history = tuple((msg['role'], msg['content']) for msg in self.conversation_history)
+        return marshal.dumps((
+            SESSION_FORMAT_VERSION, self.user_id, self.chat_id, self.current_step,
+            self.user_data.to_tuple(), appointment, history, self.delivery_mode, self.summary
+        ))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'UserSession':
+        """Restore a session written by to_bytes"""
+        record = marshal.loads(data)
+        if record[0] != SESSION_FORMAT_VERSION:
+            raise ValueError(f"Unsupported session format version: {record[0]}")
+        _, user_id, chat_id, current_step, user_fields, appointment, history, delivery_mode, summary = record
+
+        user_data = UserData.from_tuple(user_fields)
+        appointment_request = None
+        if appointment is not None:
+            data_preferita, ora_preferita, motivo, proposed_slots = appointment
+            appointment_request = AppointmentRequest(user_data, data_preferita, ora_preferita,
+                                                     motivo, list(proposed_slots))
+
+        return cls(
+            user_id=user_id,
+            chat_id=chat_id,
+            user_data=user_data,
+            appointment_request=appointment_request,
+            current_step=current_step,
+            conversation_history=[{"role": role, "content": content} for role, content in history],
+            delivery_mode=delivery_mode,
+            summary=summary
+        )
+
+    def restore(self, data: bytes):
+        """Reset this session in place to a state saved with to_bytes"""
+        saved = UserSession.from_bytes(data)
+        for name in UserSession.__slots__:
+            setattr(self, name, getattr(saved, name))
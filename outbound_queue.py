@@ -0,0 +1,264 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict], Awaitable[None]]
+DeadLetterHandler = Callable[[Dict, str], Awaitable[None]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    dedupe_key TEXT UNIQUE,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    run_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    last_error TEXT,
+    order_key TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, run_at);
+"""
+
+# Created after the migration below, which adds order_key to older databases
+_ORDER_INDEX = "CREATE INDEX IF NOT EXISTS jobs_order ON jobs (order_key, status, id)"
+
+
+class OutboundQueue:
+    """Durable SQLite-backed queue for outbound side effects.
+
+    Jobs survive crashes and redeploys: anything still marked running at
+    startup was interrupted and is put back in the queue. Failed jobs are
+    retried with exponential backoff and end up in the dead-letter state
+    (status 'dead') after max_attempts. Jobs sharing an order_key run one at
+    a time, in the order they were enqueued.
+    """
+
+    def __init__(self, path: str = None, workers: int = None, max_attempts: int = None):
+        self.path = path or Config.JOB_QUEUE_PATH
+        self.worker_count = workers or Config.JOB_WORKERS
+        self.max_attempts = max_attempts or Config.JOB_MAX_ATTEMPTS
+        self._handlers: Dict[str, JobHandler] = {}
+        self._dead_handlers: Dict[str, DeadLetterHandler] = {}
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False  # Workers finish their current job but claim no more
+        self._conn: Optional[sqlite3.Connection] = None
+        # A single thread owns the connection, which also serializes all writes
+        self._db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='outbound-queue')
+        self._stats = {'enqueued': 0, 'completed': 0, 'retried': 0, 'dead': 0, 'running': 0}
+
+    def register(self, kind: str, handler: JobHandler, on_dead: Optional[DeadLetterHandler] = None):
+        """Register the coroutine that executes jobs of a kind, and the one told when a job dies"""
+        self._handlers[kind] = handler
+        if on_dead is not None:
+            self._dead_handlers[kind] = on_dead
+
+    async def _db(self, fn, *args):
+        """Run a database operation on the queue's thread"""
+        return await asyncio.get_event_loop().run_in_executor(self._db_executor, fn, *args)
+
+    def _open_sync(self) -> int:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if 'order_key' not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN order_key TEXT")
+        self._conn.execute(_ORDER_INDEX)
+        # Jobs left running by a crashed or killed process are retried
+        return self._conn.execute("UPDATE jobs SET status = 'pending' WHERE status = 'running'").rowcount
+
+    def _insert_sync(self, kind: str, payload: str, dedupe_key: Optional[str],
+                     order_key: Optional[str]) -> Optional[int]:
+        now = time.time()
+        cursor = self._conn.execute(
+            "INSERT OR IGNORE INTO jobs (kind, payload, dedupe_key, order_key, run_at, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (kind, payload, dedupe_key, order_key, now, now)
+        )
+        return cursor.lastrowid if cursor.rowcount else None
+
+    def _claim_sync(self, now: float) -> Optional[tuple]:
+        # A job waits while an earlier job of its order_key is running or still pending
+        row = self._conn.execute(
+            "SELECT id, kind, payload, attempts FROM jobs AS job WHERE status = 'pending' AND run_at <= ? "
+            "AND (order_key IS NULL OR NOT EXISTS (SELECT 1 FROM jobs AS other "
+            "WHERE other.order_key = job.order_key AND other.id != job.id AND (other.status = 'running' "
+            "OR (other.status = 'pending' AND other.id < job.id)))) "
+            "ORDER BY run_at, id LIMIT 1",
+            (now,)
+        ).fetchone()
+        if row is not None:
+            self._conn.execute("UPDATE jobs SET status = 'running' WHERE id = ?", (row[0],))
+        return row
+
+    def _complete_sync(self, job_id: int):
+        self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+    def _fail_sync(self, job_id: int, attempts: int, error: str, dead: bool):
+        if dead:
+            # Dropping the dedupe key lets the same job be enqueued afresh
+            self._conn.execute(
+                "UPDATE jobs SET status = 'dead', dedupe_key = NULL, attempts = ?, last_error = ? WHERE id = ?",
+                (attempts, error, job_id)
+            )
+        else:
+            backoff = min(2 ** attempts, 300)
+            self._conn.execute(
+                "UPDATE jobs SET status = 'pending', attempts = ?, last_error = ?, run_at = ? WHERE id = ?",
+                (attempts, error, time.time() + backoff, job_id)
+            )
+
+    def _dead_letters_sync(self, limit: int) -> List[Dict]:
+        rows = self._conn.execute(
+            "SELECT id, kind, payload, attempts, last_error, created_at FROM jobs "
+            "WHERE status = 'dead' ORDER BY id DESC LIMIT ?",
+            (limit,)
+        ).fetchall()
+        return [
+            {'id': job_id, 'kind': kind, 'payload': json.loads(payload), 'attempts': attempts,
+             'last_error': last_error, 'created_at': created_at}
+            for job_id, kind, payload, attempts, last_error, created_at in rows
+        ]
+
+    def _requeue_dead_sync(self, job_id: int) -> bool:
+        return self._conn.execute(
+            "UPDATE jobs SET status = 'pending', attempts = 0, run_at = ? WHERE id = ? AND status = 'dead'",
+            (time.time(), job_id)
+        ).rowcount > 0
+
+    async def start(self):
+        """Open the database and start the worker pool"""
+        recovered = await self._db(self._open_sync)
+        if recovered:
+            logger.info(f"Recovered {recovered} interrupted jobs")
+        self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        self._stopping = False
+        self._workers = [asyncio.create_task(self._worker(index)) for index in range(self.worker_count)]
+        logger.info(f"Outbound queue started with {self.worker_count} workers ({self.path})")
+
+    async def stop(self, timeout: float = 0):
+        """Stop the workers, letting running jobs finish for up to timeout seconds.
+
+        Jobs still running after that are cancelled and retried on next start;
+        pending ones simply stay in the database. Stopping a stopped queue
+        does nothing, so shutdown hooks may call it after drain().
+        """
+        if not self._workers and self._conn is None:
+            return
+        self._stopping = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+        if self._workers and timeout > 0:
+            await asyncio.wait(self._workers, timeout=timeout)
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._conn is not None:
+            await self._db(self._conn.close)
+            self._conn = None
+        logger.info("Outbound queue stopped")
+
+    async def enqueue(self, kind: str, payload: Dict, dedupe_key: Optional[str] = None,
+                      order_key: Optional[str] = None) -> Optional[int]:
+        """Persist a job and wake a worker; duplicates of a dedupe_key are ignored"""
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind: {kind}")
+        job_id = await self._db(self._insert_sync, kind, json.dumps(payload), dedupe_key, order_key)
+        if job_id is not None:
+            self._stats['enqueued'] += 1
+            self._wakeup.set()
+        return job_id
+
+    async def dead_letters(self, limit: int = 50) -> List[Dict]:
+        """List jobs that exhausted their retries"""
+        return await self._db(self._dead_letters_sync, limit)
+
+    async def requeue_dead(self, job_id: int) -> bool:
+        """Give a dead-lettered job a fresh set of attempts"""
+        requeued = await self._db(self._requeue_dead_sync, job_id)
+        if requeued:
+            self._wakeup.set()
+        return requeued
+
+    async def _worker(self, index: int):
+        """Claim and run jobs until stopped or cancelled"""
+        while not self._stopping:
+            try:
+                self._wakeup.clear()
+                job = await self._db(self._claim_sync, time.time())
+                if job is None:
+                    # Sleep until new work is enqueued or a retry becomes due
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=Config.JOB_POLL_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                # More work may be waiting for the other workers
+                self._wakeup.set()
+                await self._run(*job)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Outbound queue worker {index} error: {e}")
+                await asyncio.sleep(1)
+
+    async def _run(self, job_id: int, kind: str, payload: str, attempts: int):
+        """Execute one claimed job and record its outcome"""
+        self._stats['running'] += 1
+        try:
+            await self._handlers[kind](json.loads(payload))
+        except asyncio.CancelledError:
+            # Shutdown: the job stays 'running' and is recovered on next start
+            raise
+        except Exception as e:
+            attempts += 1
+            dead = attempts >= self.max_attempts
+            await self._db(self._fail_sync, job_id, attempts, str(e)[:1000], dead)
+            if dead:
+                self._stats['dead'] += 1
+                logger.error(f"Job {job_id} ({kind}) moved to dead letters after {attempts} attempts: {e}")
+                await self._notify_dead(job_id, kind, payload, str(e))
+                self._wakeup.set()
+            else:
+                self._stats['retried'] += 1
+                logger.warning(f"Job {job_id} ({kind}) failed (attempt {attempts}), will retry: {e}")
+            return
+        finally:
+            self._stats['running'] -= 1
+
+        await self._db(self._complete_sync, job_id)
+        self._stats['completed'] += 1
+        self._wakeup.set()  # Jobs queued behind it under the same order_key can run now
+
+    async def _notify_dead(self, job_id: int, kind: str, payload: str, error: str):
+        """Run the dead-letter handler of a job kind, if any"""
+        handler = self._dead_handlers.get(kind)
+        if handler is None:
+            return
+        try:
+            await handler(json.loads(payload), error)
+        except Exception as e:
+            logger.error(f"Dead-letter handler for job {job_id} ({kind}) failed: {e}")
+
+    def stats(self) -> Dict:
+        """Return queue counters since startup"""
+        return dict(self._stats, workers=len(self._workers))
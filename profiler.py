@@ -0,0 +1,96 @@
+import gc
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+_PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Only one profile at a time: concurrent samplers would skew each other
+_profile_lock = threading.Lock()
+
+
+def _frame_label(frame) -> str:
+    """Name a frame as file:function, relative to the project when possible"""
+    filename = frame.f_code.co_filename
+    if filename.startswith(_PROJECT_ROOT):
+        filename = os.path.relpath(filename, _PROJECT_ROOT)
+    else:
+        filename = os.path.basename(filename)
+    return f"{filename}:{frame.f_code.co_qualname}"
+
+
+def sample_stacks(seconds: float, interval: float = 0.01) -> str:
+    """Sample every thread's stack and return them in collapsed-stack format.
+
+    Each output line is "thread;outer;...;inner count", the input format of
+    flamegraph.pl and speedscope. Blocking: run it off the event loop.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise RuntimeError("A profile is already running")
+    try:
+        me = threading.get_ident()
+        names = {}
+        counts: Counter = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                if thread_id not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                counts[';'.join(reversed(stack))] += 1
+            time.sleep(interval)
+    finally:
+        _profile_lock.release()
+
+    logger.info(f"Profiled {seconds}s: {sum(counts.values())} samples, {len(counts)} distinct stacks")
+    return ''.join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+def start_memory_tracing(frames: int = 5):
+    """Start tracemalloc; only allocations made from now on are attributed"""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+        logger.info(f"Memory tracing started ({frames} frames)")
+
+
+def memory_snapshot(limit: int = 25) -> Dict:
+    """Top allocation sites from tracemalloc and live object counts by type"""
+    report: Dict = {'tracing': tracemalloc.is_tracing()}
+
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap*'),
+        ))
+        top: List[Dict] = []
+        for stat in snapshot.statistics('traceback')[:limit]:
+            frames = stat.traceback.format(limit=3, most_recent_first=True)
+            top.append({
+                'size_kb': round(stat.size / 1024, 1),
+                'count': stat.count,
+                'traceback': [line.strip() for line in frames if not line.startswith('    ')],
+            })
+        report.update({'traced_kb': round(current / 1024, 1), 'peak_kb': round(peak / 1024, 1),
+                       'top_allocators': top})
+    else:
+        report['hint'] = "tracemalloc not running: start it with ?start=1 and query again later"
+
+    # Object counts do not need tracemalloc; they show e.g. how many sessions are live
+    types = Counter(type(obj).__qualname__ for obj in gc.get_objects())
+    report['objects'] = dict(types.most_common(limit))
+    return report
@@ -0,0 +1,188 @@
+import re
+from typing import Dict, List, Optional, Tuple
+from models import UserData
+
+# Deterministic replies for the data-collection step. Replies come from a
+# fixed set of phrasings (so their audio can be rendered once at startup)
+# and answers to the question just asked are parsed locally; only input
+# that does not fit the script needs the LLM.
+
+# Per field: (first request, request again after an answer that missed it)
+QUESTIONS: Dict[str, Tuple[str, str]] = {
+    'nome': ("Come ti chiami?",
+             "Non ho capito il tuo nome. Puoi scrivermelo?"),
+    'cognome': ("Grazie! Qual è il tuo cognome?",
+                "Mi manca ancora il cognome. Puoi dirmelo?"),
+    'via_numero': ("Perfetto. Qual è il tuo indirizzo? Via e numero civico.",
+                   "Mi serve ancora l'indirizzo: via e numero civico, per favore."),
+    'paese_cap': ("Grazie. In quale paese abiti? Indicami anche il codice postale.",
+                  "Mi manca il paese con il codice postale, per esempio 6900 Lugano."),
+    'telefono': ("Ottimo. A quale numero di telefono posso contattarti?",
+                 "Mi serve ancora un numero di telefono svizzero, per esempio 079 123 45 67."),
+    'email': ("Ultima cosa: qual è il tuo indirizzo email?",
+              "Mi manca solo l'indirizzo email. Puoi scrivermelo?"),
+}
+
+# Replies to values rejected by the validators in models.py
+INVALID: Dict[str, str] = {
+    'telefono': "Il numero di telefono non sembra un numero svizzero valido. "
+                "Puoi riscriverlo? Per esempio 079 123 45 67 oppure +41 79 123 45 67.",
+    'email': "L'indirizzo email non sembra valido. Puoi controllarlo e riscriverlo?",
+}
+
+COMPLETE = ("Grazie, ho tutti i tuoi dati! Posso aiutarti con un problema tecnico "
+            "oppure prenotare un appuntamento. Cosa preferisci?")
+
+_WORD = r"[^\W\d_][^\W\d_'’.-]*(?:['’-][^\W\d_]+)*"
+_NAME_WORDS = re.compile(rf"^{_WORD}(?:\s+{_WORD}){{0,2}}$")
+_NAME_PREFIX = re.compile(r"^(mi chiamo|il mio nome è|nome:|sono)\s+(.+?)\.?$", re.IGNORECASE)
+_SURNAME_PREFIX = re.compile(r"^(il mio cognome è|cognome:|di cognome)\s+(.+?)\.?$", re.IGNORECASE)
+_STREET = re.compile(r"^(?:abito in|vivo in|indirizzo:?)?\s*([^\W\d_][\w'’. -]{2,}?\s+\d{1,4}\s?[a-zA-Z]?)\.?$",
+                     re.IGNORECASE)
+_POSTCODE_TOWN = re.compile(r"^(?:abito a|vivo a)?\s*(?:CH-?)?(\d{4})\s+([^\W\d_][\w'’. -]+?)\.?$", re.IGNORECASE)
+_TOWN_POSTCODE = re.compile(r"^(?:abito a|vivo a)?\s*([^\W\d_][\w'’. -]+?),?\s+(?:CH-?)?(\d{4})\.?$", re.IGNORECASE)
+_PHONE = re.compile(r"(?:\+41|0041|0)\s*[1-9](?:[\s./-]*\d){8}")
+_EMAIL = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+
+# Small talk that would otherwise look like a one-word name
+_NOT_NAMES = {'ciao', 'salve', 'buongiorno', 'buonasera', 'grazie', 'ok', 'si', 'sì', 'no', 'aiuto',
+              'help', 'hello', 'hey', 'boh', 'perché', 'cosa', 'come', 'chi'}
+
+# Words that make a short message a sentence rather than a name ("Ho un problema")
+_NOT_NAME_WORDS = {
+    'a', 'ad', 'al', 'alla', 'che', 'ci', 'con', 'da', 'di', 'e', 'ed', 'gli', 'i', 'il', 'in', 'la', 'le',
+    'lo', 'ma', 'mi', 'mio', 'mia', 'ne', 'nel', 'non', 'o', 'per', 'poi', 'se', 'si', 'su', 'ti', 'tu',
+    'un', 'una', 'uno', 'io', 'anche', 'ancora', 'più', 'molto', 'bene', 'male', 'niente', 'nulla', 'qui',
+    'ho', 'hai', 'ha', 'abbiamo', 'è', 'sono', 'sei', 'siamo', 'va', 'vado', 'fa', 'faccio', 'so', 'sa',
+    'sto', 'sta', 'può', 'posso', 'puoi', 'devo', 'voglio', 'vorrei', 'serve', 'servirebbe', 'capisco',
+    'funziona', 'funzionano', 'prenotare', 'prenotazione', 'appuntamento', 'problema', 'problemi',
+    'aiuto', 'scusa', 'scusi', 'internet', 'computer', 'pc', 'stampante', 'wifi', 'rete', 'telefono',
+}
+
+# Surname particles: "De Luca", "Della Valle", "Di Stefano"
+_PARTICLES = {'d', 'da', 'dal', 'dalla', 'de', 'dei', 'degli', 'del', 'della', 'delle', 'di', 'la', 'lo',
+              'van', 'von'}
+
+# Longer messages are left to the LLM: they usually say more than one thing
+_MAX_LOCAL_WORDS = 6
+
+
+def next_reply(user_data: UserData, repeated: bool = False) -> str:
+    """Ask for the first missing field, or close the questionnaire"""
+    missing = user_data.missing_fields()
+    if not missing:
+        return COMPLETE
+    first, again = QUESTIONS[missing[0]]
+    return again if repeated else first
+
+
+def invalid_reply(field: str) -> str:
+    """Reply to a value the field's validator rejected"""
+    return INVALID.get(field, QUESTIONS[field][1])
+
+
+def all_phrases() -> List[str]:
+    """Every fixed reply, for pre-rendering their audio"""
+    phrases = [phrase for pair in QUESTIONS.values() for phrase in pair]
+    return phrases + list(INVALID.values()) + [COMPLETE]
+
+
+def clean_value(field: str, value: str) -> str:
+    """Normalize a collected value into the form the validators expect"""
+    value = value.strip()
+    if field == 'telefono':
+        return re.sub(r'[\s./-]', '', value)
+    if field == 'email':
+        return value.lower()
+    return value
+
+
+def _capitalize(word: str) -> str:
+    """Upper-case the first letter only, keeping D'Angelo and McDonald intact"""
+    return word[:1].upper() + word[1:]
+
+
+def _is_name(words: List[str]) -> bool:
+    """Check that every word could be part of a name"""
+    return all(word.lower() not in _NOT_NAME_WORDS for word in words)
+
+
+def _parse_name(text: str) -> Dict[str, str]:
+    """A first name, and the surname when introduced as "Mi chiamo Mario Rossi".
+
+    Without a prefix only a single word is taken: two words may be a
+    compound first name ("Maria Grazia") as well as name and surname.
+    """
+    match = _NAME_PREFIX.match(text)
+    body = match.group(2) if match else text.rstrip('.')
+    if not _NAME_WORDS.match(body):
+        return {}
+    words = body.split()
+    if not _is_name(words) or len(words) > (2 if match else 1):
+        return {}
+    if match and match.group(1).lower() == 'sono' and not all(word[0].isupper() for word in words):
+        return {}  # "sono stanco", "sono tornato": a capital letter marks the name
+    found = {'nome': _capitalize(words[0])}
+    if len(words) > 1:
+        # "Mi chiamo Mario Rossi" answers the next question too
+        found['cognome'] = _capitalize(words[1])
+    return found
+
+
+def _parse_surname(text: str) -> Dict[str, str]:
+    """A surname, bare or introduced as "Il mio cognome è ..." """
+    match = _SURNAME_PREFIX.match(text)
+    body = match.group(2) if match else text.rstrip('.')
+    if not _NAME_WORDS.match(body):
+        return {}
+    words = body.split()
+    if not _is_name(words[-1:]) or not all(word.lower() in _PARTICLES for word in words[:-1]):
+        return {}
+    return {'cognome': ' '.join(_capitalize(word) for word in words)}
+
+
+def parse_answer(field: str, text: str) -> Dict[str, str]:
+    """Parse a short answer to the question for field without the LLM.
+
+    Phone numbers and email addresses are picked up wherever they appear.
+    An empty result means the message needs the LLM extractor.
+    """
+    text = text.strip()
+    found: Dict[str, str] = {}
+
+    phone = _PHONE.search(text)
+    if phone:
+        found['telefono'] = clean_value('telefono', phone.group(0))
+    email = _EMAIL.search(text)
+    if email:
+        found['email'] = clean_value('email', email.group(0))
+    if field in found or '?' in text or len(text.split()) > _MAX_LOCAL_WORDS:
+        return found
+
+    if text.split() and text.split()[0].lower().strip('!.,') in _NOT_NAMES:
+        return found
+
+    if field == 'nome':
+        found.update(_parse_name(text))
+    elif field == 'cognome':
+        found.update(_parse_surname(text))
+    elif field == 'via_numero':
+        match = _STREET.match(text)
+        if match:
+            found['via_numero'] = match.group(1).strip()
+    elif field == 'paese_cap':
+        match = _POSTCODE_TOWN.match(text)
+        if match:
+            found['paese_cap'] = f"{match.group(1)} {match.group(2).strip()}"
+        else:
+            match = _TOWN_POSTCODE.match(text)
+            if match:
+                found['paese_cap'] = f"{match.group(2)} {match.group(1).strip()}"
+    return found
+
+
+def first_missing(user_data: UserData) -> Optional[str]:
+    """The field the questionnaire is currently asking for"""
+    missing = user_data.missing_fields()
+    return missing[0] if missing else None
+
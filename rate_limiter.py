@@ -0,0 +1,100 @@
+import logging
+import time
+from typing import Dict
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Classic token bucket: refills at rate tokens/second up to burst"""
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def has_token(self, now: float) -> bool:
+        """Check for a token without consuming it"""
+        self._refill(now)
+        return self.tokens >= 1
+
+    def take(self, now: float) -> bool:
+        """Consume one token if available"""
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def is_full(self, now: float) -> bool:
+        """Check whether the bucket has refilled completely (idle client)"""
+        return self.tokens + (now - self.updated) * self.rate >= self.burst
+
+
+class RateLimiter:
+    """Per-user and per-chat token buckets in front of the message handlers.
+
+    A message is admitted only if both its user's and its chat's bucket have
+    a token, so one user cannot flood a group and many users cannot flood a
+    single chat. Throttle notices are rate limited too: at most one per user
+    every THROTTLE_NOTICE_SECONDS.
+    """
+
+    def __init__(self):
+        self.user_rate = Config.RATE_LIMIT_USER_PER_MINUTE / 60
+        self.user_burst = Config.RATE_LIMIT_USER_BURST
+        self.chat_rate = Config.RATE_LIMIT_CHAT_PER_MINUTE / 60
+        self.chat_burst = Config.RATE_LIMIT_CHAT_BURST
+        self._users: Dict[int, TokenBucket] = {}
+        self._chats: Dict[int, TokenBucket] = {}
+        self._notified: Dict[int, float] = {}  # user id -> last throttle notice
+        self._next_purge = 0.0
+        self._stats = {'allowed': 0, 'throttled': 0, 'notices': 0}
+
+    def _purge(self, now: float):
+        """Forget buckets of idle clients; a full bucket is the same as a new one"""
+        if now < self._next_purge:
+            return
+        self._next_purge = now + 60
+        self._users = {key: bucket for key, bucket in self._users.items() if not bucket.is_full(now)}
+        self._chats = {key: bucket for key, bucket in self._chats.items() if not bucket.is_full(now)}
+        self._notified = {key: at for key, at in self._notified.items()
+                          if now - at < Config.THROTTLE_NOTICE_SECONDS}
+
+    def allow(self, user_id: int, chat_id: int) -> bool:
+        """Admit or throttle a message from user_id in chat_id"""
+        now = time.monotonic()
+        self._purge(now)
+
+        user = self._users.get(user_id)
+        if user is None:
+            user = self._users[user_id] = TokenBucket(self.user_rate, self.user_burst)
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = self._chats[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+
+        # Check the chat first so a throttled chat does not drain user tokens
+        allowed = chat.has_token(now) and user.take(now) and chat.take(now)
+        self._stats['allowed' if allowed else 'throttled'] += 1
+        return allowed
+
+    def should_notify(self, user_id: int) -> bool:
+        """Whether a throttled user should be told, at most once per interval"""
+        now = time.monotonic()
+        last = self._notified.get(user_id)
+        if last is not None and now - last < Config.THROTTLE_NOTICE_SECONDS:
+            return False
+        self._notified[user_id] = now
+        self._stats['notices'] += 1
+        return True
+
+    def stats(self) -> Dict:
+        """Return admission counters and tracked clients"""
+        return dict(self._stats, users=len(self._users), chats=len(self._chats))
@@ -2,5 +2,8 @@
 from .openai_service import OpenAIService
 from .elevenlabs_service import ElevenLabsService
 from .calendar_service import CalendarService
+from .calendar_pool import CalendarPool
+from .reservations import Booking, SlotReservations
+from .stt_service import SpeechToTextService
 
-__all__ = ['OpenAIService', 'ElevenLabsService', 'CalendarService'] 
\ No newline at end of file
+__all__ = ['OpenAIService', 'ElevenLabsService', 'CalendarService', 'CalendarPool', 'SlotReservations', 'Booking', 'SpeechToTextService'] 
\ No newline at end of file
@@ -0,0 +1,54 @@
+import json
+import logging
+import re
+from typing import Dict, List, Optional
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_POSTCODE = re.compile(r'\b(\d{4})\b')
+
+
+class CalendarPool:
+    """Maps customers to the technician calendars that may serve them.
+
+    CALENDAR_POOL is a JSON object whose keys are Swiss postcode prefixes
+    and whose values are lists of calendar IDs, e.g.
+    {"69": ["lugano-a@...", "lugano-b@..."], "65": ["bellinzona@..."], "*": ["main@..."]}.
+    The longest prefix of the customer's postcode (from paese_cap) wins and
+    "*" is the fallback. Without CALENDAR_POOL the pool is CALENDAR_ID alone.
+    """
+
+    def __init__(self, pool_json: str = None, default_calendar: str = None):
+        default_calendar = default_calendar or Config.CALENDAR_ID
+        self.regions: Dict[str, List[str]] = {'*': [default_calendar]}
+        pool_json = pool_json if pool_json is not None else Config.CALENDAR_POOL
+        if pool_json:
+            try:
+                regions = json.loads(pool_json)
+                self.regions = {
+                    str(prefix): [calendars] if isinstance(calendars, str) else list(calendars)
+                    for prefix, calendars in regions.items() if calendars
+                }
+            except (json.JSONDecodeError, AttributeError, TypeError) as e:
+                logger.error(f"Invalid CALENDAR_POOL, using CALENDAR_ID only: {e}")
+        logger.info(f"Calendar pool: {len(self.all_calendars())} calendars in {len(self.regions)} regions")
+
+    def all_calendars(self) -> List[str]:
+        """Every calendar in the pool, in configuration order"""
+        seen: Dict[str, None] = {}
+        for calendars in self.regions.values():
+            for calendar_id in calendars:
+                seen.setdefault(calendar_id)
+        return list(seen)
+
+    def calendars_for(self, paese_cap: Optional[str]) -> List[str]:
+        """Calendars serving a customer's region, by longest postcode prefix"""
+        match = _POSTCODE.search(paese_cap or '')
+        if match:
+            postcode = match.group(1)
+            for length in range(len(postcode), 0, -1):
+                calendars = self.regions.get(postcode[:length])
+                if calendars:
+                    return calendars
+        return self.regions.get('*') or self.all_calendars()
@@ -1,17 +1,33 @@
+import asyncio
+import contextlib
 import json
 import logging
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+from zoneinfo import ZoneInfo
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from config import Config
 from models import UserData, AppointmentRequest
+from .reservations import Booking, SlotReservations
+from .calendar_pool import CalendarPool
+from .http_transport import HttplibPool
+from .resilience import breaker
 
 logger = logging.getLogger(__name__)
 
+# Calendar API recommends at most 50 calls per batch request
+BATCH_SIZE = 50
+
+# Calendars per freebusy request accepted by the API
+FREEBUSY_MAX_ITEMS = 50
+
 class CalendarService:
     def __init__(self):
         self.calendar_id = Config.CALENDAR_ID
+        self.pool = CalendarPool()
+        self.timezone = ZoneInfo(Config.TIMEZONE)
+        self.reservations = SlotReservations()
         self.service = self._authenticate()
     
     def _authenticate(self):
@@ -26,8 +42,9 @@ class CalendarService:
                 scopes=['https://www.googleapis.com/auth/calendar']
             )
             
-            # Build service
+            # Build service; requests run on pooled connections (see _execute)
             service = build('calendar', 'v3', credentials=credentials)
+            self.http_pool = HttplibPool('google_calendar', credentials)
             logger.info("Successfully authenticated with Google Calendar")
             return service
             
@@ -35,29 +52,50 @@ class CalendarService:
             logger.error(f"Error authenticating with Google Calendar: {e}")
             raise
     
-    async def check_availability(self, date_str: str, time_str: str, duration_minutes: int = 60) -> bool:
-        """Check if a time slot is available"""
+    def _slot_start(self, date_str: str, time_str: str) -> datetime:
+        """Parse a date and time into an aware datetime in the calendar timezone"""
+        return datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M").replace(tzinfo=self.timezone)
+    
+    async def _execute(self, request):
+        """Execute an API request in a thread pool on a pooled connection"""
+        def execute_sync():
+            with self.http_pool.connection() as http:
+                return request.execute(http=http)
+        
+        return await breaker('google_calendar').call(
+            lambda: asyncio.get_event_loop().run_in_executor(None, execute_sync),
+            timeout=Config.CALENDAR_TIMEOUT_SECONDS
+        )
+    
+    @staticmethod
+    def _is_free(slot: datetime, duration: timedelta, busy: List[Tuple[datetime, datetime]]) -> bool:
+        """Check that a slot overlaps none of the busy intervals"""
+        return all(slot + duration <= busy_start or slot >= busy_end for busy_start, busy_end in busy)
+    
+    @staticmethod
+    def _busy_minutes(busy: List[Tuple[datetime, datetime]]) -> float:
+        """Total busy time, used as a calendar's load"""
+        return sum((busy_end - busy_start).total_seconds() for busy_start, busy_end in busy) / 60
+    
+    async def check_availability(self, date_str: str, time_str: str, duration_minutes: int = 60,
+                                 paese_cap: Optional[str] = None) -> bool:
+        """Check if a time slot is free on any calendar serving the customer's region"""
         try:
-            # Parse date and time
-            appointment_datetime = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M")
-            
-            # Create time range for the appointment
-            start_time = appointment_datetime.isoformat() + 'Z'
-            end_time = (appointment_datetime + timedelta(minutes=duration_minutes)).isoformat() + 'Z'
-            
-            # Query calendar for events in this time range
-            events_result = self.service.events().list(
-                calendarId=self.calendar_id,
-                timeMin=start_time,
-                timeMax=end_time,
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
+            start = self._slot_start(date_str, time_str)
+            duration = timedelta(minutes=duration_minutes)
             
-            events = events_result.get('items', [])
+            # Slots confirmed by this instance are known busy without a network round-trip
+            calendars = [
+                calendar_id for calendar_id in self.pool.calendars_for(paese_cap)
+                if not self.reservations.is_booked(calendar_id, start, duration_minutes)
+            ]
+            if not calendars:
+                logger.info(f"Availability check for {date_str} {time_str}: Busy (booked locally)")
+                return False
             
-            # If no events found, slot is available
-            is_available = len(events) == 0
+            # Query all candidate calendars for this time range at once
+            busy = await self.get_pool_busy(start, start + duration, calendars)
+            is_available = any(self._is_free(start, duration, intervals) for intervals in busy.values())
             logger.info(f"Availability check for {date_str} {time_str}: {'Available' if is_available else 'Busy'}")
             
             return is_available
@@ -66,78 +104,276 @@ class CalendarService:
             logger.error(f"Error checking availability: {e}")
             return False
     
-    async def create_appointment(self, appointment_request: AppointmentRequest) -> Optional[str]:
-        """Create a new appointment in Google Calendar"""
-        try:
-            user_data = appointment_request.user_data
+    def booking_key(self, appointment_request: AppointmentRequest) -> str:
+        """Idempotency key of a booking: same customer and slot, same booking"""
+        user_data = appointment_request.user_data
+        return self.reservations.idempotency_key(
+            user_data.email or user_data.telefono or "",
+            appointment_request.data_preferita,
+            appointment_request.ora_preferita
+        )
+    
+    def _rank_calendars(self, start: datetime, duration: timedelta, calendars: List[str],
+                        busy: Dict[str, List[Tuple[datetime, datetime]]]) -> Tuple[List[str], List[str]]:
+        """Split calendars into those free at the slot, least loaded first, and those busy"""
+        free = [calendar_id for calendar_id in calendars
+                if calendar_id in busy and self._is_free(start, duration, busy[calendar_id])]
+        taken = [calendar_id for calendar_id in calendars if calendar_id in busy and calendar_id not in free]
+        # The sort is stable, so pool order breaks ties
+        free.sort(key=lambda calendar_id: self._busy_minutes(busy[calendar_id]))
+        return free, taken
+    
+    async def book_appointment(self, appointment_request: AppointmentRequest, idempotency_key: str,
+                               duration_minutes: int = 60) -> Optional[Booking]:
+        """Book a slot exactly once on the least loaded calendar that has it free.
+        
+        Returns the booking (calendar, event id and link), or None when the
+        slot is taken on every calendar serving the customer. API errors
+        propagate so callers can retry; retries reuse the idempotency key.
+        """
+        start = self._slot_start(appointment_request.data_preferita, appointment_request.ora_preferita)
+        duration = timedelta(minutes=duration_minutes)
+        calendars = self.pool.calendars_for(appointment_request.user_data.paese_cap)
+        
+        async with self.reservations.lock(idempotency_key):
+            # A retried request returns the booking that already succeeded
+            booking = self.reservations.completed(idempotency_key)
+            if booking is not None:
+                logger.info(f"Booking {idempotency_key} already completed")
+                return booking
             
-            # Parse appointment datetime
-            appointment_datetime = datetime.strptime(
-                f"{appointment_request.data_preferita} {appointment_request.ora_preferita}", 
-                "%Y-%m-%d %H:%M"
-            )
+            # One freebusy query checks the slot on every candidate calendar; the
+            # rest of the appointment's day measures each calendar's current load
+            day_start = start.replace(hour=0, minute=0)
+            busy = await self.get_pool_busy(day_start, day_start + timedelta(days=1), calendars)
+            if not busy:
+                raise RuntimeError(f"No availability returned for calendars {calendars}")
+            free, taken = self._rank_calendars(start, duration, calendars, busy)
             
-            # Create event
-            event = {
-                'summary': f'Appuntamento - {user_data.nome} {user_data.cognome}',
-                'description': f"""
-                Motivo: {appointment_request.motivo}
-                
-                Dettagli cliente:
-                Nome: {user_data.nome} {user_data.cognome}
-                Telefono: {user_data.telefono}
-                Email: {user_data.email}
-                Indirizzo: {user_data.via_numero}, {user_data.paese_cap}
-                
-                Prenotato tramite bot Telegram
-                """.strip(),
-                'start': {
-                    'dateTime': appointment_datetime.isoformat(),
-                    'timeZone': 'Europe/Zurich',
-                },
-                'end': {
-                    'dateTime': (appointment_datetime + timedelta(hours=1)).isoformat(),
-                    'timeZone': 'Europe/Zurich',
-                },
-                'attendees': [
-                    {'email': user_data.email, 'displayName': f'{user_data.nome} {user_data.cognome}'},
-                ],
-                'reminders': {
-                    'useDefault': False,
-                    'overrides': [
-                        {'method': 'email', 'minutes': 24 * 60},  # 1 day before
-                        {'method': 'popup', 'minutes': 60},  # 1 hour before
-                    ],
-                },
-            }
+            # A previous attempt of this booking (e.g. before a restart) may have
+            # inserted the event already; it can only be on a calendar now busy
+            existing = await self._find_booking(taken, start, start + duration, idempotency_key)
+            if existing is not None:
+                self.reservations.confirm(start, duration_minutes, idempotency_key, existing)
+                return existing
             
-            # Create the event
-            created_event = self.service.events().insert(
-                calendarId=self.calendar_id, 
-                body=event
-            ).execute()
+            for calendar_id in free:
+                if not self.reservations.try_hold(calendar_id, start, duration_minutes, idempotency_key):
+                    logger.info(f"Slot {start} on {calendar_id} is held by another booking")
+                    continue
+                try:
+                    booking = await self._insert_event(appointment_request, idempotency_key, calendar_id)
+                    self.reservations.confirm(start, duration_minutes, idempotency_key, booking)
+                    return booking
+                finally:
+                    self.reservations.release(calendar_id, start, duration_minutes, idempotency_key)
             
-            event_id = created_event['id']
-            event_link = created_event.get('htmlLink', '')
+            logger.info(f"Slot {start} is busy on all {len(calendars)} calendars")
+            return None
+    
+    async def _find_booking(self, calendar_ids: List[str], start: datetime, end: datetime,
+                            idempotency_key: str) -> Optional[Booking]:
+        """Find an event tagged with the idempotency key on any of the calendars"""
+        async def find(calendar_id: str) -> Optional[Booking]:
+            events_result = await self._execute(self.service.events().list(
+                calendarId=calendar_id,
+                timeMin=start.isoformat(),
+                timeMax=end.isoformat(),
+                singleEvents=True,
+                privateExtendedProperty=f"idempotency_key={idempotency_key}"
+            ))
+            items = events_result.get('items', [])
+            return Booking(calendar_id, items[0]['id'], items[0].get('htmlLink', '')) if items else None
+        
+        found = await asyncio.gather(*(find(calendar_id) for calendar_id in calendar_ids))
+        return next((result for result in found if result is not None), None)
+    
+    def _build_event(self, appointment_request: AppointmentRequest,
+                     idempotency_key: Optional[str] = None) -> Dict:
+        """Build the Google Calendar event body for an appointment request"""
+        user_data = appointment_request.user_data
+        
+        # Parse appointment datetime
+        appointment_datetime = datetime.strptime(
+            f"{appointment_request.data_preferita} {appointment_request.ora_preferita}", 
+            "%Y-%m-%d %H:%M"
+        )
+        
+        # Create event
+        event = {
+            'summary': f'Appuntamento - {user_data.nome} {user_data.cognome}',
+            'description': f"""
+            Motivo: {appointment_request.motivo}
+            
+            Dettagli cliente:
+            Nome: {user_data.nome} {user_data.cognome}
+            Telefono: {user_data.telefono}
+            Email: {user_data.email}
+            Indirizzo: {user_data.via_numero}, {user_data.paese_cap}
             
-            logger.info(f"Created appointment with ID: {event_id}")
-            return event_link
+            Prenotato tramite bot Telegram
+            """.strip(),
+            'start': {
+                'dateTime': appointment_datetime.isoformat(),
+                'timeZone': Config.TIMEZONE,
+            },
+            'end': {
+                'dateTime': (appointment_datetime + timedelta(hours=1)).isoformat(),
+                'timeZone': Config.TIMEZONE,
+            },
+            'attendees': [
+                {'email': user_data.email, 'displayName': f'{user_data.nome} {user_data.cognome}'},
+            ],
+            'reminders': {
+                'useDefault': False,
+                'overrides': [
+                    {'method': 'email', 'minutes': 24 * 60},  # 1 day before
+                    {'method': 'popup', 'minutes': 60},  # 1 hour before
+                ],
+            },
+        }
+        
+        # Tag the event so retries of the same booking can find it
+        if idempotency_key:
+            event['extendedProperties'] = {'private': {'idempotency_key': idempotency_key}}
+        
+        return event
+    
+    async def _insert_event(self, appointment_request: AppointmentRequest,
+                            idempotency_key: Optional[str] = None, calendar_id: Optional[str] = None) -> Booking:
+        """Insert the appointment event and return where it was booked; errors propagate"""
+        calendar_id = calendar_id or self.calendar_id
+        event = self._build_event(appointment_request, idempotency_key)
+        
+        # Create the event
+        created_event = await self._execute(self.service.events().insert(
+            calendarId=calendar_id, 
+            body=event
+        ))
+        
+        booking = Booking(calendar_id, created_event['id'], created_event.get('htmlLink', ''))
+        
+        logger.info(f"Created appointment with ID: {booking.event_id} on calendar {calendar_id}")
+        return booking
+    
+    async def create_appointment(self, appointment_request: AppointmentRequest,
+                                 idempotency_key: Optional[str] = None) -> Optional[Booking]:
+        """Create a new appointment in Google Calendar"""
+        try:
+            return await self._insert_event(appointment_request, idempotency_key)
             
         except Exception as e:
             logger.error(f"Error creating appointment: {e}")
             return None
     
-    async def get_available_slots(self, date_str: str, start_hour: int = 9, end_hour: int = 17) -> List[str]:
-        """Get available time slots for a given date"""
+    async def get_pool_busy(self, start: datetime, end: datetime,
+                            calendar_ids: List[str]) -> Dict[str, List[Tuple[datetime, datetime]]]:
+        """Get busy intervals of several calendars with one freebusy query per 50 calendars.
+        
+        Calendars the API reports errors for (e.g. not shared with the
+        service account) are left out, so callers treat them as unavailable.
+        """
+        async def query(chunk: List[str]) -> Dict:
+            body = {
+                'timeMin': start.isoformat(),
+                'timeMax': end.isoformat(),
+                'timeZone': Config.TIMEZONE,
+                'items': [{'id': calendar_id} for calendar_id in chunk],
+            }
+            result = await self._execute(self.service.freebusy().query(body=body))
+            return result.get('calendars', {})
+        
+        chunks = [calendar_ids[offset:offset + FREEBUSY_MAX_ITEMS]
+                  for offset in range(0, len(calendar_ids), FREEBUSY_MAX_ITEMS)]
+        busy: Dict[str, List[Tuple[datetime, datetime]]] = {}
+        for calendars in await asyncio.gather(*(query(chunk) for chunk in chunks)):
+            for calendar_id, info in calendars.items():
+                if info.get('errors'):
+                    logger.warning(f"Freebusy error for calendar {calendar_id}: {info['errors']}")
+                    continue
+                busy[calendar_id] = [
+                    (datetime.fromisoformat(interval['start']).astimezone(self.timezone),
+                     datetime.fromisoformat(interval['end']).astimezone(self.timezone))
+                    for interval in info.get('busy', [])
+                ]
+        return busy
+    
+    async def get_busy_intervals(self, start: datetime, end: datetime) -> List[Tuple[datetime, datetime]]:
+        """Get busy intervals of the main calendar between two aware datetimes"""
+        busy = await self.get_pool_busy(start, end, [self.calendar_id])
+        return busy.get(self.calendar_id, [])
+    
+    def _candidate_slots(self, first_day: datetime, last_day: datetime, duration_minutes: int) -> List[datetime]:
+        """Generate slot start times within business hours on working days"""
+        candidates = []
+        step = timedelta(minutes=Config.SLOT_STEP_MINUTES)
+        duration = timedelta(minutes=duration_minutes)
+        day = first_day.date()
+        
+        while day <= last_day.date():
+            if day.weekday() < 5:  # Monday to Friday
+                slot = datetime(day.year, day.month, day.day, Config.BUSINESS_HOUR_START, tzinfo=self.timezone)
+                closing = datetime(day.year, day.month, day.day, Config.BUSINESS_HOUR_END, tzinfo=self.timezone)
+                while slot + duration <= closing:
+                    candidates.append(slot)
+                    slot += step
+            day += timedelta(days=1)
+        
+        return candidates
+    
+    async def propose_slots(self, date_str: str, time_str: str, count: int = None,
+                            duration_minutes: int = 60, paese_cap: Optional[str] = None) -> List[Tuple[str, str]]:
+        """Propose the free slots nearest to the requested date and time, on any calendar of the region"""
+        try:
+            count = count or Config.SLOT_PROPOSALS
+            requested = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M").replace(tzinfo=self.timezone)
+            now = datetime.now(self.timezone)
+            
+            # One query covers the whole search window around the requested time
+            window_start = max(requested - timedelta(days=Config.SLOT_SEARCH_DAYS), now)
+            window_end = requested + timedelta(days=Config.SLOT_SEARCH_DAYS + 1)
+            window_start = window_start.replace(hour=0, minute=0, second=0, microsecond=0)
+            window_end = window_end.replace(hour=0, minute=0, second=0, microsecond=0)
+            busy = await self.get_pool_busy(window_start, window_end, self.pool.calendars_for(paese_cap))
+            
+            # A slot is free if at least one calendar of the pool can take it
+            duration = timedelta(minutes=duration_minutes)
+            free_slots = [
+                slot for slot in self._candidate_slots(window_start, window_end - timedelta(days=1), duration_minutes)
+                if slot > now and any(
+                    not self.reservations.is_taken(calendar_id, slot, duration_minutes)
+                    and self._is_free(slot, duration, intervals)
+                    for calendar_id, intervals in busy.items()
+                )
+            ]
+            
+            # Rank by distance from the requested time
+            free_slots.sort(key=lambda slot: abs((slot - requested).total_seconds()))
+            proposals = [(slot.strftime("%Y-%m-%d"), slot.strftime("%H:%M")) for slot in free_slots[:count]]
+            
+            logger.info(f"Proposed {len(proposals)} slots around {date_str} {time_str}")
+            return proposals
+            
+        except Exception as e:
+            logger.error(f"Error proposing slots: {e}")
+            return []
+    
+    async def get_available_slots(self, date_str: str, start_hour: int = 9, end_hour: int = 17,
+                                  paese_cap: Optional[str] = None) -> List[str]:
+        """Get time slots of a given date that are free on at least one calendar of the region"""
         try:
             available_slots = []
-            target_date = datetime.strptime(date_str, "%Y-%m-%d").date()
+            target_date = datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=self.timezone)
+            
+            # Fetch the whole day for every calendar at once instead of one query per hour
+            busy = await self.get_pool_busy(target_date, target_date + timedelta(days=1),
+                                            self.pool.calendars_for(paese_cap))
             
             # Check each hour slot
             for hour in range(start_hour, end_hour):
-                time_str = f"{hour:02d}:00"
-                if await self.check_availability(date_str, time_str):
-                    available_slots.append(time_str)
+                slot_start = target_date.replace(hour=hour)
+                if any(self._is_free(slot_start, timedelta(hours=1), intervals) for intervals in busy.values()):
+                    available_slots.append(f"{hour:02d}:00")
             
             logger.info(f"Found {len(available_slots)} available slots for {date_str}")
             return available_slots
@@ -146,17 +382,251 @@ class CalendarService:
             logger.error(f"Error getting available slots: {e}")
             return []
     
-    async def cancel_appointment(self, event_id: str) -> bool:
-        """Cancel an appointment"""
+    def _event_time(self, value: Dict) -> datetime:
+        """Parse an event start or end; times without an offset are in the event's timezone"""
+        moment = datetime.fromisoformat(value['dateTime'])
+        if moment.tzinfo is None:
+            return moment.replace(tzinfo=ZoneInfo(value.get('timeZone', Config.TIMEZONE)))
+        return moment.astimezone(self.timezone)
+    
+    def _forget_event(self, calendar_id: str, event: Optional[Dict]):
+        """Release the local booking of an event that was cancelled or moved"""
+        if not event or 'dateTime' not in event.get('start', {}):
+            return
+        start, end = (self._event_time(event[edge]) for edge in ('start', 'end'))
+        self.reservations.forget(calendar_id, start, int((end - start).total_seconds() // 60))
+    
+    async def _get_events_batch(self, events: List[Tuple[str, str]]) -> List[Optional[Dict]]:
+        """Fetch (calendar_id, event_id) events in batches; None for events that could not be read"""
+        results = await self._execute_batch([
+            self.service.events().get(calendarId=calendar_id, eventId=event_id) for calendar_id, event_id in events
+        ])
+        return [result['response'] for result in results]
+    
+    async def cancel_appointment(self, calendar_id: str, event_id: str) -> bool:
+        """Cancel an appointment on its pool calendar and free its slot in the local reservations"""
         try:
-            self.service.events().delete(
-                calendarId=self.calendar_id,
+            # The slot is only known from the event itself
+            event = await self._execute(self.service.events().get(calendarId=calendar_id, eventId=event_id))
+            await self._execute(self.service.events().delete(
+                calendarId=calendar_id,
                 eventId=event_id
-            ).execute()
+            ))
+            self._forget_event(calendar_id, event)
             
-            logger.info(f"Cancelled appointment with ID: {event_id}")
+            logger.info(f"Cancelled appointment with ID: {event_id} on calendar {calendar_id}")
             return True
             
         except Exception as e:
             logger.error(f"Error cancelling appointment: {e}")
-            return False 
\ No newline at end of file
+            return False
+    
+    async def _execute_batch(self, requests: List) -> List[Dict]:
+        """Execute API requests in batches and collect the outcome of each item"""
+        results: List[Dict] = [None] * len(requests)
+        
+        def callback(request_id, response, exception):
+            index = int(request_id)
+            if exception is not None:
+                results[index] = {'index': index, 'success': False, 'response': None, 'error': str(exception)}
+            else:
+                results[index] = {'index': index, 'success': True, 'response': response, 'error': None}
+        
+        def execute_sync():
+            for offset in range(0, len(requests), BATCH_SIZE):
+                batch = self.service.new_batch_http_request(callback=callback)
+                for index, request in enumerate(requests[offset:offset + BATCH_SIZE], start=offset):
+                    batch.add(request, request_id=str(index))
+                try:
+                    with self.http_pool.connection() as http:
+                        batch.execute(http=http)
+                except Exception as e:
+                    # The whole batch failed - mark its items that got no callback
+                    logger.error(f"Error executing calendar batch at offset {offset}: {e}")
+                    for index in range(offset, min(offset + BATCH_SIZE, len(requests))):
+                        if results[index] is None:
+                            results[index] = {'index': index, 'success': False, 'response': None, 'error': str(e)}
+        
+        # Run the sync Google client in a thread pool
+        await asyncio.get_event_loop().run_in_executor(None, execute_sync)
+        
+        succeeded = sum(1 for result in results if result['success'])
+        logger.info(f"Calendar batch finished: {succeeded}/{len(results)} succeeded")
+        return results
+    
+    async def create_appointments_batch(self, appointment_requests: List[AppointmentRequest],
+                                        duration_minutes: int = 60) -> List[Dict]:
+        """Book many appointments with batched inserts, one result per request.
+        
+        Every request follows the rules of book_appointment: its idempotency
+        key, a hold on the slot and the least loaded free calendar of the
+        customer's region. Requests whose slot is taken everywhere fail with
+        'slot unavailable'; errors of the availability query propagate.
+        """
+        duration = timedelta(minutes=duration_minutes)
+        keys = [self.booking_key(request) for request in appointment_requests]
+        starts = [self._slot_start(request.data_preferita, request.ora_preferita) for request in appointment_requests]
+        candidates = [self.pool.calendars_for(request.user_data.paese_cap) for request in appointment_requests]
+        results = [
+            {'index': index, 'success': False, 'calendar_id': None, 'event_id': None, 'event_link': None,
+             'error': None}
+            for index in range(len(appointment_requests))
+        ]
+        if not appointment_requests:
+            return results
+        
+        async with contextlib.AsyncExitStack() as stack:
+            # Sorted, so two batches sharing keys cannot deadlock
+            for key in sorted(set(keys)):
+                await stack.enter_async_context(self.reservations.lock(key))
+            
+            # One freebusy query covers every candidate calendar and day of the batch
+            days = [start.replace(hour=0, minute=0) for start in starts]
+            calendars = list(dict.fromkeys(calendar_id for group in candidates for calendar_id in group))
+            busy = await self.get_pool_busy(min(days), max(days) + timedelta(days=1), calendars)
+            
+            def day_busy(index: int) -> Dict[str, List[Tuple[datetime, datetime]]]:
+                day_end = days[index] + timedelta(days=1)
+                return {
+                    calendar_id: [(b_start, b_end) for b_start, b_end in busy[calendar_id]
+                                  if b_start < day_end and b_end > days[index]]
+                    for calendar_id in candidates[index] if calendar_id in busy
+                }
+            
+            # Completed bookings and duplicate keys need no insert
+            todo = []
+            first_of_key: Dict[str, int] = {}
+            for index, key in enumerate(keys):
+                booking = self.reservations.completed(key)
+                if booking is not None:
+                    results[index].update(success=True, **booking._asdict())
+                elif key in first_of_key:
+                    results[index]['error'] = f"duplicate of request {first_of_key[key]}"
+                else:
+                    first_of_key[key] = index
+                    todo.append(index)
+            
+            # Events inserted by an earlier attempt sit on calendars now busy at their slot
+            found = await asyncio.gather(*(
+                self._find_booking(self._rank_calendars(starts[index], duration, candidates[index],
+                                                        day_busy(index))[1],
+                                   starts[index], starts[index] + duration, keys[index])
+                for index in todo
+            ))
+            assigned = []  # (index, calendar_id)
+            for index, existing in zip(todo, found):
+                if existing is not None:
+                    self.reservations.confirm(starts[index], duration_minutes, keys[index], existing)
+                    results[index].update(success=True, **existing._asdict())
+                    continue
+                
+                # Ranked against the batch's own assignments so far
+                free, _ = self._rank_calendars(starts[index], duration, candidates[index], day_busy(index))
+                for calendar_id in free:
+                    if self.reservations.try_hold(calendar_id, starts[index], duration_minutes, keys[index]):
+                        busy[calendar_id].append((starts[index], starts[index] + duration))
+                        assigned.append((index, calendar_id))
+                        break
+                else:
+                    results[index]['error'] = "slot unavailable"
+            
+            try:
+                inserted = await self._execute_batch([
+                    self.service.events().insert(
+                        calendarId=calendar_id,
+                        body=self._build_event(appointment_requests[index], keys[index])
+                    )
+                    for index, calendar_id in assigned
+                ]) if assigned else []
+                
+                for (index, calendar_id), result in zip(assigned, inserted):
+                    created_event = result['response'] or {}
+                    if result['success']:
+                        booking = Booking(calendar_id, created_event['id'], created_event.get('htmlLink', ''))
+                        self.reservations.confirm(starts[index], duration_minutes, keys[index], booking)
+                        results[index].update(success=True, **booking._asdict())
+                    else:
+                        results[index]['error'] = result['error']
+            finally:
+                for index, calendar_id in assigned:
+                    self.reservations.release(calendar_id, starts[index], duration_minutes, keys[index])
+        
+        succeeded = sum(1 for result in results if result['success'])
+        logger.info(f"Batch booking finished: {succeeded}/{len(results)} booked")
+        return results
+    
+    @staticmethod
+    def _event_key(event_id: str, event: Optional[Dict]) -> str:
+        """Idempotency key of an existing event, or a key derived from its id"""
+        private = (event or {}).get('extendedProperties', {}).get('private', {})
+        return private.get('idempotency_key') or f"event:{event_id}"
+    
+    async def reschedule_appointments_batch(self, moves: List[Tuple[str, str, str, str]],
+                                            duration_minutes: int = 60) -> List[Dict]:
+        """Move many appointments, given as (calendar_id, event_id, date, time), with batched requests.
+        
+        Events stay on their pool calendar. Admin operation: the new slot is
+        not checked against Google availability, but it is held locally so
+        concurrent bookings cannot take it, and the old slot is released once
+        the move succeeds.
+        """
+        # Old slots are read first so their local reservations can be released
+        previous = await self._get_events_batch([(calendar_id, event_id) for calendar_id, event_id, _, _ in moves])
+        results = [
+            {'index': index, 'success': False, 'calendar_id': calendar_id, 'event_id': event_id, 'error': None}
+            for index, (calendar_id, event_id, _, _) in enumerate(moves)
+        ]
+        
+        held = []  # (index, start, key)
+        for index, ((calendar_id, event_id, date_str, time_str), event) in enumerate(zip(moves, previous)):
+            start = self._slot_start(date_str, time_str)
+            key = self._event_key(event_id, event)
+            if event is None:
+                results[index]['error'] = "event not found"
+            elif self.reservations.try_hold(calendar_id, start, duration_minutes, key):
+                held.append((index, start, key))
+            else:
+                results[index]['error'] = "slot unavailable"
+        
+        try:
+            requests = []
+            for index, start, _ in held:
+                calendar_id, event_id = moves[index][:2]
+                body = {
+                    'start': {'dateTime': start.isoformat(), 'timeZone': Config.TIMEZONE},
+                    'end': {'dateTime': (start + timedelta(minutes=duration_minutes)).isoformat(),
+                            'timeZone': Config.TIMEZONE},
+                }
+                requests.append(self.service.events().patch(calendarId=calendar_id, eventId=event_id, body=body))
+            patched = await self._execute_batch(requests) if requests else []
+            
+            for (index, start, key), result in zip(held, patched):
+                if not result['success']:
+                    results[index]['error'] = result['error']
+                    continue
+                calendar_id, event_id = moves[index][:2]
+                self._forget_event(calendar_id, previous[index])
+                self.reservations.confirm(start, duration_minutes, key, Booking(
+                    calendar_id, event_id, (result['response'] or {}).get('htmlLink', '')
+                ))
+                results[index]['success'] = True
+        finally:
+            for index, start, key in held:
+                self.reservations.release(moves[index][0], start, duration_minutes, key)
+        return results
+    
+    async def cancel_appointments_batch(self, events: List[Tuple[str, str]]) -> List[Dict]:
+        """Cancel many (calendar_id, event_id) appointments in batches, releasing their local reservations"""
+        previous = await self._get_events_batch(events)
+        requests = [
+            self.service.events().delete(calendarId=calendar_id, eventId=event_id)
+            for calendar_id, event_id in events
+        ]
+        results = await self._execute_batch(requests)
+        
+        for result, (calendar_id, event_id), event in zip(results, events, previous):
+            result.pop('response')
+            result.update(calendar_id=calendar_id, event_id=event_id)
+            if result['success']:
+                self._forget_event(calendar_id, event)
+        return results
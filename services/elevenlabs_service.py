@@ -1,42 +1,67 @@
 import logging
 import aiofiles
 import asyncio
-from elevenlabs import ElevenLabs
+from elevenlabs import ElevenLabs, AsyncElevenLabs
 from config import Config
 from typing import Optional
 import os
+from .http_transport import sync_client, async_client
+from .resilience import breaker, hedged, CircuitOpenError, LatencyTracker
+from .speech_text import normalize_for_speech, split_for_synthesis
+from .mp3_concat import concat_mp3
 
 logger = logging.getLogger(__name__)
 
 class ElevenLabsService:
     def __init__(self):
-        self.client = ElevenLabs(api_key=Config.ELEVENLABS_API_KEY)
+        # Sync client for the startup connection test only
+        self.client = ElevenLabs(
+            api_key=Config.ELEVENLABS_API_KEY,
+            httpx_client=sync_client('elevenlabs_sync')
+        )
+        # Speech runs on the async client: cancelling a hedge or a timed-out
+        # call closes its HTTP stream instead of leaving a thread to finish it
+        self.async_client = AsyncElevenLabs(
+            api_key=Config.ELEVENLABS_API_KEY,
+            httpx_client=async_client('elevenlabs')
+        )
         self.voice_id = Config.VOICE_ID
         self.api_key_valid = False
+        self.latency = LatencyTracker()
         logger.info(f"ElevenLabs service initialized with voice ID: {self.voice_id}")
         
-    async def text_to_speech(self, text: str) -> Optional[bytes]:
+    async def text_to_speech(self, text: str, previous_text: Optional[str] = None,
+                             next_text: Optional[str] = None) -> Optional[bytes]:
         """Convert text to speech using ElevenLabs API"""
         try:
             logger.info(f"Generating speech for text: {text[:100]}...")
             
-            # Run the sync generate method in a thread pool using new 2.x API
-            def generate_sync():
-                return self.client.text_to_speech.convert(
+            async def synthesize() -> bytes:
+                audio = self.async_client.text_to_speech.convert(
                     voice_id=self.voice_id,
                     text=text,
                     model_id="eleven_multilingual_v2",
-                    output_format="mp3_44100_128"
+                    output_format="mp3_44100_128",
+                    # Surrounding chunks keep intonation continuous across joins
+                    previous_text=previous_text,
+                    next_text=next_text
                 )
-            
-            # Get audio bytes
-            audio_bytes = await asyncio.get_event_loop().run_in_executor(
-                None, generate_sync
+                # convert() streams chunks; cancellation stops the download
+                return b"".join([chunk async for chunk in audio])
+            
+            # Get audio bytes; slow requests past the latency percentile are hedged
+            audio_bytes = await breaker('elevenlabs').call(
+                lambda: hedged(synthesize, self.latency, Config.TTS_HEDGE_PERCENTILE)
+                if Config.TTS_HEDGING else synthesize(),
+                timeout=Config.TTS_TIMEOUT_SECONDS
             )
             
             logger.info(f"Generated audio data size: {len(audio_bytes)} bytes")
             return audio_bytes
             
+        except CircuitOpenError:
+            logger.warning("ElevenLabs circuit open, skipping speech generation")
+            return None
         except Exception as e:
             error_msg = str(e).lower()
             if "invalid api key" in error_msg or "unauthorized" in error_msg:
@@ -51,6 +76,33 @@ class ElevenLabsService:
                 logger.error(f"Text length: {len(text)} characters")
             return None
     
+    async def synthesize(self, text: str) -> Optional[bytes]:
+        """Normalize text for speech, synthesize its chunks concurrently and join the audio"""
+        chunks = split_for_synthesis(normalize_for_speech(text), Config.TTS_CHUNK_CHARS)
+        if not chunks:
+            return None
+        if len(chunks) == 1:
+            return await self.text_to_speech(chunks[0])
+        
+        semaphore = asyncio.Semaphore(Config.TTS_CONCURRENCY)
+        
+        async def synthesize_chunk(index: int) -> Optional[bytes]:
+            async with semaphore:
+                return await self.text_to_speech(
+                    chunks[index],
+                    previous_text=chunks[index - 1] if index > 0 else None,
+                    next_text=chunks[index + 1] if index + 1 < len(chunks) else None
+                )
+        
+        logger.info(f"Synthesizing {len(chunks)} chunks for {len(text)} characters")
+        segments = await asyncio.gather(*(synthesize_chunk(index) for index in range(len(chunks))))
+        if not all(segments):
+            logger.error("Speech generation failed for one or more chunks")
+            return None
+        
+        # Same encoding settings for every chunk, so frames can be joined as they are
+        return concat_mp3(segments)
+    
     async def save_audio_file(self, audio_data: bytes, filename: str) -> str:
         """Save audio data to file and return file path"""
         try:
@@ -74,13 +126,8 @@ class ElevenLabsService:
         try:
             logger.info(f"Starting voice generation for user {user_id}")
             
-            # Check if text is too long
-            if len(text) > 5000:
-                text = text[:4900] + "..."
-                logger.warning("Text truncated to fit ElevenLabs limits")
-            
-            # Generate audio
-            audio_data = await self.text_to_speech(text)
+            # Generate audio; long texts are split rather than truncated
+            audio_data = await self.synthesize(text)
             if not audio_data:
                 logger.error("No audio data generated - likely API key or voice ID issue")
                 return None
@@ -0,0 +1,205 @@
+import contextlib
+import logging
+import queue
+import ssl
+import threading
+import time
+from typing import Dict
+import httpx
+import httplib2
+import google_auth_httplib2
+from telegram.request import HTTPXRequest
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# One TLS context for every provider client, so certificates are loaded once
+# and TLS sessions can be resumed when a pooled connection is re-established
+_SSL_CONTEXT = ssl.create_default_context()
+
+
+class PoolStats:
+    """Utilization counters for one provider's connection pool"""
+
+    def __init__(self, provider: str, limit: int):
+        self.provider = provider
+        self.limit = limit
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.wait_seconds = 0.0  # Time spent waiting for a free pooled connection
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Record a request taking a pooled connection"""
+        with self._lock:
+            self.in_flight += 1
+            self.requests += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def release(self, failed: bool = False):
+        """Record a request giving its connection back"""
+        with self._lock:
+            self.in_flight -= 1
+            if failed:
+                self.errors += 1
+
+    def record_wait(self, seconds: float):
+        """Record time spent waiting for a free connection"""
+        with self._lock:
+            self.wait_seconds += seconds
+
+    def snapshot(self) -> Dict:
+        """Return the counters as a plain dict"""
+        with self._lock:
+            return {
+                'limit': self.limit,
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+                'utilization': round(self.in_flight / self.limit, 3) if self.limit else 0.0,
+                'requests': self.requests,
+                'errors': self.errors,
+                'wait_seconds': round(self.wait_seconds, 3),
+            }
+
+
+_POOL_STATS: Dict[str, PoolStats] = {}
+
+
+def _stats_for(provider: str, limit: int) -> PoolStats:
+    """Get or create the counters for a provider"""
+    if provider not in _POOL_STATS:
+        _POOL_STATS[provider] = PoolStats(provider, limit)
+    return _POOL_STATS[provider]
+
+
+def pool_stats() -> Dict[str, Dict]:
+    """Return utilization metrics for every provider pool"""
+    return {provider: stats.snapshot() for provider, stats in _POOL_STATS.items()}
+
+
+class _MeteredAsyncTransport(httpx.AsyncBaseTransport):
+    """Async transport that counts in-flight requests on a shared pool"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, stats: PoolStats):
+        self._transport = transport
+        self._stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self._stats.acquire()
+        failed = True
+        try:
+            response = await self._transport.handle_async_request(request)
+            failed = False
+            return response
+        finally:
+            self._stats.release(failed)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class _MeteredTransport(httpx.BaseTransport):
+    """Sync transport that counts in-flight requests on a shared pool"""
+
+    def __init__(self, transport: httpx.BaseTransport, stats: PoolStats):
+        self._transport = transport
+        self._stats = stats
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self._stats.acquire()
+        failed = True
+        try:
+            response = self._transport.handle_request(request)
+            failed = False
+            return response
+        finally:
+            self._stats.release(failed)
+
+    def close(self):
+        self._transport.close()
+
+
+def _limits() -> httpx.Limits:
+    """Bounded keep-alive limits shared by every httpx-based provider"""
+    return httpx.Limits(
+        max_connections=Config.HTTP_POOL_SIZE,
+        max_keepalive_connections=Config.HTTP_POOL_SIZE,
+        keepalive_expiry=Config.HTTP_KEEPALIVE_SECONDS,
+    )
+
+
+def async_client(provider: str, timeout: float = 60.0) -> httpx.AsyncClient:
+    """Create a pooled, keep-alive async client for a provider (OpenAI)"""
+    transport = httpx.AsyncHTTPTransport(verify=_SSL_CONTEXT, http2=Config.HTTP2_ENABLED, limits=_limits())
+    stats = _stats_for(provider, Config.HTTP_POOL_SIZE)
+    logger.info(f"HTTP pool for {provider}: {Config.HTTP_POOL_SIZE} connections, http2={Config.HTTP2_ENABLED}")
+    return httpx.AsyncClient(transport=_MeteredAsyncTransport(transport, stats), timeout=timeout)
+
+
+def sync_client(provider: str, timeout: float = 60.0) -> httpx.Client:
+    """Create a pooled, keep-alive sync client for a provider (ElevenLabs)"""
+    transport = httpx.HTTPTransport(verify=_SSL_CONTEXT, http2=Config.HTTP2_ENABLED, limits=_limits())
+    stats = _stats_for(provider, Config.HTTP_POOL_SIZE)
+    logger.info(f"HTTP pool for {provider}: {Config.HTTP_POOL_SIZE} connections, http2={Config.HTTP2_ENABLED}")
+    return httpx.Client(transport=_MeteredTransport(transport, stats), timeout=timeout)
+
+
+class HttplibPool:
+    """Bounded pool of authorized httplib2 connections.
+
+    httplib2.Http is not thread-safe, so each executor thread borrows its own
+    instance for the duration of a request. Connections stay open between
+    requests, keeping the TLS session warm.
+    """
+
+    def __init__(self, provider: str, credentials, size: int = None, timeout: int = 30):
+        self.size = size or Config.GOOGLE_HTTP_POOL_SIZE
+        self.stats = _stats_for(provider, self.size)
+        self._pool: queue.Queue = queue.Queue()
+        for _ in range(self.size):
+            http = httplib2.Http(timeout=timeout)
+            self._pool.put(google_auth_httplib2.AuthorizedHttp(credentials, http=http))
+        logger.info(f"HTTP pool for {provider}: {self.size} httplib2 connections")
+
+    @contextlib.contextmanager
+    def connection(self):
+        """Borrow a connection, waiting if all of them are in use"""
+        started = time.perf_counter()
+        http = self._pool.get()
+        self.stats.record_wait(time.perf_counter() - started)
+        self.stats.acquire()
+        failed = True
+        try:
+            yield http
+            failed = False
+        finally:
+            self.stats.release(failed)
+            self._pool.put(http)
+
+
+class MeteredHTTPXRequest(HTTPXRequest):
+    """Telegram request backend that reports pool utilization"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._stats = _stats_for('telegram', kwargs.get('connection_pool_size', 1))
+
+    async def do_request(self, *args, **kwargs):
+        self._stats.acquire()
+        failed = True
+        try:
+            result = await super().do_request(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            self._stats.release(failed)
+
+
+def telegram_request() -> HTTPXRequest:
+    """Create the pooled request backend for the Telegram Bot API"""
+    return MeteredHTTPXRequest(
+        connection_pool_size=Config.HTTP_POOL_SIZE,
+        http_version="2" if Config.HTTP2_ENABLED else "1.1",
+    )
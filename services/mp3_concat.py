@@ -0,0 +1,67 @@
+from typing import List, Optional
+
+# Joins MP3 segments by concatenating their audio frames, without decoding or
+# re-encoding. Tags and the Xing/Info/VBRI header frame of each segment are
+# dropped: they describe a single segment and would give players a wrong
+# duration for the joined file.
+
+_BITRATES_KBPS = {
+    'mpeg1': [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    'mpeg2': [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}
+
+
+def _id3v2_size(data: bytes) -> int:
+    """Length of a leading ID3v2 tag, or 0"""
+    if len(data) < 10 or data[:3] != b'ID3':
+        return 0
+    size = (data[6] << 21) | (data[7] << 14) | (data[8] << 7) | data[9]
+    footer = 10 if data[5] & 0x10 else 0
+    return 10 + size + footer
+
+
+def _frame_length(data: bytes, offset: int) -> Optional[int]:
+    """Length of the MPEG Layer III frame starting at offset, or None if there is none"""
+    if offset + 4 > len(data) or data[offset] != 0xFF or data[offset + 1] & 0xE0 != 0xE0:
+        return None
+    version = (data[offset + 1] >> 3) & 0x03
+    layer = (data[offset + 1] >> 1) & 0x03
+    bitrate_index = data[offset + 2] >> 4
+    rate_index = (data[offset + 2] >> 2) & 0x03
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    padding = (data[offset + 2] >> 1) & 0x01
+    bitrate = _BITRATES_KBPS['mpeg1' if version == 3 else 'mpeg2'][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version][rate_index]
+    return (144 if version == 3 else 72) * bitrate // sample_rate + padding
+
+
+def _is_info_frame(data: bytes, offset: int, length: int) -> bool:
+    """Check whether a frame is a Xing/Info/VBRI header rather than audio"""
+    version = (data[offset + 1] >> 3) & 0x03
+    mono = data[offset + 3] >> 6 == 3
+    side_info = (17 if mono else 32) if version == 3 else (9 if mono else 17)
+    frame = data[offset:offset + length]
+    return frame[4 + side_info:8 + side_info] in (b'Xing', b'Info') or frame[36:40] == b'VBRI'
+
+
+def audio_frames(data: bytes) -> bytes:
+    """Return the audio frames of an MP3 file, without tags or header frame"""
+    end = len(data) - 128 if data[-128:-125] == b'TAG' else len(data)
+    offset = _id3v2_size(data)
+
+    # Resynchronize on the first frame header after the tag
+    while offset < end and _frame_length(data, offset) is None:
+        offset += 1
+    length = _frame_length(data, offset)
+    if length is not None and _is_info_frame(data, offset, length):
+        offset += length
+    return data[offset:end]
+
+
+def concat_mp3(segments: List[bytes]) -> bytes:
+    """Join MP3 segments encoded with the same settings into one file"""
+    if len(segments) == 1:
+        return segments[0]
+    return b''.join(audio_frames(segment) for segment in segments)
@@ -1,15 +1,39 @@
+import asyncio
+import contextvars
 import openai
 import logging
 from typing import Dict, List, Optional
 from config import Config
 from models import UserSession
+from .http_transport import async_client
+from .resilience import breaker, CircuitOpenError
 
 logger = logging.getLogger(__name__)
 
+FALLBACK_REPLY = "Mi dispiace, ho avuto un problema tecnico. Puoi ripetere per favore?"
+
+SUMMARY_PROMPT = """Aggiorna il riepilogo di una conversazione tra un cliente e l'assistente di un servizio tecnico.
+
+Riepilogo precedente: {summary}
+
+Nuovi messaggi:
+{transcript}
+
+Scrivi il nuovo riepilogo in italiano, massimo 120 parole. Conserva tutti i fatti utili:
+dati del cliente, problema tecnico, soluzioni già provate, appuntamenti e preferenze.
+Restituisci SOLO il riepilogo."""
+
 class OpenAIService:
     def __init__(self):
         openai.api_key = Config.OPENAI_API_KEY
-        self.client = openai.OpenAI(api_key=Config.OPENAI_API_KEY)
+        # Async client: cancelling an awaiting task aborts the HTTP request,
+        # so speculative calls that turn out to be unneeded cost nothing more
+        self.client = openai.AsyncOpenAI(
+            api_key=Config.OPENAI_API_KEY,
+            http_client=async_client('openai')
+        )
+        # One background summarization per user at a time
+        self._summary_tasks: Dict[int, asyncio.Task] = {}
     
     def get_system_prompt(self, session: UserSession) -> str:
         """Generate dynamic system prompt based on current session state"""
@@ -33,7 +57,7 @@ class OpenAIService:
                 Chiedi UN SOLO dato alla volta in modo naturale e cordiale.
                 Spiega che questi dati sono necessari per fornire assistenza personalizzata.
                 
-                Dati già raccolti: {session.user_data.dict(exclude_none=True)}
+                Dati già raccolti: {session.user_data.to_dict()}
                 """
             else:
                 prompt = base_prompt + """
@@ -71,42 +95,114 @@ class OpenAIService:
         
         return prompt
     
-    async def get_response(self, user_message: str, session: UserSession) -> str:
-        """Get AI response based on user message and session context"""
+    def build_messages(self, user_message: str, session: UserSession) -> List[Dict]:
+        """Build the chat messages for a reply from the current session state"""
+        messages = [
+            {"role": "system", "content": self.get_system_prompt(session)}
+        ]
+        
+        # Older turns are folded into the summary, so the context stays roughly constant
+        if session.summary:
+            messages.append({"role": "system", "content": f"Riepilogo della conversazione finora: {session.summary}"})
+        
+        # Every message not yet in the summary goes verbatim; the summarizer
+        # keeps this to about HISTORY_SUMMARIZE_AFTER messages
+        messages.extend(session.conversation_history)
+        
+        # Add current user message
+        messages.append({"role": "user", "content": user_message})
+        return messages
+    
+    async def complete_chat(self, messages: List[Dict]) -> str:
+        """Get AI response for prebuilt messages without touching the session"""
         try:
-            # Build conversation history
-            messages = [
-                {"role": "system", "content": self.get_system_prompt(session)}
-            ]
-            
-            # Add conversation history (last 10 messages to avoid token limits)
-            for msg in session.conversation_history[-10:]:
-                messages.append(msg)
-            
-            # Add current user message
-            messages.append({"role": "user", "content": user_message})
-            
-            # Get AI response
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=messages,
-                max_tokens=200,  # Keep responses short for voice
-                temperature=0.7
+            response = await breaker('openai').call(
+                lambda: self.client.chat.completions.create(
+                    model="gpt-4",
+                    messages=messages,
+                    max_tokens=200,  # Keep responses short for voice
+                    temperature=0.7
+                ),
+                timeout=Config.OPENAI_TIMEOUT_SECONDS
             )
+            return response.choices[0].message.content
             
-            ai_response = response.choices[0].message.content
-            
-            # Update conversation history
-            session.conversation_history.append({"role": "user", "content": user_message})
-            session.conversation_history.append({"role": "assistant", "content": ai_response})
-            
-            return ai_response
-            
+        except CircuitOpenError:
+            logger.warning("OpenAI circuit open, returning fallback reply")
+            return FALLBACK_REPLY
         except Exception as e:
             logger.error(f"Error getting OpenAI response: {e}")
-            return "Mi dispiace, ho avuto un problema tecnico. Puoi ripetere per favore?"
+            return FALLBACK_REPLY
+    
+    def record_exchange(self, session: UserSession, user_message: str, ai_response: str):
+        """Append a user/assistant exchange to the conversation history"""
+        session.conversation_history.append({"role": "user", "content": user_message})
+        session.conversation_history.append({"role": "assistant", "content": ai_response})
+        self.schedule_summary(session)
+    
+    def schedule_summary(self, session: UserSession):
+        """Start a background summarization once the history grows past the threshold"""
+        if len(session.conversation_history) <= Config.HISTORY_SUMMARIZE_AFTER:
+            return
+        if session.user_id in self._summary_tasks:
+            return
+        
+        # A fresh context: the summary must not inherit the current update's deadline
+        task = asyncio.get_running_loop().create_task(self._summarize(session), context=contextvars.Context())
+        self._summary_tasks[session.user_id] = task
+        task.add_done_callback(lambda _: self._summary_tasks.pop(session.user_id, None))
+    
+    async def _summarize(self, session: UserSession):
+        """Fold all but the most recent messages into the session's rolling summary"""
+        history = session.conversation_history
+        folded = len(history) - Config.HISTORY_RECENT_MESSAGES
+        if folded <= 0:
+            return
+        transcript = "\n".join(
+            f"{'Cliente' if msg['role'] == 'user' else 'Assistente'}: {msg['content']}"
+            for msg in history[:folded]
+        )
+        
+        try:
+            # Own breaker: failing background summaries must not open the circuit for live replies
+            response = await breaker('openai_summary').call(
+                lambda: self.client.chat.completions.create(
+                    model=Config.SUMMARY_MODEL,
+                    messages=[{"role": "user", "content": SUMMARY_PROMPT.format(
+                        summary=session.summary or "nessuno", transcript=transcript
+                    )}],
+                    max_tokens=250,
+                    temperature=0.2
+                ),
+                timeout=Config.OPENAI_TIMEOUT_SECONDS
+            )
+            summary = response.choices[0].message.content.strip()
+        except Exception as e:
+            # The history is kept as it is and summarized on a later turn
+            logger.error(f"Error summarizing conversation for user {session.user_id}: {e}")
+            return
+        
+        if not summary:
+            return
+        if session.conversation_history is not history:
+            # A cancelled turn restored the session meanwhile: this summary is of another history
+            logger.info(f"Discarded summary for user {session.user_id}: history was restored")
+            return
+        # Messages appended meanwhile are after the folded ones, so the prefix is unchanged
+        session.summary = summary
+        del session.conversation_history[:folded]
+        logger.info(f"Summarized {folded} messages for user {session.user_id}")
+    
+    async def get_response(self, user_message: str, session: UserSession) -> str:
+        """Get AI response based on user message and session context"""
+        messages = self.build_messages(user_message, session)
+        ai_response = await self.complete_chat(messages)
+        
+        # Update conversation history
+        self.record_exchange(session, user_message, ai_response)
+        return ai_response
     
-    def extract_user_data(self, user_message: str, current_data: Dict) -> Dict:
+    async def extract_user_data(self, user_message: str, current_data: Dict) -> Dict:
         """Extract and update user data from message using AI"""
         try:
             prompt = f"""
@@ -126,11 +222,14 @@ class OpenAIService:
             Restituisci SOLO un JSON con i campi aggiornati.
             """
             
-            response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=150,
-                temperature=0.1
+            response = await breaker('openai').call(
+                lambda: self.client.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=150,
+                    temperature=0.1
+                ),
+                timeout=Config.OPENAI_TIMEOUT_SECONDS
             )
             
             # Parse JSON response
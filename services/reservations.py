@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class Booking(NamedTuple):
+    """Where a booked event lives: pool calendar, event id and link"""
+    calendar_id: str
+    event_id: str
+    event_link: str
+
+
+class SlotReservations:
+    """Local hold/lock table for appointment slots.
+    
+    Slots are tracked in SLOT_STEP_MINUTES blocks per calendar, so overlapping
+    appointments (e.g. 10:00 and 10:30 for one hour) conflict even when their
+    start times differ. All checks run on the event loop without awaiting, so
+    check-and-set is atomic without extra locking.
+    """
+    
+    def __init__(self, hold_seconds: int = None):
+        self.hold_seconds = hold_seconds or Config.SLOT_HOLD_SECONDS
+        self._holds: Dict[str, Tuple[str, float]] = {}  # block -> (idempotency key, expires at)
+        self._booked: Dict[str, Tuple[str, datetime]] = {}  # block -> (idempotency key, slot end)
+        self._completed: Dict[str, Tuple[Booking, datetime]] = {}  # idempotency key -> (booking, slot end)
+        self._key_locks: Dict[str, asyncio.Lock] = {}
+        self._next_purge = 0.0
+    
+    @staticmethod
+    def idempotency_key(customer: str, date_str: str, time_str: str) -> str:
+        """Derive a stable booking key so a retried request maps to the same booking"""
+        raw = f"{customer.strip().lower()}|{date_str}|{time_str}"
+        return hashlib.sha256(raw.encode()).hexdigest()[:32]
+    
+    def _blocks(self, calendar_id: str, start: datetime, duration_minutes: int) -> List[str]:
+        """Return the step-aligned blocks covered by an appointment"""
+        step = Config.SLOT_STEP_MINUTES
+        aligned = start.replace(minute=start.minute - start.minute % step, second=0, microsecond=0)
+        end = start + timedelta(minutes=duration_minutes)
+        blocks = []
+        while aligned < end:
+            blocks.append(f"{calendar_id}|{aligned:%Y-%m-%d %H:%M}")
+            aligned += timedelta(minutes=step)
+        return blocks
+    
+    def _purge(self):
+        """Drop expired holds, bookings whose slot is over and idle key locks"""
+        now = time.monotonic()
+        if now < self._next_purge:
+            return
+        self._next_purge = now + 60
+        
+        self._holds = {block: hold for block, hold in self._holds.items() if hold[1] > now}
+        current = datetime.now().astimezone()
+        self._booked = {block: booking for block, booking in self._booked.items() if booking[1] > current}
+        self._completed = {key: booking for key, booking in self._completed.items() if booking[1] > current}
+        self._key_locks = {key: lock for key, lock in self._key_locks.items() if lock.locked()}
+    
+    def lock(self, key: str) -> asyncio.Lock:
+        """Serialize concurrent attempts that share an idempotency key"""
+        if key not in self._key_locks:
+            self._key_locks[key] = asyncio.Lock()
+        return self._key_locks[key]
+    
+    def completed(self, key: str) -> Optional[Booking]:
+        """Return the booking of an already completed idempotency key"""
+        completed = self._completed.get(key)
+        return completed[0] if completed else None
+    
+    def is_taken(self, calendar_id: str, start: datetime, duration_minutes: int, key: str = None) -> bool:
+        """Check whether any block of the slot is held or booked by another booking"""
+        self._purge()
+        now = time.monotonic()
+        for block in self._blocks(calendar_id, start, duration_minutes):
+            booked = self._booked.get(block)
+            if booked and booked[0] != key:
+                return True
+            hold = self._holds.get(block)
+            if hold and hold[0] != key and hold[1] > now:
+                return True
+        return False
+    
+    def is_booked(self, calendar_id: str, start: datetime, duration_minutes: int) -> bool:
+        """Check whether the slot overlaps a booking confirmed by this instance"""
+        return any(block in self._booked for block in self._blocks(calendar_id, start, duration_minutes))
+    
+    def try_hold(self, calendar_id: str, start: datetime, duration_minutes: int, key: str) -> bool:
+        """Place a short-lived hold on a slot; fails if another booking owns it"""
+        if self.is_taken(calendar_id, start, duration_minutes, key):
+            return False
+        
+        expires_at = time.monotonic() + self.hold_seconds
+        for block in self._blocks(calendar_id, start, duration_minutes):
+            self._holds[block] = (key, expires_at)
+        return True
+    
+    def release(self, calendar_id: str, start: datetime, duration_minutes: int, key: str):
+        """Release a hold owned by the given booking"""
+        for block in self._blocks(calendar_id, start, duration_minutes):
+            hold = self._holds.get(block)
+            if hold and hold[0] == key:
+                del self._holds[block]
+    
+    def forget(self, calendar_id: str, start: datetime, duration_minutes: int):
+        """Drop confirmed bookings overlapping a slot whose event was cancelled or moved"""
+        keys = set()
+        for block in self._blocks(calendar_id, start, duration_minutes):
+            booked = self._booked.pop(block, None)
+            if booked:
+                keys.add(booked[0])
+        
+        # Remove the rest of each booking too, and let its key book again
+        self._booked = {block: booking for block, booking in self._booked.items() if booking[0] not in keys}
+        for key in keys:
+            self._completed.pop(key, None)
+    
+    def confirm(self, start: datetime, duration_minutes: int, key: str, booking: Booking):
+        """Turn a hold on the booking's calendar into a confirmed booking"""
+        end = start + timedelta(minutes=duration_minutes)
+        for block in self._blocks(booking.calendar_id, start, duration_minutes):
+            self._holds.pop(block, None)
+            self._booked[block] = (key, end)
+        self._completed[key] = (booking, end)
@@ -0,0 +1,190 @@
+import asyncio
+import contextlib
+import contextvars
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Absolute loop-time deadline of the update currently being handled
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar('deadline', default=None)
+
+
+class CircuitOpenError(Exception):
+    """Raised when a provider call is skipped because its circuit is open"""
+
+
+class CircuitBreaker:
+    """Per-provider circuit breaker.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    fail immediately for reset_seconds; then a single trial call is let
+    through (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = None, reset_seconds: float = None):
+        self.name = name
+        self.failure_threshold = failure_threshold or Config.CIRCUIT_FAILURE_THRESHOLD
+        self.reset_seconds = reset_seconds or Config.CIRCUIT_RESET_SECONDS
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_progress = False
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        """Current state: closed, open or half_open"""
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return 'half_open'
+        return 'open'
+
+    def allow(self) -> bool:
+        """Check whether a call may go through right now"""
+        state = self.state
+        if state == 'closed':
+            return True
+        if state == 'half_open' and not self.trial_in_progress:
+            self.trial_in_progress = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        """Close the circuit after a successful call"""
+        if self.opened_at is not None:
+            logger.info(f"Circuit {self.name} closed")
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_progress = False
+
+    def record_failure(self):
+        """Count a failure, opening the circuit at the threshold or after a failed trial"""
+        self.failures += 1
+        self.trial_in_progress = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning(f"Circuit {self.name} opened after {self.failures} failures")
+            self.opened_at = time.monotonic()
+
+    async def call(self, factory: Callable[[], Awaitable[T]], timeout: Optional[float] = None) -> T:
+        """Run a call through the breaker, bounded by timeout and the update deadline"""
+        timeout = time_left(timeout)
+        if timeout is not None and timeout <= 0:
+            # The update ran out of time - not the provider's fault
+            raise asyncio.TimeoutError(f"Deadline exceeded before calling {self.name}")
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        try:
+            result = await asyncio.wait_for(factory(), timeout=timeout)
+        except asyncio.CancelledError:
+            # Cancelled by the caller (e.g. a superseded speculative call), not a provider failure
+            self.trial_in_progress = False
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    def snapshot(self) -> Dict:
+        """Return the breaker state as a plain dict"""
+        return {'state': self.state, 'failures': self.failures, 'rejected': self.rejected}
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+
+
+def breaker(name: str) -> CircuitBreaker:
+    """Get the shared breaker for a provider"""
+    if name not in _BREAKERS:
+        _BREAKERS[name] = CircuitBreaker(name)
+    return _BREAKERS[name]
+
+
+def breaker_stats() -> Dict[str, Dict]:
+    """Return the state of every provider breaker"""
+    return {name: circuit.snapshot() for name, circuit in _BREAKERS.items()}
+
+
+@contextlib.contextmanager
+def deadline_scope(seconds: float):
+    """Bound everything awaited inside (and tasks spawned from it) by a deadline"""
+    deadline = asyncio.get_running_loop().time() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def time_left(cap: Optional[float] = None) -> Optional[float]:
+    """Seconds left before the update deadline, optionally capped"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return cap
+    remaining = max(deadline - asyncio.get_running_loop().time(), 0.0)
+    return remaining if cap is None else min(cap, remaining)
+
+
+class LatencyTracker:
+    """Rolling window of call latencies"""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+
+    def record(self, seconds: float):
+        """Add a latency sample"""
+        self._samples.append(seconds)
+
+    def percentile(self, percentile: float) -> Optional[float]:
+        """Return the given percentile, or None until enough samples exist"""
+        if len(self._samples) < 20:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(int(len(ordered) * percentile / 100), len(ordered) - 1)]
+
+
+async def hedged(factory: Callable[[], Awaitable[T]], tracker: LatencyTracker, percentile: float) -> T:
+    """Run a call and, if it is slower than the latency percentile, race a second copy.
+
+    The first copy to finish wins and the other is cancelled. Until the
+    tracker has enough samples the call simply runs once. factory must
+    return a natively async call: cancelling a run_in_executor future does
+    not stop its thread, so the losing copy would still run to the end.
+    """
+    started = time.perf_counter()
+    threshold = tracker.percentile(percentile)
+    primary = asyncio.ensure_future(factory())
+    tasks = {primary}
+    first_error: Optional[BaseException] = None
+
+    try:
+        if threshold is not None:
+            done, _ = await asyncio.wait(tasks, timeout=threshold)
+            if not done:
+                logger.info(f"Hedging request after {threshold:.2f}s")
+                tasks.add(asyncio.ensure_future(factory()))
+
+        while True:
+            done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    tracker.record(time.perf_counter() - started)
+                    return task.result()
+                first_error = first_error or task.exception()
+            tasks = pending
+            if not tasks:
+                # Every copy failed - surface the first error
+                raise first_error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,195 @@
+import re
+from typing import List
+
+# Text preparation for speech synthesis: replies are rewritten the way an
+# Italian speaker would read them aloud and split at sentence boundaries
+# into chunks that can be synthesized independently.
+
+_UNITS = ['zero', 'uno', 'due', 'tre', 'quattro', 'cinque', 'sei', 'sette', 'otto', 'nove',
+          'dieci', 'undici', 'dodici', 'tredici', 'quattordici', 'quindici', 'sedici',
+          'diciassette', 'diciotto', 'diciannove']
+_TENS = ['', '', 'venti', 'trenta', 'quaranta', 'cinquanta', 'sessanta', 'settanta',
+         'ottanta', 'novanta']
+_DIGITS = _UNITS[:10]
+_MONTHS = ['gennaio', 'febbraio', 'marzo', 'aprile', 'maggio', 'giugno', 'luglio',
+           'agosto', 'settembre', 'ottobre', 'novembre', 'dicembre']
+
+# Emojis that carry meaning are read out, decorative ones are dropped
+_EMOJI_WORDS = {
+    '✅': 'fatto', '❌': 'no', '⚠️': 'attenzione', '⚠': 'attenzione', '📅': '', '📞': 'telefono',
+    '📧': 'email', '👍': 'va bene', '👋': 'ciao', '🙏': 'grazie', '❤️': '', '😊': '', '🙂': '',
+    '🔊': '', '🎵': '', '🎤': '', '💻': '', '🔧': '', '📍': 'indirizzo', '⏰': '', '🕐': '',
+}
+_EMOJI = re.compile(
+    '|'.join(re.escape(emoji) for emoji in sorted(_EMOJI_WORDS, key=len, reverse=True)) +
+    '|[\U0001F000-\U0001FAFF☀-➿⬀-⯿️‍]'
+)
+_MARKDOWN = re.compile(r'[*_#`~]+')
+
+# Addresses and version numbers are read digit by digit, before phone and number rules see them
+_IP = re.compile(r'(?<![\w.])\d{1,3}(?:\.\d{1,3}){3}(?![\w]|\.\d)')
+_VERSION = re.compile(r'\b(?:(versione|version|release)\s+|v)(\d+(?:\.\d+)+)\b', re.IGNORECASE)
+# Swiss numbers only: +41/0041 and nine digits, or 0 and nine more digits
+_PHONE = re.compile(r'(?<![\w+])(?:(?:\+|00)41[ ./\-]?(?:\(0\) ?)?\d|0\d)(?:[ ./\-]?\d){8}(?![\w]|[./\-]?\d)')
+_DATE = re.compile(r'\b(\d{1,2})[/.](\d{1,2})[/.](\d{4})\b')
+_TIME = re.compile(r'\b(\d{1,2}):(\d{2})\b')
+_PERCENT = re.compile(r'(\d)\s*%')
+_CURRENCY = re.compile(r"\b(?:CHF|Fr\.)\s*(\d(?:[\d.,']*\d)?)|(\d(?:[\d.,']*\d)?)\s*(?:CHF|franchi)\b")
+_CENTS = re.compile(r'\d+\.\d{2}')
+_EURO = re.compile(r'€\s*(\d(?:[\d.,]*\d)?)|(\d(?:[\d.,]*\d)?)\s*€')
+_NUMBER = re.compile(r"\b\d{1,3}(?:[.']\d{3})+(?:,\d+)?\b|\b\d+(?:,\d+)?\b")
+_SPACES = re.compile(r'[ \t]+')
+
+_SENTENCE_END = re.compile(r'(?<=[.!?…])\s+|\n+')
+_CLAUSE_END = re.compile(r'(?<=[,;:])\s+')
+
+
+def _below_thousand(n: int) -> str:
+    """Spell 0 < n < 1000, merging vowels the Italian way (ventuno, centottanta)"""
+    hundreds, rest = divmod(n, 100)
+    words = ''
+    if hundreds:
+        words = 'cento' if hundreds == 1 else _UNITS[hundreds] + 'cento'
+    if rest:
+        if rest < 20:
+            tail = _UNITS[rest]
+        else:
+            tens, unit = divmod(rest, 10)
+            tail = _TENS[tens]
+            if unit:
+                tail = (tail[:-1] if unit in (1, 8) else tail) + _UNITS[unit]
+        if words and tail.startswith('ott'):
+            words = words[:-1]
+        words += tail
+    if words.endswith('tre') and n > 10:
+        words = words[:-3] + 'tré'
+    return words
+
+
+def number_to_words(n: int) -> str:
+    """Spell a non-negative integer in Italian"""
+    if n < 1000:
+        return _UNITS[n] if n < 20 else _below_thousand(n)
+    parts = []
+    for size, singular, plural in ((10 ** 9, 'un miliardo', 'miliardi'), (10 ** 6, 'un milione', 'milioni')):
+        count, n = divmod(n, size)
+        if count:
+            parts.append(singular if count == 1 else f"{number_to_words(count)} {plural}")
+    thousands, n = divmod(n, 1000)
+    words = ''
+    if thousands:
+        words = 'mille' if thousands == 1 else _below_thousand(thousands) + 'mila'
+    if n:
+        words += _below_thousand(n)
+    if words:
+        parts.append(words)
+    return ' '.join(parts)
+
+
+def _spell_number(token: str) -> str:
+    """Spell a number written with Italian separators (1.250,50)"""
+    integer, _, decimals = token.replace("'", '').replace('.', '').partition(',')
+    words = number_to_words(int(integer))
+    if decimals:
+        words += ' virgola ' + (number_to_words(int(decimals)) if not decimals.startswith('0')
+                                else ' '.join(_DIGITS[int(digit)] for digit in decimals))
+    return words
+
+
+def _spell_phone(match: re.Match) -> str:
+    """Read a phone number digit by digit, pausing between groups"""
+    raw = match.group(0).replace('(0)', '')  # +41 (0)79: the trunk zero is not dialled
+    digits = re.sub(r'\D', '', raw)
+    if len(digits) < 9:
+        return raw
+    groups = [group for group in re.split(r'[ ./\-]+', raw.lstrip('+')) if group]
+    if len(groups) == 1:
+        # No separators: Swiss grouping 079 123 45 67
+        groups = [digits[:3], digits[3:6]] + [digits[i:i + 2] for i in range(6, len(digits), 2)]
+    spoken = ', '.join(' '.join(_DIGITS[int(digit)] for digit in group) for group in groups)
+    return ('più ' if raw.startswith('+') else '') + spoken
+
+
+def _spell_digits(dotted: str) -> str:
+    """Read dot-separated groups digit by digit (192.168 -> uno nove due punto uno sei otto)"""
+    return ' punto '.join(' '.join(_DIGITS[int(digit)] for digit in group) for group in dotted.split('.'))
+
+
+def _spell_version(match: re.Match) -> str:
+    prefix = match.group(1) or 'versione'
+    return f"{prefix} {_spell_digits(match.group(2))}"
+
+
+def _spell_date(match: re.Match) -> str:
+    day, month, year = (int(part) for part in match.groups())
+    if not 1 <= month <= 12:
+        return match.group(0)
+    day_words = 'primo' if day == 1 else number_to_words(day)
+    return f"{day_words} {_MONTHS[month - 1]} {number_to_words(year)}"
+
+
+def _spell_time(match: re.Match) -> str:
+    hour, minute = int(match.group(1)), int(match.group(2))
+    if hour > 23 or minute > 59:
+        return match.group(0)
+    words = 'mezzanotte' if hour == 0 else number_to_words(hour)
+    return words if minute == 0 else f"{words} e {number_to_words(minute)}"
+
+
+def _spell_amount(match: re.Match, currency: str) -> str:
+    amount = match.group(1) or match.group(2)
+    if _CENTS.fullmatch(amount):
+        # 120.50 is a price with cents, not thousands
+        amount = amount.replace('.', ',')
+    return f"{_spell_number(amount)} {currency}"
+
+
+def normalize_for_speech(text: str) -> str:
+    """Rewrite text the way it should be read aloud in Italian"""
+    text = _EMOJI.sub(lambda match: f" {_EMOJI_WORDS.get(match.group(0), '')} ", text)
+    text = _MARKDOWN.sub('', text)
+    text = _IP.sub(lambda match: _spell_digits(match.group(0)), text)
+    text = _VERSION.sub(_spell_version, text)
+    # Dates and times first: "12.03.2025 14:30" must not be read as a phone number
+    text = _DATE.sub(_spell_date, text)
+    text = _TIME.sub(_spell_time, text)
+    text = _PHONE.sub(_spell_phone, text)
+    text = _CURRENCY.sub(lambda match: _spell_amount(match, 'franchi'), text)
+    text = _EURO.sub(lambda match: _spell_amount(match, 'euro'), text)
+    text = _PERCENT.sub(r'\1 per cento', text)
+    text = _NUMBER.sub(lambda match: _spell_number(match.group(0)), text)
+    lines = (_SPACES.sub(' ', line).strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+def _split_long(sentence: str, max_chars: int) -> List[str]:
+    """Split a sentence over max_chars at clause boundaries, then at spaces"""
+    pieces = []
+    for clause in _CLAUSE_END.split(sentence):
+        while len(clause) > max_chars:
+            cut = clause.rfind(' ', 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            pieces.append(clause[:cut].strip())
+            clause = clause[cut:].strip()
+        if clause:
+            pieces.append(clause)
+    return pieces
+
+
+def split_for_synthesis(text: str, max_chars: int) -> List[str]:
+    """Pack whole sentences into chunks of at most max_chars"""
+    chunks: List[str] = []
+    current = ''
+    for sentence in _SENTENCE_END.split(text):
+        sentence = sentence.strip()
+        if not sentence:
+            continue
+        for piece in _split_long(sentence, max_chars) if len(sentence) > max_chars else [sentence]:
+            if current and len(current) + 1 + len(piece) > max_chars:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current} {piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
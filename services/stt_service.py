@@ -0,0 +1,111 @@
+import asyncio
+import importlib.util
+import io
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+import openai
+from config import Config
+from .http_transport import async_client
+from .resilience import breaker, time_left, CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+# Model loaded once per worker process by the local backend
+_local_model = None
+
+
+def _transcribe_local(audio: bytes, model_size: str) -> str:
+    """Transcribe audio with faster-whisper inside a worker process"""
+    global _local_model
+    if _local_model is None:
+        from faster_whisper import WhisperModel
+        _local_model = WhisperModel(model_size, device="cpu", compute_type="int8")
+
+    segments, _ = _local_model.transcribe(io.BytesIO(audio), language="it", beam_size=1)
+    return " ".join(segment.text.strip() for segment in segments).strip()
+
+
+class WhisperAPIBackend:
+    """Speech-to-text through the OpenAI Whisper API"""
+
+    def __init__(self):
+        self.client = openai.AsyncOpenAI(
+            api_key=Config.OPENAI_API_KEY,
+            http_client=async_client('openai_stt')
+        )
+
+    async def transcribe(self, audio: bytes, filename: str) -> str:
+        """Send the in-memory audio to the transcription endpoint"""
+        transcription = await breaker('openai_stt').call(
+            lambda: self.client.audio.transcriptions.create(
+                model="whisper-1",
+                file=(filename, audio),
+                language="it"
+            ),
+            timeout=Config.STT_TIMEOUT_SECONDS
+        )
+        return transcription.text.strip()
+
+    def shutdown(self):
+        """Nothing to release"""
+
+
+class LocalWhisperBackend:
+    """Speech-to-text with a local CPU model running in a process pool"""
+
+    def __init__(self):
+        if importlib.util.find_spec('faster_whisper') is None:
+            raise ImportError("faster-whisper is not installed")
+        self.executor = ProcessPoolExecutor(max_workers=Config.STT_WORKERS)
+
+    async def transcribe(self, audio: bytes, filename: str) -> str:
+        """Decode and transcribe in a worker process, off the event loop"""
+        return await asyncio.wait_for(
+            asyncio.get_event_loop().run_in_executor(
+                self.executor, _transcribe_local, audio, Config.STT_LOCAL_MODEL
+            ),
+            timeout=time_left(Config.STT_TIMEOUT_SECONDS)
+        )
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class SpeechToTextService:
+    """Transcribes voice messages through a pluggable backend"""
+
+    def __init__(self):
+        self.backend = self._create_backend(Config.STT_BACKEND)
+        # Bounds concurrent transcriptions so bursts queue instead of piling up
+        self.semaphore = asyncio.Semaphore(Config.STT_WORKERS)
+        logger.info(f"Speech-to-text initialized with backend: {type(self.backend).__name__}")
+
+    def _create_backend(self, name: str):
+        """Create the configured backend, falling back to the Whisper API"""
+        if name == 'local':
+            try:
+                return LocalWhisperBackend()
+            except ImportError as e:
+                logger.error(f"Local speech-to-text unavailable ({e}), using Whisper API")
+        return WhisperAPIBackend()
+
+    async def transcribe(self, audio: bytes, filename: str = "voice.ogg") -> Optional[str]:
+        """Transcribe an in-memory audio file, returning None on failure"""
+        try:
+            async with self.semaphore:
+                text = await self.backend.transcribe(audio, filename)
+            logger.info(f"Transcribed {len(audio)} bytes of audio: {text[:100]}")
+            return text or None
+
+        except CircuitOpenError:
+            logger.warning("Speech-to-text circuit open, skipping transcription")
+            return None
+        except Exception as e:
+            logger.error(f"Error transcribing audio: {e}")
+            return None
+
+    def shutdown(self):
+        """Release backend resources such as worker processes"""
+        self.backend.shutdown()
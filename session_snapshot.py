@@ -0,0 +1,91 @@
+import logging
+import marshal
+import os
+import time
+from typing import Dict, Iterable, Optional, Tuple
+from config import Config
+from models import UserSession
+
+logger = logging.getLogger(__name__)
+
+# Bumped whenever the snapshot layout changes; sessions carry their own version
+SNAPSHOT_FORMAT_VERSION = 1
+
+
+def save_snapshot(sessions: Iterable[UserSession], audio: Dict[str, bytes], path: str = None) -> int:
+    """Write sessions and pre-rendered audio to one file, returning the session count.
+
+    The file is a single marshal record of session.to_bytes() blobs, written
+    to a temporary file and renamed so a crash never leaves half a snapshot.
+    """
+    path = path or Config.SESSION_SNAPSHOT_PATH
+    records = tuple(session.to_bytes() for session in sessions)
+    data = marshal.dumps((SNAPSHOT_FORMAT_VERSION, time.time(), Config.VOICE_ID, records, dict(audio)))
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'wb') as snapshot_file:
+        snapshot_file.write(data)
+        snapshot_file.flush()
+        os.fsync(snapshot_file.fileno())
+    os.replace(temp_path, path)
+
+    logger.info(f"Saved snapshot of {len(records)} sessions and {len(audio)} audio clips ({len(data)} bytes)")
+    return len(records)
+
+
+def load_snapshot(path: str = None) -> Tuple[Dict[int, UserSession], Dict[str, bytes]]:
+    """Load and consume the snapshot written at the last shutdown.
+
+    The file is removed once read, so a later crash never restores sessions
+    older than the ones lost with it. Audio rendered with a different voice
+    is discarded.
+    """
+    path = path or Config.SESSION_SNAPSHOT_PATH
+    try:
+        with open(path, 'rb') as snapshot_file:
+            data = snapshot_file.read()
+    except FileNotFoundError:
+        return {}, {}
+    finally:
+        _remove(path)
+
+    try:
+        version, saved_at, voice_id, records, audio = marshal.loads(data)
+        if version != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"unsupported snapshot format version {version}")
+    except (EOFError, ValueError, TypeError) as e:
+        logger.error(f"Ignoring unreadable session snapshot: {e}")
+        return {}, {}
+
+    sessions: Dict[int, UserSession] = {}
+    for record in records:
+        session = _session(record)
+        if session is not None:
+            sessions[session.user_id] = session
+    if voice_id != Config.VOICE_ID:
+        audio = {}
+
+    logger.info(
+        f"Restored {len(sessions)}/{len(records)} sessions and {len(audio)} audio clips "
+        f"from a snapshot taken {time.time() - saved_at:.0f}s ago"
+    )
+    return sessions, audio
+
+
+def _session(record: bytes) -> Optional[UserSession]:
+    """Decode one session, skipping records from unsupported formats"""
+    try:
+        return UserSession.from_bytes(record)
+    except (EOFError, ValueError, TypeError) as e:
+        logger.warning(f"Skipping session record: {e}")
+        return None
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.error(f"Error removing session snapshot: {e}")
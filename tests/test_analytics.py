@@ -0,0 +1,65 @@
+import asyncio
+import csv
+import sqlite3
+from analytics import AnalyticsStore, connect, postcode
+from export import export
+
+
+def _record(path):
+    async def run():
+        store = AnalyticsStore(path)
+        await store.start()
+        store.record_turn(1, "collecting_data", 12.34, 250.0, "completed", stt_ms=800.0, llm_ms=200.0)
+        store.record_turn(1, "service_menu", 0.0, 10.0, "error")
+        store.record_booking(1, "6900 Lugano", "2030-01-07", "10:00", "booked")
+        store.record_voice_reply(1, 120, 900.0, 150.0, "sent")
+        await store.stop()
+        return store.stats()
+    return asyncio.run(run())
+
+
+def test_postcode_keeps_only_the_four_digits():
+    assert postcode("6900 Lugano") == "6900"
+    assert postcode("Lugano") is None and postcode(None) is None
+
+
+def test_buffered_rows_are_written_on_stop(tmp_path):
+    path = str(tmp_path / 'analytics.db')
+    assert _record(path) == {'written': 4, 'dropped': 0, 'pending': 0}
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT outcome, wait_ms, stt_ms, llm_ms FROM turns ORDER BY id").fetchall() == [
+        ("completed", 12.3, 800.0, 200.0), ("error", 0.0, 0.0, 0.0)
+    ]
+    assert conn.execute("SELECT postcode, outcome FROM bookings").fetchall() == [("6900", "booked")]
+
+
+def test_old_turns_table_gains_stage_columns(tmp_path):
+    path = str(tmp_path / 'analytics.db')
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE turns (id INTEGER PRIMARY KEY AUTOINCREMENT, at REAL NOT NULL, user_id INTEGER NOT NULL, "
+        "step TEXT NOT NULL, wait_ms REAL NOT NULL, process_ms REAL NOT NULL, outcome TEXT NOT NULL)"
+    )
+    conn.execute("INSERT INTO turns (at, user_id, step, wait_ms, process_ms, outcome) VALUES (0, 1, 's', 0, 0, 'ok')")
+    conn.commit()
+    conn.close()
+
+    assert connect(path).execute("SELECT stt_ms, llm_ms FROM turns").fetchall() == [(0.0, 0.0)]
+
+
+def test_incremental_export_writes_only_new_rows(tmp_path):
+    path = str(tmp_path / 'analytics.db')
+    _record(path)
+    first, second = str(tmp_path / 'first.csv'), str(tmp_path / 'second.csv')
+    assert export('turns', first, incremental=True, db_path=path) == 2
+    assert export('turns', second, incremental=True, db_path=path) == 0
+
+    with open(first, newline='', encoding='utf-8') as exported:
+        rows = list(csv.DictReader(exported))
+    assert [row['outcome'] for row in rows] == ["completed", "error"]
+    assert rows[0]['llm_ms'] == "200.0"
+
+    _record(path)
+    assert export('turns', second, incremental=True, db_path=path) == 2
+    with open(second, newline='', encoding='utf-8') as exported:
+        assert [row['id'] for row in csv.DictReader(exported)] == ["3", "4"]
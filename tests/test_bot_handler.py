@@ -0,0 +1,172 @@
+import asyncio
+from datetime import datetime
+from bot_handler import TelegramBotHandler
+from delivery_policy import DeliveryPolicy, VOICE
+from message_coalescer import MessageCoalescer
+from models import AppointmentRequest, UserData, UserSession
+from questionnaire import next_reply
+from services.calendar_service import CalendarService
+from services.reservations import Booking, SlotReservations
+
+
+PROPOSALS = [("2030-01-08", "09:00"), ("2030-01-08", "11:00"), ("2030-01-09", "10:00")]
+
+
+def make_handler():
+    return TelegramBotHandler.__new__(TelegramBotHandler)
+
+
+def test_match_proposed_slot_accepts_positions_and_times():
+    handler = make_handler()
+    assert handler._match_proposed_slot("2", PROPOSALS) == PROPOSALS[1]
+    assert handler._match_proposed_slot("il 2", PROPOSALS) == PROPOSALS[1]
+    assert handler._match_proposed_slot("la seconda", PROPOSALS) == PROPOSALS[1]
+    assert handler._match_proposed_slot("Ok, la prima!", PROPOSALS) == PROPOSALS[0]
+    assert handler._match_proposed_slot("prendo la terza, grazie", PROPOSALS) == PROPOSALS[2]
+    assert handler._match_proposed_slot("alle 11:00 va bene", PROPOSALS) == PROPOSALS[1]
+
+
+def test_match_proposed_slot_ignores_ordinary_replies():
+    handler = make_handler()
+    assert handler._match_proposed_slot("prima possibile?", PROPOSALS) is None
+    assert handler._match_proposed_slot("prima", PROPOSALS) is None
+    assert handler._match_proposed_slot("ho 2 domande", PROPOSALS) is None
+    assert handler._match_proposed_slot("il 3 non posso", PROPOSALS) is None
+    assert handler._match_proposed_slot("la prima volta che chiamo", PROPOSALS) is None
+    assert handler._match_proposed_slot("4", PROPOSALS) is None
+
+
+class FakeJobQueue:
+    def __init__(self):
+        self.jobs = {}  # dedupe key or job id -> (kind, payload, order key)
+
+    async def enqueue(self, kind, payload, dedupe_key=None, order_key=None):
+        key = dedupe_key or len(self.jobs)
+        if key in self.jobs:
+            return None
+        self.jobs[key] = (kind, payload, order_key)
+        return len(self.jobs)
+
+
+def make_booking_handler():
+    handler = make_handler()
+    handler.job_queue = FakeJobQueue()
+    handler.calendar_service = CalendarService.__new__(CalendarService)
+    handler.calendar_service.reservations = SlotReservations(hold_seconds=60)
+    handler.coalescer = MessageCoalescer(process=None)
+    return handler
+
+
+def test_enqueue_booking_skips_queued_and_confirmed_bookings():
+    handler = make_booking_handler()
+    session = UserSession(user_id=1, chat_id=10)
+    request = AppointmentRequest(UserData(nome="Anna", email="anna@example.ch"), "2030-01-08", "10:00", "PC lento")
+
+    assert asyncio.run(handler._enqueue_booking(session, request))
+    assert not asyncio.run(handler._enqueue_booking(session, request))
+
+    # Once the job ran and confirmed the booking, a repeated "sì, confermo" queues nothing
+    handler.job_queue.jobs.clear()
+    key = handler._booking_key(request)
+    start = datetime(2030, 1, 8, 10, 0)
+    handler.calendar_service.reservations.confirm(start, 60, key, Booking('main', 'event0', 'link'))
+    assert not asyncio.run(handler._enqueue_booking(session, request))
+    assert handler.job_queue.jobs == {}
+
+
+def test_voice_replies_do_not_share_the_booking_order_key():
+    handler = make_booking_handler()
+    handler.delivery_policy = DeliveryPolicy()
+    handler.delivery_policy.default_mode = VOICE
+    session = UserSession(user_id=1, chat_id=10)
+    request = AppointmentRequest(UserData(nome="Anna", email="anna@example.ch"), "2030-01-08", "10:00", "PC lento")
+
+    asyncio.run(handler._enqueue_booking(session, request))
+    asyncio.run(handler._deliver(10, "Perfetto, ti confermo tra un attimo.", session))
+
+    order_keys = {kind: order_key for kind, _, order_key in handler.job_queue.jobs.values()}
+    assert order_keys == {'book_appointment': "10", 'voice_reply': "voice:10"}
+
+
+class FakeOpenAI:
+    """Records the order of LLM calls and whether the draft was cancelled"""
+
+    def __init__(self, extracted=None, draft_delay=0.0):
+        self.extracted = extracted or {}
+        self.draft_delay = draft_delay
+        self.calls = []
+        self.draft_cancelled = False
+
+    def build_messages(self, user_message, session):
+        return [{"role": "user", "content": user_message}]
+
+    async def complete_chat(self, messages):
+        self.calls.append('complete')
+        try:
+            await asyncio.sleep(self.draft_delay)
+        except asyncio.CancelledError:
+            self.draft_cancelled = True
+            raise
+        return "Una riparazione costa da 80 franchi."
+
+    async def extract_user_data(self, user_message, current_data):
+        self.calls.append('extract')
+        return self.extracted
+
+    def record_exchange(self, session, user_message, response):
+        pass
+
+
+def run_data_collection(openai_service, user_message):
+    handler = make_handler()
+    handler.openai_service = openai_service
+    sent, cancelled = [], []
+    cancel_task = TelegramBotHandler._cancel_task
+
+    async def send(update, text):
+        sent.append(text)
+
+    def spy_cancel(task):
+        cancelled.append(task)
+        cancel_task(task)
+
+    handler._send_voice_response = send
+    handler._cancel_task = spy_cancel
+    session = UserSession(user_id=1, chat_id=10)
+
+    async def run():
+        await handler._handle_data_collection(None, None, session, user_message)
+        await asyncio.sleep(0)  # Let a cancelled draft observe its cancellation
+
+    asyncio.run(run())
+    return session, sent, cancelled
+
+
+def test_draft_is_kept_when_the_question_is_still_open():
+    openai_service = FakeOpenAI()
+    session, sent, _ = run_data_collection(openai_service, "Quanto costa una riparazione?")
+
+    # The draft starts before the extraction and becomes the reply
+    assert openai_service.calls == ['complete', 'extract']
+    assert sent == ["Una riparazione costa da 80 franchi."]
+    assert not openai_service.draft_cancelled
+
+
+def test_draft_is_cancelled_when_the_extraction_moves_on():
+    openai_service = FakeOpenAI(extracted={'nome': 'Anna'}, draft_delay=10)
+    session, sent, cancelled = run_data_collection(openai_service, "Sono Anna, quanto costa?")
+
+    assert session.user_data.nome == "Anna"
+    assert sent == [next_reply(session.user_data)]
+    assert len(cancelled) == 2  # Extraction and draft both pass through _cancel_task
+    assert openai_service.draft_cancelled
+
+
+def test_no_draft_without_a_question_mark():
+    openai_service = FakeOpenAI()
+    _, sent, cancelled = run_data_collection(openai_service, "boh non saprei proprio cosa dire adesso")
+
+    # Off-script input still gets an LLM reply, but only after the extraction
+    assert openai_service.calls == ['extract', 'complete']
+    assert sent == ["Una riparazione costa da 80 franchi."]
+    assert len(cancelled) == 1
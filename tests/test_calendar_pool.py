@@ -0,0 +1,28 @@
+from services.calendar_pool import CalendarPool
+
+POOL = '{"69": ["lugano-a", "lugano-b"], "690": ["lugano-centro"], "65": "bellinzona", "*": ["main"]}'
+
+
+def test_longest_postcode_prefix_wins():
+    pool = CalendarPool(POOL, 'main')
+    assert pool.calendars_for("6900 Lugano") == ['lugano-centro']
+    assert pool.calendars_for("6963 Pregassona") == ['lugano-a', 'lugano-b']
+    assert pool.calendars_for("Bellinzona 6500") == ['bellinzona']
+
+
+def test_unknown_or_missing_postcode_falls_back():
+    pool = CalendarPool(POOL, 'main')
+    assert pool.calendars_for("8001 Zürich") == ['main']
+    assert pool.calendars_for(None) == ['main']
+
+
+def test_all_calendars_are_listed_once_in_order():
+    pool = CalendarPool('{"69": ["a", "b"], "65": ["b", "c"]}', 'main')
+    assert pool.all_calendars() == ['a', 'b', 'c']
+    # Without a "*" region the whole pool serves unknown postcodes
+    assert pool.calendars_for("1000 Lausanne") == ['a', 'b', 'c']
+
+
+def test_invalid_or_empty_pool_uses_the_default_calendar():
+    assert CalendarPool('not json', 'main').calendars_for("6900 Lugano") == ['main']
+    assert CalendarPool('', 'main').calendars_for("6900 Lugano") == ['main']
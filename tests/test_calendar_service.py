@@ -0,0 +1,205 @@
+import asyncio
+import contextlib
+import copy
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from models import UserData, AppointmentRequest
+from services.calendar_service import CalendarService
+from services.calendar_pool import CalendarPool
+from services.reservations import Booking, SlotReservations
+
+
+class _Request:
+    def __init__(self, run):
+        self.run = run
+
+
+class _Batch:
+    def __init__(self, callback):
+        self.callback = callback
+        self.items = []
+
+    def add(self, request, request_id):
+        self.items.append((request, request_id))
+
+    def execute(self, http=None):
+        for request, request_id in self.items:
+            try:
+                self.callback(request_id, request.run(), None)
+            except Exception as e:
+                self.callback(request_id, None, e)
+
+
+class FakeCalendarApi:
+    """In-memory stand-in for the parts of the Calendar API the service uses"""
+
+    def __init__(self, busy=None):
+        self.busy = busy or {}
+        self.stored = {}  # (calendar, event id) -> event body
+        self.inserted = []
+
+    def freebusy(self):
+        return self
+
+    def query(self, body):
+        return _Request(lambda: {'calendars': {
+            item['id']: {'busy': self.busy.get(item['id'], []) + self._event_busy(item['id'])}
+            for item in body['items']
+        }})
+
+    def _event_busy(self, calendar_id):
+        def aware(value):
+            return datetime.fromisoformat(value['dateTime']).replace(tzinfo=ZoneInfo(value['timeZone'])).isoformat()
+        return [{'start': aware(event['start']), 'end': aware(event['end'])}
+                for (calendar, _), event in self.stored.items() if calendar == calendar_id]
+
+    def events(self):
+        return self
+
+    def list(self, calendarId, privateExtendedProperty, **kwargs):
+        key = privateExtendedProperty.split('=', 1)[1]
+        return _Request(lambda: {'items': [
+            dict(event, id=event_id, htmlLink=f"link-{event_id}")
+            for (calendar_id, event_id), event in self.stored.items()
+            if calendar_id == calendarId and event['extendedProperties']['private']['idempotency_key'] == key
+        ]})
+
+    def insert(self, calendarId, body):
+        def run():
+            event_id = f"event{len(self.inserted)}"
+            self.inserted.append(calendarId)
+            self.stored[(calendarId, event_id)] = body
+            return {'id': event_id, 'htmlLink': f"link-{event_id}"}
+        return _Request(run)
+
+    def get(self, calendarId, eventId):
+        return _Request(lambda: copy.deepcopy(self.stored[(calendarId, eventId)]))
+
+    def delete(self, calendarId, eventId):
+        return _Request(lambda: self.stored.pop((calendarId, eventId)) and {})
+
+    def patch(self, calendarId, eventId, body):
+        def run():
+            self.stored[(calendarId, eventId)].update(body)
+            return {'id': eventId, 'htmlLink': f"link-{eventId}"}
+        return _Request(run)
+
+    def new_batch_http_request(self, callback):
+        return _Batch(callback)
+
+
+class _Connections:
+    @contextlib.contextmanager
+    def connection(self):
+        yield None
+
+
+def make_service(api, pool_json=None):
+    service = CalendarService.__new__(CalendarService)
+    service.calendar_id = 'main'
+    service.pool = CalendarPool(pool_json, 'main')
+    service.timezone = ZoneInfo("Europe/Zurich")
+    service.reservations = SlotReservations(hold_seconds=60)
+    service.service = api
+    service.http_pool = _Connections()
+
+    async def execute(request):
+        return request.run()
+    service._execute = execute
+    return service
+
+
+def appointment(paese_cap, date_str, time_str, email):
+    user_data = UserData(nome="Anna", cognome="Bernasconi", paese_cap=paese_cap, email=email)
+    return AppointmentRequest(user_data, date_str, time_str)
+
+
+BUSY_MORNING = {'a': [{'start': '2030-01-07T08:00:00+01:00', 'end': '2030-01-07T09:00:00+01:00'}]}
+POOL = '{"69": ["a", "b"], "*": ["main"]}'
+
+
+def test_batch_create_balances_load_and_respects_holds():
+    api = FakeCalendarApi(busy=BUSY_MORNING)
+    service = make_service(api, POOL)
+    results = asyncio.run(service.create_appointments_batch([
+        appointment("6900 Lugano", "2030-01-07", "10:00", "x@example.ch"),
+        appointment("6900 Lugano", "2030-01-07", "10:00", "y@example.ch"),
+        appointment("6900 Lugano", "2030-01-07", "10:30", "z@example.ch"),
+        appointment("6900 Lugano", "2030-01-07", "10:00", "x@example.ch"),
+        appointment("6500 Bellinzona", "2030-01-07", "10:00", "w@example.ch"),
+    ]))
+
+    # The idle calendar first, then the one already busy that morning
+    assert [result['calendar_id'] for result in results[:2]] == ['b', 'a']
+    assert results[2]['error'] == "slot unavailable"
+    assert results[3]['error'] == "duplicate of request 0"
+    assert results[4]['calendar_id'] == 'main'
+    assert [result['event_id'] for result in results[:2]] == ['event0', 'event1']
+    assert api.inserted == ['b', 'a', 'main']
+
+
+def test_batch_create_is_idempotent():
+    api = FakeCalendarApi()
+    requests = [appointment("6900 Lugano", "2030-01-07", "10:00", "x@example.ch")]
+    asyncio.run(make_service(api, POOL).create_appointments_batch(requests))
+
+    # A fresh instance (e.g. after a restart) finds the tagged event instead of inserting again
+    results = asyncio.run(make_service(api, POOL).create_appointments_batch(requests))
+    assert results[0]['success'] and api.inserted == ['a']
+
+
+def test_reschedule_moves_local_reservation():
+    api = FakeCalendarApi()
+    service = make_service(api)
+    results = asyncio.run(service.create_appointments_batch([
+        appointment(None, "2030-01-08", "10:00", "x@example.ch"),
+    ]))
+    assert results[0]['success']
+
+    moved = asyncio.run(service.reschedule_appointments_batch([
+        ('main', 'event0', "2030-01-08", "14:00"),
+        ('main', 'missing', "2030-01-08", "15:00"),
+    ]))
+    assert moved[0]['success']
+    assert moved[1]['error'] == "event not found"
+    assert not service.reservations.is_booked('main', service._slot_start("2030-01-08", "10:00"), 60)
+    assert service.reservations.is_booked('main', service._slot_start("2030-01-08", "14:00"), 60)
+
+
+def test_cancel_frees_local_reservation():
+    api = FakeCalendarApi()
+    service = make_service(api)
+    asyncio.run(service.create_appointments_batch([appointment(None, "2030-01-08", "10:00", "x@example.ch")]))
+
+    assert asyncio.run(service.cancel_appointment('main', 'event0'))
+    assert not service.reservations.is_booked('main', service._slot_start("2030-01-08", "10:00"), 60)
+
+
+def test_pool_booking_returns_calendar_for_later_changes():
+    api = FakeCalendarApi(busy=BUSY_MORNING)
+    service = make_service(api, POOL)
+    request = appointment("6900 Lugano", "2030-01-07", "10:00", "x@example.ch")
+    booking = asyncio.run(service.book_appointment(request, service.booking_key(request)))
+    assert booking == Booking('b', 'event0', 'link-event0')
+    # A retry returns the same booking without inserting again
+    assert asyncio.run(service.book_appointment(request, service.booking_key(request))) == booking
+
+    # Moving and cancelling work on the pool calendar, not the default one
+    moved = asyncio.run(service.reschedule_appointments_batch([
+        (booking.calendar_id, booking.event_id, "2030-01-07", "14:00"),
+    ]))
+    assert moved[0]['success']
+    cancelled = asyncio.run(service.cancel_appointments_batch([(booking.calendar_id, booking.event_id)]))
+    assert cancelled[0]['success'] and not api.stored
+    assert not service.reservations.is_booked('b', service._slot_start("2030-01-07", "14:00"), 60)
+
+
+def test_propose_slots_ranks_nearest_free_slots():
+    # The requested 10:00 is busy until 11:00 and 09:00 is held locally
+    api = FakeCalendarApi(busy={'main': [{'start': '2030-01-08T10:00:00+01:00', 'end': '2030-01-08T11:00:00+01:00'}]})
+    service = make_service(api)
+    service.reservations.try_hold('main', datetime(2030, 1, 8, 9, 0, tzinfo=ZoneInfo("Europe/Zurich")), 60, "other")
+
+    proposals = asyncio.run(service.propose_slots("2030-01-08", "10:00", count=3))
+
+    assert proposals == [("2030-01-08", "11:00"), ("2030-01-08", "11:30"), ("2030-01-08", "12:00")]
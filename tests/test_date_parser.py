@@ -0,0 +1,48 @@
+import pytest
+from bench_date_parser import CORPUS, NOW
+from date_parser import parse_date, parse_time
+
+
+@pytest.mark.parametrize("message, expected_date, expected_time", CORPUS)
+def test_corpus(message, expected_date, expected_time):
+    assert parse_date(message, now=NOW) == expected_date
+    assert parse_time(message) == expected_time
+
+
+@pytest.mark.parametrize("message", [
+    "le due stampanti non funzionano",
+    "Sono le 5 e ho fame",
+    "il pc costa 3.50 franchi",
+    "ho pagato CHF 12.30 per il cavo",
+    "il disco costa 4.90 €",
+    "la versione 3.5 non parte",
+    "ho aspettato due ore",
+    "Internet non va da tre giorni",
+])
+def test_ordinary_text_is_not_a_time(message):
+    assert parse_time(message) is None
+
+
+def test_price_does_not_hide_a_later_time():
+    assert parse_time("costa 3.50 franchi, posso venire alle 14.30") == "14:30"
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("risultato 9.75", None),
+    ("ore 14.05", "14:05"),
+    ("all'una", "13:00"),
+    ("dalle 10", "10:00"),
+])
+def test_clock_and_spoken_forms(message, expected):
+    assert parse_time(message) == expected
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("alle quattro e mezza", "16:30"),
+    ("alle 6", None),
+    ("alle sette", None),
+    ("alle 6 di mattina", "06:00"),
+    ("alle 6 di sera", "18:00"),
+])
+def test_afternoon_shift_stays_within_business_hours(message, expected):
+    assert parse_time(message) == expected
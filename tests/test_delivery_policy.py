@@ -0,0 +1,25 @@
+from config import Config
+from delivery_policy import DeliveryPolicy, TEXT, TEXT_FIRST, VOICE
+
+
+def test_user_choice_wins():
+    policy = DeliveryPolicy()
+    assert policy.decide("Ciao!", user_mode=VOICE) == VOICE
+    assert policy.decide("Ciao!", user_mode=TEXT) == TEXT
+
+
+def test_long_replies_are_still_spoken_below_the_cap():
+    # Longer than one TTS chunk: synthesized in chunks, not downgraded to text
+    text = "Riavvia il router e attendi qualche minuto. " * (Config.TTS_CHUNK_CHARS // 40 + 2)
+    assert len(text) > Config.TTS_CHUNK_CHARS
+    assert DeliveryPolicy().decide(text, user_mode=TEXT_FIRST) == TEXT_FIRST
+
+
+def test_cap_and_structure_force_text(monkeypatch):
+    policy = DeliveryPolicy()
+    monkeypatch.setattr(Config, 'VOICE_MAX_CHARS', 50)
+    assert policy.decide("x" * 51, user_mode=VOICE) == TEXT
+    monkeypatch.setattr(Config, 'VOICE_MAX_CHARS', 0)
+    assert policy.decide("x" * 5000, user_mode=VOICE) == VOICE
+    assert policy.decide("Passi:\n1. Spegni\n2. Riaccendi", user_mode=VOICE) == TEXT
+    assert policy.decide("Vedi https://example.ch", user_mode=VOICE) == TEXT
@@ -0,0 +1,55 @@
+import asyncio
+from fair_scheduler import FairScheduler
+
+
+def test_free_slots_rotate_between_users():
+    order = []
+
+    async def turn(scheduler, key, gate):
+        async with scheduler.slot(key):
+            order.append(key)
+            await gate.wait()
+
+    async def run():
+        scheduler = FairScheduler(concurrency=1)
+        gate = asyncio.Event()
+        # User "a" floods the queue before "b" sends a single message
+        tasks = [asyncio.create_task(turn(scheduler, 'a', gate)) for _ in range(3)]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(turn(scheduler, 'b', gate)))
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(*tasks)
+        return scheduler.stats()
+
+    stats = asyncio.run(run())
+    assert order == ['a', 'a', 'b', 'a']
+    assert stats['running'] == 0 and stats['waiting'] == 0
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    async def run():
+        scheduler = FairScheduler(concurrency=1)
+        release = asyncio.Event()
+
+        async def holder():
+            async with scheduler.slot('a'):
+                await release.wait()
+
+        async def waiter():
+            async with scheduler.slot('b'):
+                pass
+
+        held = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(waiter())
+        await asyncio.sleep(0)
+        assert scheduler.waiting == 1
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        assert scheduler.waiting == 0
+        release.set()
+        await held
+        return scheduler.running
+
+    assert asyncio.run(run()) == 0
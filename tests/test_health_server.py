@@ -0,0 +1,35 @@
+import asyncio
+from aiohttp.test_utils import TestClient, TestServer
+from config import Config
+from health_server import HealthServer
+
+
+def request(monkeypatch, path, token=None):
+    """Send one GET to a fresh server with an admin token configured"""
+    monkeypatch.setattr(Config, 'ADMIN_TOKEN', 'secret')
+    monkeypatch.setattr(Config, 'PROFILE_MAX_SECONDS', 1.0)
+    monkeypatch.setattr(Config, 'TRACEMALLOC_AT_STARTUP', False)
+
+    async def run():
+        async with TestClient(TestServer(HealthServer().app)) as client:
+            headers = {'Authorization': f'Bearer {token}'} if token else {}
+            response = await client.get(path, headers=headers)
+            return response.status, await response.text()
+    return asyncio.run(run())
+
+
+def test_admin_endpoints_require_the_token(monkeypatch):
+    assert request(monkeypatch, '/admin/profile?seconds=0.1')[0] == 401
+    assert request(monkeypatch, '/admin/profile?seconds=0.1', token='wrong')[0] == 401
+    assert request(monkeypatch, '/admin/memory', token='wrong')[0] == 401
+
+
+def test_profile_rejects_seconds_out_of_range(monkeypatch):
+    for seconds in ('-5', '0', 'nan', 'inf', '2', 'abc'):
+        assert request(monkeypatch, f'/admin/profile?seconds={seconds}', token='secret')[0] == 400
+
+
+def test_profile_returns_collapsed_stacks(monkeypatch):
+    status, body = request(monkeypatch, '/admin/profile?seconds=0.05', token='secret')
+    assert status == 200
+    assert 'MainThread' in body
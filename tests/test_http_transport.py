@@ -0,0 +1,80 @@
+import asyncio
+import httpx
+import pytest
+from services.http_transport import PoolStats, _MeteredAsyncTransport, _MeteredTransport
+
+
+def test_pool_stats_track_in_flight_peak_and_errors():
+    stats = PoolStats('test', limit=4)
+    stats.acquire()
+    stats.acquire()
+    stats.release()
+    stats.record_wait(0.25)
+    assert stats.snapshot() == {
+        'limit': 4, 'in_flight': 1, 'peak_in_flight': 2, 'utilization': 0.25,
+        'requests': 2, 'errors': 0, 'wait_seconds': 0.25,
+    }
+    stats.release(failed=True)
+    snapshot = stats.snapshot()
+    assert snapshot['in_flight'] == 0 and snapshot['errors'] == 1
+
+
+class RecordingTransport(httpx.BaseTransport):
+    """Inner transport that reports the in-flight count seen mid-request"""
+
+    def __init__(self, stats, fail=False):
+        self.stats = stats
+        self.fail = fail
+        self.seen_in_flight = None
+
+    def handle_request(self, request):
+        self.seen_in_flight = self.stats.snapshot()['in_flight']
+        if self.fail:
+            raise ConnectionError("reset")
+        return httpx.Response(200)
+
+
+class RecordingAsyncTransport(httpx.AsyncBaseTransport):
+    def __init__(self, stats, fail=False):
+        self.inner = RecordingTransport(stats, fail)
+
+    async def handle_async_request(self, request):
+        return self.inner.handle_request(request)
+
+
+def test_metered_transport_counts_each_request():
+    stats = PoolStats('sync', limit=2)
+    inner = RecordingTransport(stats)
+    _MeteredTransport(inner, stats).handle_request(httpx.Request('GET', 'https://example.ch'))
+    assert inner.seen_in_flight == 1
+
+    inner.fail = True
+    with pytest.raises(ConnectionError):
+        _MeteredTransport(inner, stats).handle_request(httpx.Request('GET', 'https://example.ch'))
+    snapshot = stats.snapshot()
+    assert (snapshot['requests'], snapshot['in_flight'], snapshot['errors']) == (2, 0, 1)
+
+
+def test_metered_async_transport_releases_on_cancellation():
+    stats = PoolStats('async', limit=2)
+
+    class Slow(httpx.AsyncBaseTransport):
+        async def handle_async_request(self, request):
+            await asyncio.sleep(10)
+
+    async def run():
+        inner = RecordingAsyncTransport(stats)
+        await _MeteredAsyncTransport(inner, stats).handle_async_request(httpx.Request('GET', 'https://example.ch'))
+        assert inner.inner.seen_in_flight == 1
+
+        task = asyncio.create_task(
+            _MeteredAsyncTransport(Slow(), stats).handle_async_request(httpx.Request('GET', 'https://example.ch'))
+        )
+        await asyncio.sleep(0)
+        assert stats.snapshot()['in_flight'] == 1
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+    snapshot = stats.snapshot()
+    assert (snapshot['requests'], snapshot['in_flight'], snapshot['errors']) == (2, 0, 1)
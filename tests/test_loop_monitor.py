@@ -0,0 +1,39 @@
+import asyncio
+import time
+from loop_monitor import LoopMonitor
+
+
+def blocking_handler():
+    time.sleep(0.3)
+
+
+def test_stall_is_measured_and_attributed_to_the_blocking_function():
+    async def run():
+        monitor = LoopMonitor(interval=0.01, stall_threshold=0.1)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        blocking_handler()
+        await asyncio.sleep(0.05)
+        monitor.stop()
+        return monitor
+
+    monitor = asyncio.run(run())
+    stats = monitor.stats()
+    assert stats['stalls'] == 1
+    assert stats['lag_ms']['max'] >= 200
+    culprit = stats['last_stall']['culprit']
+    assert culprit.startswith('tests/test_loop_monitor.py:blocking_handler:')
+    assert stats['top_offenders'] == {culprit: 1}
+
+
+def test_stats_can_be_read_from_another_thread_while_the_loop_runs():
+    async def run():
+        monitor = LoopMonitor(interval=0.001, stall_threshold=1.0)
+        monitor.start()
+        reader = asyncio.to_thread(lambda: [monitor.stats() for _ in range(2000)])
+        snapshots = await reader
+        monitor.stop()
+        return snapshots
+
+    snapshots = asyncio.run(run())
+    assert snapshots[-1]['stalls'] == 0
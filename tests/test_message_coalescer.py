@@ -0,0 +1,75 @@
+import asyncio
+from message_coalescer import MessageCoalescer
+
+
+def test_burst_is_processed_as_one_turn():
+    turns = []
+
+    async def process(update, context, text):
+        turns.append(text)
+
+    async def run():
+        coalescer = MessageCoalescer(process, window=0.02)
+        for text in ("ciao", "ho un problema", "con la stampante"):
+            coalescer.submit(1, text, None, None)
+        await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    assert turns == ["ciao\nho un problema\ncon la stampante"]
+
+
+def test_uncommitted_reply_is_superseded_by_newer_input():
+    started, finished = [], []
+
+    async def process(update, context, text):
+        started.append(text)
+        await asyncio.sleep(0.1)
+        finished.append(text)
+
+    async def run():
+        coalescer = MessageCoalescer(process, window=0.01)
+        coalescer.submit(1, "prima", None, None)
+        await asyncio.sleep(0.03)  # The first turn is running but has not replied
+        coalescer.submit(1, "seconda", None, None)
+        await asyncio.sleep(0.2)
+        return coalescer.stats()
+
+    stats = asyncio.run(run())
+    assert started == ["prima", "prima\nseconda"]
+    assert finished == ["prima\nseconda"]
+    assert stats['superseded'] == 1
+
+
+def test_committed_turn_finishes_before_the_next_one():
+    events = []
+
+    async def run():
+        async def process(update, context, text):
+            coalescer.commit()
+            events.append(f"start {text}")
+            await asyncio.sleep(0.05)
+            events.append(f"end {text}")
+
+        coalescer = MessageCoalescer(process, window=0.01)
+        coalescer.submit(1, "prima", None, None)
+        await asyncio.sleep(0.02)
+        coalescer.submit(1, "seconda", None, None)
+        await asyncio.sleep(0.2)
+
+    asyncio.run(run())
+    assert events == ["start prima", "end prima", "start seconda", "end seconda"]
+
+
+def test_drain_answers_buffered_messages_immediately():
+    turns = []
+
+    async def process(update, context, text):
+        turns.append(text)
+
+    async def run():
+        coalescer = MessageCoalescer(process, window=60)
+        coalescer.submit(1, "ciao", None, None)
+        return await coalescer.drain(1)
+
+    assert asyncio.run(run()) == 0
+    assert turns == ["ciao"]
@@ -0,0 +1,70 @@
+import marshal
+import pytest
+from models import AppointmentRequest, REQUIRED_FIELDS, UserData, UserSession
+
+COMPLETE = dict(nome="Anna", cognome="Bernasconi", via_numero="Via Roma 1", paese_cap="6900 Lugano",
+                telefono="0791234567", email="anna@example.ch")
+
+
+def test_bitmask_follows_assignment_and_clearing():
+    user_data = UserData(nome="Anna")
+    assert user_data.missing_fields() == list(REQUIRED_FIELDS[1:])
+    for field, value in COMPLETE.items():
+        setattr(user_data, field, value)
+    assert user_data.is_complete() and user_data.missing_fields() == []
+
+    user_data.email = None
+    assert not user_data.is_complete()
+    assert user_data.missing_fields() == ['email']
+
+
+def test_validators_run_on_assignment():
+    user_data = UserData()
+    with pytest.raises(ValueError):
+        user_data.telefono = "12345"
+    with pytest.raises(ValueError):
+        user_data.email = "non-una-email"
+    # A rejected value leaves the field and the bitmask untouched
+    assert user_data.telefono is None and 'telefono' in user_data.missing_fields()
+    with pytest.raises(ValueError):
+        UserData(**dict(COMPLETE, email="sbagliata"))
+
+
+def _session() -> UserSession:
+    user_data = UserData(**COMPLETE)
+    appointment = AppointmentRequest(user_data, "2030-01-07", "10:00", "Stampante",
+                                     [("2030-01-07", "11:00"), ("2030-01-08", "09:00")])
+    session = UserSession(user_id=1, chat_id=2, user_data=user_data, appointment_request=appointment,
+                          current_step="booking_appointment", delivery_mode="voice", summary="Riepilogo")
+    session.conversation_history.append({"role": "user", "content": "ciao"})
+    return session
+
+
+def test_bytes_round_trip():
+    restored = UserSession.from_bytes(_session().to_bytes())
+    assert restored.to_bytes() == _session().to_bytes()
+    assert restored.user_data.is_complete()
+    assert restored.appointment_request.user_data is restored.user_data
+    assert restored.appointment_request.proposed_slots == [("2030-01-07", "11:00"), ("2030-01-08", "09:00")]
+    assert (restored.current_step, restored.delivery_mode, restored.summary) == \
+        ("booking_appointment", "voice", "Riepilogo")
+
+
+def test_restore_resets_the_session_in_place():
+    session = _session()
+    saved = session.to_bytes()
+    history = session.conversation_history
+    session.current_step = "service_menu"
+    session.user_data.email = None
+    history.append({"role": "assistant", "content": "risposta"})
+
+    session.restore(saved)
+    assert session.to_bytes() == saved
+    assert session.conversation_history is not history  # The old list is left to its holders
+
+
+def test_unknown_format_version_is_rejected():
+    record = list(marshal.loads(_session().to_bytes()))
+    record[0] = 2
+    with pytest.raises(ValueError):
+        UserSession.from_bytes(marshal.dumps(tuple(record)))
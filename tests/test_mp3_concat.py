@@ -0,0 +1,43 @@
+from services.mp3_concat import audio_frames, concat_mp3
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz, stereo, no padding: 417-byte frames
+_HEADER = b'\xff\xfb\x90\x00'
+_FRAME_BYTES = 417
+
+
+def _frame(fill: bytes) -> bytes:
+    return _HEADER + fill * (_FRAME_BYTES - len(_HEADER))
+
+
+def _info_frame() -> bytes:
+    body = bytearray(_FRAME_BYTES - len(_HEADER))
+    body[32:36] = b'Info'  # After the 32 bytes of stereo side info
+    return _HEADER + bytes(body)
+
+
+def _id3v2(payload: bytes) -> bytes:
+    size = len(payload)
+    syncsafe = bytes([(size >> shift) & 0x7F for shift in (21, 14, 7, 0)])
+    return b'ID3\x04\x00\x00' + syncsafe + payload
+
+
+def test_audio_frames_drops_tags_and_info_frame():
+    audio = _frame(b'a') + _frame(b'b')
+    data = _id3v2(b'x' * 50) + _info_frame() + audio + b'TAG' + b'\x00' * 125
+    assert audio_frames(data) == audio
+
+
+def test_audio_frames_resynchronizes_after_junk():
+    audio = _frame(b'a')
+    assert audio_frames(b'\x00\x01junk' + audio) == audio
+
+
+def test_concat_keeps_every_segment_in_order():
+    first, second = _frame(b'a'), _frame(b'b') + _frame(b'c')
+    joined = concat_mp3([_id3v2(b'tag') + _info_frame() + first, _info_frame() + second])
+    assert joined == first + second
+
+
+def test_single_segment_is_returned_untouched():
+    segment = _id3v2(b'tag') + _info_frame() + _frame(b'a')
+    assert concat_mp3([segment]) == segment
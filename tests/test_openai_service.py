@@ -0,0 +1,95 @@
+import asyncio
+from types import SimpleNamespace
+from config import Config
+from models import UserSession
+from services.openai_service import OpenAIService
+
+
+class FakeCompletions:
+    def __init__(self, reply="Riepilogo", delay=0.0):
+        self.reply = reply
+        self.delay = delay
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        await asyncio.sleep(self.delay)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.reply))])
+
+
+def make_service(completions):
+    service = OpenAIService.__new__(OpenAIService)
+    service.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    service._summary_tasks = {}
+    return service
+
+
+def make_session(messages: int) -> UserSession:
+    session = UserSession(user_id=1, chat_id=1, current_step="service_menu")
+    for index in range(messages):
+        session.conversation_history.append({"role": "user" if index % 2 == 0 else "assistant",
+                                             "content": f"messaggio {index}"})
+    return session
+
+
+def test_build_messages_sends_every_unsummarized_message():
+    session = make_session(Config.HISTORY_SUMMARIZE_AFTER)
+    session.summary = "Il cliente ha la stampante rotta"
+    messages = make_service(FakeCompletions()).build_messages("ciao", session)
+
+    assert messages[1] == {"role": "system",
+                           "content": "Riepilogo della conversazione finora: Il cliente ha la stampante rotta"}
+    assert messages[2:-1] == session.conversation_history
+    assert messages[-1] == {"role": "user", "content": "ciao"}
+
+
+def test_summary_starts_only_past_the_threshold():
+    completions = FakeCompletions()
+    service = make_service(completions)
+
+    async def run(messages):
+        session = make_session(messages)
+        service.schedule_summary(session)
+        await asyncio.gather(*service._summary_tasks.values())
+        return session
+
+    untouched = asyncio.run(run(Config.HISTORY_SUMMARIZE_AFTER))
+    assert not completions.calls and len(untouched.conversation_history) == Config.HISTORY_SUMMARIZE_AFTER
+
+    summarized = asyncio.run(run(Config.HISTORY_SUMMARIZE_AFTER + 2))
+    assert summarized.summary == "Riepilogo"
+    assert len(summarized.conversation_history) == Config.HISTORY_RECENT_MESSAGES
+    assert summarized.conversation_history[-1]["content"] == f"messaggio {Config.HISTORY_SUMMARIZE_AFTER + 1}"
+    assert "messaggio 0" in completions.calls[0]['messages'][0]['content']
+
+
+def test_summarize_keeps_messages_appended_meanwhile():
+    session = make_session(Config.HISTORY_SUMMARIZE_AFTER + 2)
+    service = make_service(FakeCompletions(delay=0.01))
+
+    async def run():
+        task = asyncio.create_task(service._summarize(session))
+        await asyncio.sleep(0)
+        session.conversation_history.append({"role": "user", "content": "nuovo"})
+        await task
+
+    asyncio.run(run())
+    assert len(session.conversation_history) == Config.HISTORY_RECENT_MESSAGES + 1
+    assert session.conversation_history[-1]["content"] == "nuovo"
+
+
+def test_summarize_is_discarded_when_the_session_was_restored():
+    session = make_session(Config.HISTORY_SUMMARIZE_AFTER + 2)
+    saved = session.to_bytes()
+    service = make_service(FakeCompletions(delay=0.01))
+
+    async def run():
+        task = asyncio.create_task(service._summarize(session))
+        await asyncio.sleep(0)
+        # A cancelled turn swaps in a fresh history list
+        session.restore(saved)
+        await task
+
+    asyncio.run(run())
+    assert session.summary == ""
+    assert len(session.conversation_history) == Config.HISTORY_SUMMARIZE_AFTER + 2
@@ -0,0 +1,86 @@
+import asyncio
+import sqlite3
+from outbound_queue import OutboundQueue
+
+
+async def _until(condition, timeout: float = 2):
+    deadline = asyncio.get_event_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_event_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_jobs_sharing_an_order_key_run_in_order(tmp_path):
+    finished = []
+
+    async def handler(payload):
+        # Earlier jobs take longer: with four free workers they would finish last
+        await asyncio.sleep(0.05 * (3 - payload['n']))
+        finished.append(payload['n'])
+
+    async def run():
+        queue = OutboundQueue(str(tmp_path / 'jobs.db'), workers=4, max_attempts=1)
+        queue.register('reply', handler)
+        await queue.start()
+        for n in range(3):
+            await queue.enqueue('reply', {'n': n}, order_key='42')
+        await _until(lambda: len(finished) == 3)
+        await queue.stop()
+
+    asyncio.run(run())
+    assert finished == [0, 1, 2]
+
+
+def test_dead_job_calls_hook_and_frees_its_dedupe_key(tmp_path):
+    dead = []
+
+    async def failing(payload):
+        raise RuntimeError("calendar down")
+
+    async def on_dead(payload, error):
+        dead.append((payload, error))
+
+    async def run():
+        queue = OutboundQueue(str(tmp_path / 'jobs.db'), workers=1, max_attempts=1)
+        queue.register('book', failing, on_dead=on_dead)
+        await queue.start()
+        assert await queue.enqueue('book', {'user_id': 1}, dedupe_key='booking:x') is not None
+        await _until(lambda: dead)
+        # The same booking can be attempted again once the first one died
+        assert await queue.enqueue('book', {'user_id': 1}, dedupe_key='booking:x') is not None
+        await queue.stop()
+
+    asyncio.run(run())
+    assert dead[0] == ({'user_id': 1}, "calendar down")
+
+
+def test_old_database_gains_the_order_key_column(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, payload TEXT NOT NULL, "
+        "dedupe_key TEXT UNIQUE, status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0, "
+        "run_at REAL NOT NULL, created_at REAL NOT NULL, last_error TEXT)"
+    )
+    conn.close()
+
+    async def run():
+        queue = OutboundQueue(path, workers=1)
+        await queue.start()
+        await queue.stop()
+
+    asyncio.run(run())
+    columns = {row[1] for row in sqlite3.connect(path).execute("PRAGMA table_info(jobs)")}
+    assert 'order_key' in columns
+
+
+def test_second_stop_is_a_no_op(tmp_path):
+    async def run():
+        queue = OutboundQueue(str(tmp_path / 'jobs.db'), workers=2)
+        queue.register('reply', lambda payload: asyncio.sleep(0))
+        await queue.start()
+        await queue.stop(1)
+        await queue.stop()
+        return queue.stats()
+
+    assert asyncio.run(run())['workers'] == 0
@@ -0,0 +1,37 @@
+import pytest
+from questionnaire import parse_answer
+
+
+@pytest.mark.parametrize("field, text, expected", [
+    ('nome', "Mario", {'nome': 'Mario'}),
+    ('nome', "mario.", {'nome': 'Mario'}),
+    ('nome', "Mi chiamo Mario Rossi", {'nome': 'Mario', 'cognome': 'Rossi'}),
+    ('nome', "Sono Luca", {'nome': 'Luca'}),
+    ('cognome', "Rossi", {'cognome': 'Rossi'}),
+    ('cognome', "D'Angelo", {'cognome': "D'Angelo"}),
+    ('cognome', "De Luca", {'cognome': 'De Luca'}),
+    ('cognome', "Il mio cognome è Della Valle", {'cognome': 'Della Valle'}),
+    ('via_numero', "Via Roma 12", {'via_numero': 'Via Roma 12'}),
+    ('paese_cap', "6900 Lugano", {'paese_cap': '6900 Lugano'}),
+    ('paese_cap', "Bellinzona 6500", {'paese_cap': '6500 Bellinzona'}),
+    ('telefono', "il mio numero è 079 123 45 67", {'telefono': '0791234567'}),
+    ('email', "Mario.Rossi@Example.ch", {'email': 'mario.rossi@example.ch'}),
+])
+def test_short_answers_are_parsed_locally(field, text, expected):
+    assert parse_answer(field, text) == expected
+
+
+@pytest.mark.parametrize("field, text", [
+    ('nome', "Ho un problema"),
+    ('nome', "Vorrei prenotare"),
+    ('nome', "Internet non va"),
+    ('nome', "Maria Grazia"),  # Compound first name or name and surname: ask the LLM
+    ('nome', "Mi chiamo Maria Grazia Rossi"),
+    ('nome', "sono stanco"),
+    ('nome', "Ciao"),
+    ('nome', "Come ti chiami tu?"),
+    ('cognome', "Non capisco"),
+    ('cognome', "Ho sbagliato nome"),
+])
+def test_sentences_are_left_to_the_llm(field, text):
+    assert parse_answer(field, text) == {}
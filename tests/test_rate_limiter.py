@@ -0,0 +1,54 @@
+import pytest
+from config import Config
+import rate_limiter
+from rate_limiter import RateLimiter, TokenBucket
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(rate_limiter.time, 'monotonic', clock)
+    return clock
+
+
+def test_bucket_refills_at_its_rate(clock):
+    bucket = TokenBucket(rate=1, burst=2)
+    assert bucket.take(clock.now) and bucket.take(clock.now)
+    assert not bucket.take(clock.now)
+    assert bucket.take(clock.now + 1)
+
+
+def test_user_burst_then_throttle(monkeypatch, clock):
+    monkeypatch.setattr(Config, 'RATE_LIMIT_USER_BURST', 3)
+    monkeypatch.setattr(Config, 'RATE_LIMIT_CHAT_BURST', 100)
+    limiter = RateLimiter()
+    assert [limiter.allow(1, 1) for _ in range(4)] == [True, True, True, False]
+    # Another user is not affected
+    assert limiter.allow(2, 2)
+
+
+def test_throttled_chat_does_not_drain_user_tokens(monkeypatch, clock):
+    monkeypatch.setattr(Config, 'RATE_LIMIT_USER_BURST', 2)
+    monkeypatch.setattr(Config, 'RATE_LIMIT_CHAT_BURST', 1)
+    limiter = RateLimiter()
+    assert limiter.allow(1, 10)
+    assert not limiter.allow(1, 10)
+    # The user still has a token for another chat
+    assert limiter.allow(1, 20)
+
+
+def test_throttle_notice_once_per_interval(monkeypatch, clock):
+    monkeypatch.setattr(Config, 'THROTTLE_NOTICE_SECONDS', 30)
+    limiter = RateLimiter()
+    assert limiter.should_notify(1)
+    assert not limiter.should_notify(1)
+    clock.now += 31
+    assert limiter.should_notify(1)
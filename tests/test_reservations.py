@@ -0,0 +1,55 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from services.reservations import Booking, SlotReservations
+
+TZ = ZoneInfo("Europe/Zurich")
+TEN = datetime(2030, 1, 7, 10, 0, tzinfo=TZ)
+TEN_THIRTY = datetime(2030, 1, 7, 10, 30, tzinfo=TZ)
+BOOKING = Booking('cal', 'event', 'link')
+
+
+def test_overlapping_slots_conflict():
+    reservations = SlotReservations(hold_seconds=60)
+    assert reservations.try_hold('cal', TEN, 60, 'a')
+    assert not reservations.try_hold('cal', TEN_THIRTY, 60, 'b')
+    assert reservations.try_hold('other', TEN_THIRTY, 60, 'b')
+    # The same booking may hold its own slot again
+    assert reservations.try_hold('cal', TEN, 60, 'a')
+
+
+def test_release_frees_hold():
+    reservations = SlotReservations(hold_seconds=60)
+    reservations.try_hold('cal', TEN, 60, 'a')
+    reservations.release('cal', TEN, 60, 'a')
+    assert reservations.try_hold('cal', TEN_THIRTY, 60, 'b')
+
+
+def test_confirm_marks_booked_and_completed():
+    reservations = SlotReservations(hold_seconds=60)
+    reservations.try_hold('cal', TEN, 60, 'a')
+    reservations.confirm(TEN, 60, 'a', BOOKING)
+    assert reservations.is_booked('cal', TEN_THIRTY, 30)
+    assert reservations.is_taken('cal', TEN, 60, 'b')
+    assert reservations.completed('a') == BOOKING
+
+
+def test_forget_releases_cancelled_booking():
+    reservations = SlotReservations(hold_seconds=60)
+    reservations.confirm(TEN, 60, 'a', BOOKING)
+    reservations.forget('cal', TEN, 60)
+    assert not reservations.is_booked('cal', TEN, 60)
+    assert reservations.completed('a') is None
+    assert reservations.try_hold('cal', TEN_THIRTY, 60, 'b')
+
+
+def test_forget_drops_whole_booking_from_partial_overlap():
+    reservations = SlotReservations(hold_seconds=60)
+    reservations.confirm(TEN, 60, 'a', BOOKING)
+    reservations.forget('cal', TEN_THIRTY, 30)
+    assert not reservations.is_booked('cal', TEN, 30)
+
+
+def test_idempotency_key_is_stable():
+    key = SlotReservations.idempotency_key(" Mario@Example.ch ", "2030-01-07", "10:00")
+    assert key == SlotReservations.idempotency_key("mario@example.ch", "2030-01-07", "10:00")
+    assert key != SlotReservations.idempotency_key("mario@example.ch", "2030-01-07", "11:00")
@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+from services.resilience import CircuitBreaker, CircuitOpenError, LatencyTracker, deadline_scope, hedged
+
+
+def _warm_tracker(seconds: float) -> LatencyTracker:
+    tracker = LatencyTracker()
+    for _ in range(20):
+        tracker.record(seconds)
+    return tracker
+
+
+def test_hedge_cancels_the_losing_copy():
+    calls = []
+
+    async def call():
+        index = len(calls)
+        calls.append('started')
+        try:
+            # The first copy stalls, the hedge answers quickly
+            await asyncio.sleep(1 if index == 0 else 0.01)
+            return index
+        except asyncio.CancelledError:
+            calls[index] = 'cancelled'
+            raise
+
+    async def run():
+        result = await hedged(call, _warm_tracker(0.02), 90)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(run()) == 1
+    assert calls == ['cancelled', 'started']
+
+
+def test_hedge_raises_the_first_error():
+    calls = []
+
+    async def call():
+        index = len(calls)
+        calls.append(index)
+        await asyncio.sleep(0.05 if index == 0 else 0.2)
+        raise ValueError(f"copy {index}")
+
+    with pytest.raises(ValueError, match="copy 0"):
+        asyncio.run(hedged(call, _warm_tracker(0.01), 90))
+    assert calls == [0, 1]
+
+
+def test_breaker_opens_after_threshold():
+    circuit = CircuitBreaker('test', failure_threshold=2, reset_seconds=60)
+
+    async def failing():
+        raise RuntimeError("down")
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await circuit.call(failing)
+        with pytest.raises(CircuitOpenError):
+            await circuit.call(failing)
+
+    asyncio.run(run())
+    assert circuit.state == 'open'
+
+
+def test_cancellation_is_not_a_failure():
+    circuit = CircuitBreaker('test', failure_threshold=1, reset_seconds=60)
+
+    async def run():
+        task = asyncio.ensure_future(circuit.call(lambda: asyncio.sleep(1)))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert circuit.state == 'closed'
+
+
+def test_deadline_bounds_the_call():
+    circuit = CircuitBreaker('test', failure_threshold=5, reset_seconds=60)
+
+    async def run():
+        with deadline_scope(0.05):
+            with pytest.raises(asyncio.TimeoutError):
+                await circuit.call(lambda: asyncio.sleep(1), timeout=10)
+
+    asyncio.run(run())
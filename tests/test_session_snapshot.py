@@ -0,0 +1,42 @@
+import os
+from config import Config
+from models import UserData, UserSession
+from session_snapshot import load_snapshot, save_snapshot
+
+
+def _session(user_id: int) -> UserSession:
+    session = UserSession(user_id=user_id, chat_id=user_id + 1000)
+    session.user_data = UserData(nome="Anna", paese_cap="6900 Lugano")
+    session.current_step = "data_collection"
+    session.conversation_history.append({"role": "user", "content": "ciao"})
+    return session
+
+
+def test_round_trip_consumes_the_snapshot(tmp_path):
+    path = str(tmp_path / 'sessions.snapshot')
+    assert save_snapshot([_session(1), _session(2)], {"Ciao!": b"mp3"}, path) == 2
+
+    sessions, audio = load_snapshot(path)
+    assert sorted(sessions) == [1, 2]
+    assert sessions[1].chat_id == 1001
+    assert sessions[1].user_data.nome == "Anna"
+    assert sessions[1].conversation_history[-1]["content"] == "ciao"
+    assert audio == {"Ciao!": b"mp3"}
+    # Read once: a later crash must not restore these sessions again
+    assert not os.path.exists(path)
+    assert load_snapshot(path) == ({}, {})
+
+
+def test_audio_of_another_voice_is_dropped(tmp_path, monkeypatch):
+    path = str(tmp_path / 'sessions.snapshot')
+    monkeypatch.setattr(Config, 'VOICE_ID', 'voice-a')
+    save_snapshot([_session(1)], {"Ciao!": b"mp3"}, path)
+    monkeypatch.setattr(Config, 'VOICE_ID', 'voice-b')
+    sessions, audio = load_snapshot(path)
+    assert list(sessions) == [1] and audio == {}
+
+
+def test_unreadable_snapshot_is_ignored(tmp_path):
+    path = tmp_path / 'sessions.snapshot'
+    path.write_bytes(b'not a snapshot')
+    assert load_snapshot(str(path)) == ({}, {})
@@ -0,0 +1,39 @@
+import pytest
+from services.speech_text import normalize_for_speech, number_to_words, split_for_synthesis
+
+
+@pytest.mark.parametrize("n, words", [
+    (21, 'ventuno'), (28, 'ventotto'), (33, 'trentatré'), (180, 'centottanta'),
+    (1000, 'mille'), (2025, 'duemilaventicinque'), (1000000, 'un milione'),
+])
+def test_number_to_words(n, words):
+    assert number_to_words(n) == words
+
+
+@pytest.mark.parametrize("text, spoken", [
+    ("L'IP è 192.168.1.1", "L'IP è uno nove due punto uno sei otto punto uno punto uno"),
+    ("Installa la versione 3.5", "Installa la versione tre punto cinque"),
+    ("Aggiorna a v2.0.1", "Aggiorna a versione due punto zero punto uno"),
+    ("Chiama 079 123 45 67", "Chiama zero sette nove, uno due tre, quattro cinque, sei sette"),
+    ("Il 12.03.2025 alle 14:30", "Il dodici marzo duemilaventicinque alle quattordici e trenta"),
+    ("Appuntamento il 12.03.2025 14:30", "Appuntamento il dodici marzo duemilaventicinque quattordici e trenta"),
+    ("Chiama +41 79 123 45 67", "Chiama più quattro uno, sette nove, uno due tre, quattro cinque, sei sette"),
+    ("Chiama +41 (0)79 123 45 67", "Chiama più quattro uno, sette nove, uno due tre, quattro cinque, sei sette"),
+    ("Chiama 0791234567", "Chiama zero sette nove, uno due tre, quattro cinque, sei sette"),
+    ("Pratica 123 456 789 01", "Pratica centoventitré quattrocentocinquantasei settecentottantanove uno"),
+    ("Costa 120.50 CHF", "Costa centoventi virgola cinquanta franchi"),
+    ("Sono 1.250 file", "Sono milleduecentocinquanta file"),
+    ("Sconto del 10%", "Sconto del dieci per cento"),
+    ("✅ **Fatto**", "fatto Fatto"),
+])
+def test_normalize_for_speech(text, spoken):
+    assert normalize_for_speech(text) == spoken
+
+
+def test_split_keeps_sentences_whole_and_within_limit():
+    text = "Prima frase breve. Seconda frase, un po' più lunga della prima. Terza!"
+    chunks = split_for_synthesis(text, 40)
+    assert all(len(chunk) <= 40 for chunk in chunks)
+    assert ' '.join(chunks) == text
+    assert split_for_synthesis("Uno due. Tre quattro.", 12) == ["Uno due.", "Tre quattro."]
+    assert split_for_synthesis("Uno due. Tre quattro.", 400) == ["Uno due. Tre quattro."]
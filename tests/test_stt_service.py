@@ -0,0 +1,81 @@
+import asyncio
+import pytest
+from config import Config
+from services import stt_service
+from services.resilience import CircuitOpenError
+from services.stt_service import LocalWhisperBackend, SpeechToTextService
+
+
+class StubBackend:
+    """Backend that records how many transcriptions overlap"""
+
+    def __init__(self, result="ciao", error=None):
+        self.result = result
+        self.error = error
+        self.active = 0
+        self.peak = 0
+
+    async def transcribe(self, audio, filename):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(0.01)
+            if self.error is not None:
+                raise self.error
+            return self.result
+        finally:
+            self.active -= 1
+
+    def shutdown(self):
+        pass
+
+
+@pytest.fixture
+def stub_api(monkeypatch):
+    monkeypatch.setattr(stt_service, 'WhisperAPIBackend', StubBackend)
+
+
+def make_service(backend, workers=2):
+    service = SpeechToTextService.__new__(SpeechToTextService)
+    service.backend = backend
+    service.semaphore = asyncio.Semaphore(workers)
+    return service
+
+
+def test_local_backend_falls_back_to_the_api_when_not_installed(monkeypatch, stub_api):
+    monkeypatch.setattr(Config, 'STT_BACKEND', 'local')
+    monkeypatch.setattr(stt_service.importlib.util, 'find_spec', lambda name: None)
+    assert isinstance(SpeechToTextService().backend, StubBackend)
+
+
+def test_local_backend_is_used_when_installed(monkeypatch, stub_api):
+    monkeypatch.setattr(Config, 'STT_BACKEND', 'local')
+    monkeypatch.setattr(stt_service.importlib.util, 'find_spec', lambda name: object())
+    service = SpeechToTextService()
+    assert isinstance(service.backend, LocalWhisperBackend)
+    service.shutdown()
+
+
+def test_api_backend_is_the_default(monkeypatch, stub_api):
+    monkeypatch.setattr(Config, 'STT_BACKEND', 'whisper_api')
+    assert isinstance(SpeechToTextService().backend, StubBackend)
+
+
+def test_semaphore_bounds_concurrent_transcriptions():
+    backend = StubBackend()
+    service = make_service(backend, workers=2)
+
+    async def run():
+        return await asyncio.gather(*(service.transcribe(b"audio") for _ in range(5)))
+
+    assert asyncio.run(run()) == ["ciao"] * 5
+    assert backend.peak == 2
+
+
+@pytest.mark.parametrize("backend", [
+    StubBackend(error=RuntimeError("boom")),
+    StubBackend(error=CircuitOpenError("openai_stt")),
+    StubBackend(result=""),
+])
+def test_failed_transcription_returns_none(backend):
+    assert asyncio.run(make_service(backend).transcribe(b"audio")) is None